@@ -0,0 +1,413 @@
+"""
+🏁 BENCHMARKS DU CHAT AGENT (MÉMOIRE, PDF, IMAGES, /chat)
+=========================================================
+
+Mesure les chemins critiques de chat_agent_api.py avec les vrais modèles ou
+avec les modèles factices déterministes (models/stub_models.py), pour
+comparer deux versions du code sur la même machine:
+
+- memory: FAISSMemoryManager.add_document / search à plusieurs tailles de corpus
+- pdf: ingestion d'un PDF (extraction, découpage, embeddings, sauvegarde)
+- image: UnifiedAgent.process_image (vision, détection, synthèse)
+- chat: POST /chat de bout en bout (middleware, routage, mémoire, LLM),
+  appelé directement sur l'application ASGI, sans réseau (un thread par client)
+- batch: mêmes questions une par une, puis en lot (ChatAgentManager.chat_batch)
+
+Chaque scénario rapporte débit et p50/p95/p99 dans un rapport JSON;
+`--compare` signale les régressions par rapport à un rapport de référence.
+
+Usage:
+    python benchmarks/bench_agent.py --backend stub --output baseline.json
+    python benchmarks/bench_agent.py --backend stub --compare baseline.json
+    python benchmarks/bench_agent.py --backend stub --latency-scale 0 --suites memory
+    python benchmarks/bench_agent.py --backend real --suites image,chat --chat-requests 5
+
+Auteur: BelikanM
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR / "models"))
+
+from bench_utils import (  # noqa: E402
+    summarize, make_report, write_report, load_report, compare_reports, print_comparison, log
+)
+
+SUITES = ("memory", "pdf", "image", "chat", "batch")
+
+# Phrases du domaine (RH, HSE, plateforme CENTER) pour les corpus synthétiques
+_SUBJECTS = ["Le responsable HSE", "L'employé", "Le technicien", "Le module de gestion", "Le rapport mensuel",
+             "La plateforme", "Le chef de site", "Le service RH", "L'inspection", "Le tableau de bord"]
+_VERBS = ["vérifie", "enregistre", "exporte", "archive", "valide", "signale", "planifie", "met à jour",
+          "consulte", "transmet"]
+_OBJECTS = ["les certifications de sécurité", "la fiche du personnel", "les équipements de protection",
+            "le planning des formations", "les incidents de la semaine", "le registre des vannes",
+            "les habilitations électriques", "la liste des sous-traitants", "les audits de conformité",
+            "les alertes d'expiration"]
+_DETAILS = ["avant la fin du mois", "pour chaque département", "au format PDF", "depuis le menu Rapports",
+            "sur la plateforme offshore", "avec une alerte trente jours avant", "selon la procédure interne",
+            "après validation du manager", "dans l'historique de l'employé", "pour l'audit annuel"]
+
+CHAT_MESSAGES = [
+    "Bonjour, comment vas-tu ?",
+    "Rappelle-moi ce que contient le document sur les certifications HSE",
+    "Comment exporter les fiches du personnel au format Excel ?",
+    "Explique-moi comment fonctionne l'application",
+    "Résume les incidents de la semaine",
+    "J'ai un problème: l'alerte d'expiration ne s'affiche pas",
+    "Écris un court poème sur la sécurité au travail",
+    "Quelles sont les habilitations électriques enregistrées ?",
+]
+
+
+def sentence(rng: random.Random) -> str:
+    return f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} {rng.choice(_DETAILS)}."
+
+
+def paragraph(rng: random.Random, sentences: int = 6) -> str:
+    return " ".join(sentence(rng) for _ in range(sentences))
+
+
+def make_pdf(pages: int, rng: random.Random) -> bytes:
+    """PDF texte (non scanné) de `pages` pages"""
+    import fitz
+    document = fitz.open()
+    for _ in range(pages):
+        page = document.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 790), paragraph(rng, 25), fontsize=9)
+    data = document.tobytes()
+    document.close()
+    return data
+
+
+def make_image(path: Path, rng: random.Random, size: Tuple[int, int] = (640, 480)):
+    """Image JPEG distincte par appel (blocs de couleurs aléatoires)"""
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.rectangle([x, y, x + rng.randrange(20, 200), y + rng.randrange(20, 200)],
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    image.save(path, format="JPEG", quality=85)
+
+
+# ==========================================
+# CONSTRUCTION DES BACKENDS
+# ==========================================
+
+class Backends:
+    """Agent et embedder partagés par les scénarios (un seul chargement des vrais modèles)"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.kind = args.backend
+        if self.kind == "stub":
+            os.environ.setdefault("STUB_MODELS", "1")  # Instance globale de l'API également factice
+            os.environ.setdefault("WEB_SEARCH_BACKEND", "stub")
+        import chat_agent_api
+        self.api = chat_agent_api
+
+        if self.kind == "stub":
+            from stub_models import create_stub_agent, create_stub_embedder, parse_latencies
+            latencies = parse_latencies(args.latency, args.latency_scale)
+            self.latencies = latencies
+            self.agent = create_stub_agent(latencies, llm_workers=args.llm_workers)
+            self.embedder = create_stub_embedder(latencies)
+        else:
+            self.latencies = None
+            manager = chat_agent_api.load_chat_manager(warmup=False)  # Construit au démarrage de l'API sinon
+            if manager is None:
+                raise SystemExit(f"❌ Initialisation impossible: {chat_agent_api.STARTUP['error']}")
+            self.agent = manager.agent
+            self.embedder = manager.memory.embedding_model
+            if self.embedder is None:
+                raise SystemExit("❌ Modèle d'embeddings indisponible: benchmark 'real' impossible")
+
+    def memory(self):
+        from conversation_store import ConversationStore
+        return self.api.FAISSMemoryManager(conversation_store=ConversationStore(), embedder=self.embedder)
+
+    def manager(self, storage_path: Path):
+        return self.api.ChatAgentManager(agent=self.agent, embedder=self.embedder, storage_path=str(storage_path))
+
+
+# ==========================================
+# SCÉNARIOS
+# ==========================================
+
+def bench_memory(backends: Backends, args: argparse.Namespace, rng: random.Random) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for size in args.sizes:
+        memory = backends.memory()
+        latencies = []
+        start = time.perf_counter()
+        for i in range(size):
+            text = paragraph(rng, 3)
+            t0 = time.perf_counter()
+            memory.add_document(text, {"filename": f"corpus_{i // 50}.pdf", "chunk_index": i % 50}, doc_type="pdf_rag")
+            latencies.append(time.perf_counter() - t0)
+        results[f"memory.add[n={size}]"] = summarize(latencies, time.perf_counter() - start)
+
+        latencies = []
+        start = time.perf_counter()
+        for i in range(args.queries):
+            query = f"{sentence(rng)} #{i}"  # Requêtes distinctes: pas de cache d'embedding
+            t0 = time.perf_counter()
+            memory.search(query, k=5)
+            latencies.append(time.perf_counter() - t0)
+        results[f"memory.search[n={size}]"] = summarize(latencies, time.perf_counter() - start, k=5)
+        log(f"   memory n={size:<7} add p50={results[f'memory.add[n={size}]']['p50_ms']:.2f} ms   "
+            f"search p95={results[f'memory.search[n={size}]']['p95_ms']:.2f} ms")
+    return results
+
+
+def bench_pdf(backends: Backends, args: argparse.Namespace, rng: random.Random, workdir: Path) -> Dict[str, Dict[str, Any]]:
+    manager = backends.manager(workdir / "pdf")
+    pdfs = [make_pdf(args.pdf_pages, rng) for _ in range(args.pdf_count)]
+    latencies, errors, chunks = [], 0, 0
+
+    start = time.perf_counter()
+    for i, data in enumerate(pdfs):
+        t0 = time.perf_counter()
+        try:
+            result = manager.process_upload(data, f"bench_{i}.pdf", "application/pdf")
+            chunks += result.get("total_chunks", 0)
+            latencies.append(time.perf_counter() - t0)
+        except Exception as e:
+            errors += 1
+            log(f"   ⚠️ PDF {i}: {e}")
+    wall = time.perf_counter() - start
+    result = summarize(latencies, wall, errors, pages=args.pdf_pages, chunks=chunks,
+                       pages_per_s=round(len(latencies) * args.pdf_pages / wall, 3) if wall else None)
+    log(f"   pdf ({args.pdf_pages} pages) p50={result['p50_ms']} ms, {chunks} chunks")
+    return {f"pdf.ingest[pages={args.pdf_pages}]": result}
+
+
+def bench_image(backends: Backends, args: argparse.Namespace, rng: random.Random, workdir: Path) -> Dict[str, Dict[str, Any]]:
+    paths = []
+    for i in range(args.image_count):
+        path = workdir / f"bench_{i}.jpg"
+        make_image(path, rng)
+        paths.append(path)
+
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        result = backends.agent.process_image(str(path), question="Décris cette image.", detect_objects=True)
+        if "error" in result or not result.get("synthesis"):
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - t0)
+    result = summarize(latencies, time.perf_counter() - start, errors)
+    log(f"   image p50={result['p50_ms']} ms ({errors} erreur(s))")
+    return {"image.process": result}
+
+
+async def asgi_request(app, method: str, path: str, body: bytes = b"", query: str = "") -> Tuple[int, bytes]:
+    """Appeler l'application ASGI directement (pile FastAPI complète, sans réseau)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 8001),
+    }
+    sent = False
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.Event().wait()  # Pas de déconnexion: annulé en fin de réponse
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+def bench_chat(backends: Backends, args: argparse.Namespace, rng: random.Random, workdir: Path) -> Dict[str, Dict[str, Any]]:
+    api = backends.api
+    manager = backends.manager(workdir / "chat")
+    for i in range(args.chat_corpus):
+        manager.memory.add_document(paragraph(rng, 3), {"filename": f"kb_{i // 50}.pdf", "chunk_index": i % 50}, "pdf_rag")
+
+    previous, api.chat_manager = api.chat_manager, manager  # Les routes lisent l'instance globale
+    results = {}
+    try:
+        for use_memory in (True, False):
+            latencies, errors = [], 0
+            pending = list(range(args.chat_requests))
+            lock = threading.Lock()
+
+            async def client(worker: int):
+                nonlocal errors
+                while True:
+                    with lock:
+                        if not pending:
+                            return
+                        i = pending.pop()
+                    body = json.dumps({
+                        "message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)],
+                        "conversation_id": f"bench_{worker}_{use_memory}",
+                        "use_memory": use_memory
+                    }).encode()
+                    t0 = time.perf_counter()
+                    status, _ = await asgi_request(api.app, "POST", "/chat", body)
+                    with lock:
+                        if status == 200:
+                            latencies.append(time.perf_counter() - t0)
+                        else:
+                            errors += 1
+
+            # Un thread (et une boucle asyncio) par client: une route qui bloque sa
+            # boucle ne bloque que son client, les --concurrency requêtes se chevauchent
+            threads = [
+                threading.Thread(target=asyncio.run, args=(client(w),), name=f"bench-client-{w}")
+                for w in range(args.concurrency)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            name = f"chat.e2e[memory={'on' if use_memory else 'off'},c={args.concurrency}]"
+            results[name] = summarize(latencies, time.perf_counter() - start, errors, concurrency=args.concurrency)
+            log(f"   {name} p50={results[name]['p50_ms']} ms p95={results[name]['p95_ms']} ms")
+    finally:
+        api.chat_manager = previous
+    return results
+
+
+def bench_batch(backends: Backends, args: argparse.Namespace, rng: random.Random, workdir: Path) -> Dict[str, Dict[str, Any]]:
+    manager = backends.manager(workdir / "batch")
+    for i in range(args.chat_corpus):
+        manager.memory.add_document(paragraph(rng, 3), {"filename": f"kb_{i // 50}.pdf", "chunk_index": i % 50}, "pdf_rag")
+
+    def questions(run: str) -> List[str]:
+        # Questions distinctes par passe: le cache d'embeddings ne favorise pas la seconde
+        return [f"{CHAT_MESSAGES[i % len(CHAT_MESSAGES)]} ({run} {i})" for i in range(args.batch_questions)]
+
+    results = {}
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for i, question in enumerate(questions("séquentiel")):
+        t0 = time.perf_counter()
+        try:
+            manager.chat(question, conversation_id=f"bench_seq_{i}", use_web=False, remember=False)
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            errors += 1
+    name = f"chat.sequential[n={args.batch_questions}]"
+    results[name] = summarize(latencies, time.perf_counter() - start, errors)
+
+    events: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    summary = manager.chat_batch(questions("lot"), on_result=events.append)
+    name_batch = f"chat.batch[n={args.batch_questions}]"
+    results[name_batch] = summarize(
+        [e["seconds"] for e in events if e["type"] == "result"], time.perf_counter() - start, summary["failed"],
+        concurrency=next((e["concurrency"] for e in events if e["type"] == "start"), None),
+        prepare_ms=round(summary["prepare_seconds"] * 1000, 3)
+    )
+    for key in (name, name_batch):
+        log(f"   {key} débit={results[key]['throughput_per_s']}/s p95={results[key]['p95_ms']} ms")
+    return results
+
+
+# ==========================================
+# POINT D'ENTRÉE
+# ==========================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks du chat agent (stubs ou vrais modèles)")
+    parser.add_argument("--backend", choices=("stub", "real"), default="stub")
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Scénarios parmi {','.join(SUITES)}")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Tailles de corpus (memory)")
+    parser.add_argument("--queries", type=int, default=200, help="Recherches par taille (memory)")
+    parser.add_argument("--pdf-count", type=int, default=5)
+    parser.add_argument("--pdf-pages", type=int, default=10)
+    parser.add_argument("--image-count", type=int, default=10)
+    parser.add_argument("--chat-requests", type=int, default=20)
+    parser.add_argument("--chat-corpus", type=int, default=500, help="Documents en mémoire avant /chat")
+    parser.add_argument("--concurrency", type=int, default=1, help="Clients /chat simultanés")
+    parser.add_argument("--batch-questions", type=int, default=40, help="Questions par lot (batch)")
+    parser.add_argument("--latency", default=os.getenv("STUB_LATENCY", ""),
+                        help="Latences des stubs, ex: llm_token=0.02,vision=0.5")
+    parser.add_argument("--latency-scale", type=float, default=float(os.getenv("STUB_LATENCY_SCALE", "1")),
+                        help="Multiplicateur des latences des stubs (0 = instantané)")
+    parser.add_argument("--llm-workers", type=int, default=None, help="Générations simultanées du LLM factice")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichier du rapport JSON (défaut: stdout)")
+    parser.add_argument("--compare", help="Rapport de référence: signaler les régressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Écart relatif toléré (p95, débit)")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    suites = [s.strip() for s in args.suites.split(",") if s.strip() in SUITES]
+
+    log(f"🏁 Benchmarks ({args.backend}): {', '.join(suites)}")
+    rng = random.Random(args.seed)
+    backends = Backends(args)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory(prefix="bench_agent_") as tmp:
+        workdir = Path(tmp)
+        for suite in suites:
+            log(f"▶️ {suite}")
+            if suite == "memory":
+                results.update(bench_memory(backends, args, rng))
+            elif suite == "pdf":
+                results.update(bench_pdf(backends, args, rng, workdir))
+            elif suite == "image":
+                results.update(bench_image(backends, args, rng, workdir))
+            elif suite == "chat":
+                results.update(bench_chat(backends, args, rng, workdir))
+            elif suite == "batch":
+                results.update(bench_batch(backends, args, rng, workdir))
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    config["latencies"] = backends.latencies
+    report = make_report("bench_agent", config, results)
+    write_report(report, args.output)
+
+    if args.compare:
+        rows, regressions = compare_reports(load_report(args.compare), report, args.tolerance)
+        print_comparison(rows)
+        if regressions:
+            log(f"\n⚠️ Régressions (> {args.tolerance:.0%}): {', '.join(regressions)}")
+            return 1
+        log("\n✅ Pas de régression")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+🏁 BENCHMARK DU DÉCODAGE SPÉCULATIF
+===================================
+
+Mesure le débit (tokens/s) de Mistral-7B sur nos charges réelles avec et
+sans décodage spéculatif, pour choisir LLM_SPECULATIVE par type de requête:
+
+- chat: conversation libre (peu de recopie du prompt)
+- rag: réponse à partir de chunks PDF/mémoire (beaucoup de recopie)
+- synthesis: synthèse d'analyse d'image (vision + détection)
+
+Génération gloutonne (temperature=0): les sorties doivent être identiques
+à celles du mode "none", ce qui est vérifié à chaque exécution.
+
+Usage:
+    python benchmarks/bench_speculative.py \\
+        --model models/mistral/mistral-7b-instruct-v0.2.Q4_K_M.gguf \\
+        [--draft-model models/draft/<petit-modele>.gguf] [--repeat 3]
+
+Auteur: BelikanM
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models"))
+
+from speculative import (  # noqa: E402
+    SPECULATIVE_NONE, SPECULATIVE_PROMPT_LOOKUP, SPECULATIVE_DRAFT,
+    create_prompt_lookup, create_small_model_draft
+)
+
+PROMPT_TEMPLATE = "[INST] {prompt} [/INST]"
+
+RAG_CHUNKS = """📚 CONNAISSANCES PERTINENTES:
+1. [pdf] Le module de gestion des employés permet d'ajouter, modifier et archiver les fiches du personnel. Chaque fiche comporte le nom, le poste, le département, la date d'embauche et les certifications HSE en cours de validité.
+2. [pdf] Les certifications HSE doivent être renouvelées tous les deux ans. Une alerte est envoyée au responsable trente jours avant l'expiration, puis une seconde alerte sept jours avant.
+3. [pdf] L'export des fiches se fait depuis le menu Rapports, au format PDF ou Excel, avec un filtre par département et par statut de certification."""
+
+WORKLOADS: Dict[str, str] = {
+    "chat": (
+        "Tu es un assistant intelligent et serviable.\n\n"
+        "Utilisateur: Bonjour ! Peux-tu me donner quelques conseils pour mieux organiser ma semaine de travail ?\n\n"
+        "Réponds de manière naturelle et concise."
+    ),
+    "rag": (
+        f"Tu es un expert de la plateforme CENTER.\n\n{RAG_CHUNKS}\n\n"
+        "Question: Comment sont gérées les certifications HSE des employés et comment les exporter ?\n\n"
+        "Réponds en t'appuyant sur les connaissances ci-dessus."
+    ),
+    "synthesis": (
+        "Analyse d'image.\n\n"
+        "👁️ VISION: Un technicien portant un casque jaune et un gilet orange réfléchissant inspecte une "
+        "vanne industrielle sur une plateforme pétrolière, avec des tuyaux métalliques en arrière-plan.\n"
+        "🎯 DÉTECTION: person (0.94), helmet (0.88), safety vest (0.85), valve (0.71)\n\n"
+        "Fais une synthèse de l'image: éléments observés, équipements de sécurité et contexte professionnel."
+    ),
+}
+
+
+def load_llm(model_path: str, n_ctx: int, n_threads: int, speculative: bool):
+    from llama_cpp import Llama
+    return Llama(
+        model_path=model_path,
+        n_ctx=n_ctx,
+        n_threads=n_threads,
+        n_threads_batch=n_threads,
+        use_mmap=True,
+        logits_all=speculative,
+        verbose=False
+    )
+
+
+def run_mode(
+    mode: str,
+    args: argparse.Namespace,
+    workloads: List[str]
+) -> Dict[str, Dict[str, Any]]:
+    """Débit et sorties de chaque charge pour un mode"""
+    llm = load_llm(args.model, args.n_ctx, args.threads, speculative=mode != SPECULATIVE_NONE)
+    if mode == SPECULATIVE_PROMPT_LOOKUP:
+        llm.draft_model = create_prompt_lookup(args.lookup_tokens)
+    elif mode == SPECULATIVE_DRAFT:
+        llm.draft_model = create_small_model_draft(args.draft_model, args.n_ctx, args.threads, args.draft_tokens)
+
+    # Préchauffage (page cache, allocation du contexte)
+    llm(PROMPT_TEMPLATE.format(prompt="Bonjour"), max_tokens=4, temperature=0.0)
+
+    results = {}
+    for name in workloads:
+        prompt = PROMPT_TEMPLATE.format(prompt=WORKLOADS[name])
+        rates, text = [], ""
+        for _ in range(args.repeat):
+            llm.reset()  # Pas de réutilisation du cache KV entre répétitions
+            start = time.perf_counter()
+            response = llm(prompt, max_tokens=args.max_tokens, temperature=0.0, stop=["</s>", "[INST]"])
+            elapsed = time.perf_counter() - start
+            tokens = response["usage"]["completion_tokens"]
+            rates.append(tokens / elapsed if elapsed else 0.0)
+            text = response["choices"][0]["text"]
+        results[name] = {"tokens_per_second": statistics.median(rates), "text": text}
+        print(f"   {mode:<14} {name:<10} {results[name]['tokens_per_second']:7.2f} tok/s")
+
+    if hasattr(llm, "close"):
+        llm.close()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du décodage spéculatif (llama.cpp)")
+    parser.add_argument("--model", required=True, help="GGUF principal (Mistral-7B)")
+    parser.add_argument("--draft-model", help="GGUF brouillon de même vocabulaire (mode draft)")
+    parser.add_argument("--workloads", default="chat,rag,synthesis", help="Charges à mesurer")
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions (médiane)")
+    parser.add_argument("--n-ctx", type=int, default=4096, help="Contexte (LLM_CONTEXT_SIZE de l'agent)")
+    parser.add_argument("--threads", type=int, default=min(8, os.cpu_count() or 1))
+    parser.add_argument("--lookup-tokens", type=int, default=10)
+    parser.add_argument("--draft-tokens", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    workloads = [w.strip() for w in args.workloads.split(",") if w.strip() in WORKLOADS]
+    modes = [SPECULATIVE_NONE, SPECULATIVE_PROMPT_LOOKUP]
+    if args.draft_model:
+        modes.append(SPECULATIVE_DRAFT)
+
+    print(f"🏁 Décodage spéculatif: {os.path.basename(args.model)}, {args.threads} threads, "
+          f"{args.max_tokens} tokens max, médiane de {args.repeat}")
+    results = {mode: run_mode(mode, args, workloads) for mode in modes}
+
+    baseline = results[SPECULATIVE_NONE]
+    print(f"\n{'charge':<10} " + " ".join(f"{mode:>16}" for mode in modes))
+    for name in workloads:
+        cells = []
+        for mode in modes:
+            rate = results[mode][name]["tokens_per_second"]
+            speedup = rate / baseline[name]["tokens_per_second"] if baseline[name]["tokens_per_second"] else 0.0
+            same = "" if results[mode][name]["text"] == baseline[name]["text"] else "≠"
+            cells.append(f"{rate:7.2f} (x{speedup:.2f}){same:1}")
+        print(f"{name:<10} " + " ".join(f"{cell:>16}" for cell in cells))
+
+    diverged = any(
+        results[mode][name]["text"] != baseline[name]["text"]
+        for mode in modes for name in workloads
+    )
+    if diverged:
+        print("\n⚠️ Sorties différentes de 'none' (≠): vérifier la version de llama-cpp-python")
+    print("\nRecommandation LLM_SPECULATIVE: " + ",".join(
+        f"{name}:{max(modes, key=lambda m: results[m][name]['tokens_per_second'])}" for name in workloads
+    ))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
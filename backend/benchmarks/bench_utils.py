@@ -0,0 +1,163 @@
+"""
+📏 OUTILS COMMUNS DES BENCHMARKS
+================================
+
+Percentiles, résumés de latence et rapports JSON comparables entre deux
+exécutions (détection de régressions).
+
+Format d'un rapport:
+    {
+        "version": 1,
+        "tool": "bench_agent",
+        "timestamp": "...",
+        "host": {"python", "platform", "cpus"},
+        "config": {...},
+        "results": {
+            "<scénario>": {"count", "errors", "throughput_per_s", "mean_ms",
+                           "p50_ms", "p95_ms", "p99_ms", "max_ms", ...}
+        }
+    }
+
+Auteur: BelikanM
+"""
+
+import os
+import sys
+import json
+import math
+import platform
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+REPORT_VERSION = 1
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Percentile par interpolation linéaire (q entre 0 et 100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low, high = math.floor(position), math.ceil(position)
+    if low == high:
+        return ordered[low]
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(latencies: Sequence[float], wall_seconds: float, errors: int = 0, **extra) -> Dict[str, Any]:
+    """
+    Résumé d'une série de mesures
+
+    Args:
+        latencies: Durées des opérations réussies (secondes)
+        wall_seconds: Durée totale du scénario (débit = opérations / durée)
+        errors: Opérations en échec (exclues des percentiles)
+    """
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 3) if value is not None else None
+
+    count = len(latencies)
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / (count + errors), 4) if count + errors else 0.0,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_s": round(count / wall_seconds, 3) if wall_seconds > 0 else None,
+        "mean_ms": ms(sum(latencies) / count) if count else None,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(max(latencies)) if count else None,
+        **extra
+    }
+
+
+def host_info() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def make_report(tool: str, config: Dict[str, Any], results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "version": REPORT_VERSION,
+        "tool": tool,
+        "timestamp": datetime.now().isoformat(),
+        "host": host_info(),
+        "config": config,
+        "results": results
+    }
+
+
+def write_report(report: Dict[str, Any], output: Optional[str]):
+    """Rapport JSON dans un fichier, ou sur stdout (progression sur stderr)"""
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+        log(f"💾 Rapport: {output}")
+    else:
+        print(payload)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    tolerance: float = 0.10
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Comparer deux rapports scénario par scénario
+
+    Régression: p95 plus lent, débit plus faible ou taux d'erreur plus élevé
+    au-delà de `tolerance` (fraction relative).
+
+    Returns:
+        (lignes de comparaison, scénarios en régression)
+    """
+    rows, regressions = [], []
+    for name, result in current.get("results", {}).items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        row = {"scenario": name}
+        regressed = False
+        for key, higher_is_worse in (("p95_ms", True), ("throughput_per_s", False)):
+            old, new = before.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            row[key] = {"baseline": old, "current": new, "change": round(change, 4)}
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                regressed = True
+        if result.get("error_rate", 0) > before.get("error_rate", 0) + tolerance / 10:
+            regressed = True
+        row["regression"] = regressed
+        rows.append(row)
+        if regressed:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    log(f"\n{'scénario':<32} {'p95 (ms)':>24} {'débit (/s)':>24}")
+    for row in rows:
+        cells = []
+        for key in ("p95_ms", "throughput_per_s"):
+            cell = row.get(key)
+            cells.append(
+                f"{cell['baseline']:.1f} → {cell['current']:.1f} ({cell['change']:+.0%})" if cell else "-"
+            )
+        flag = " ⚠️" if row["regression"] else ""
+        log(f"{row['scenario']:<32} {cells[0]:>24} {cells[1]:>24}{flag}")
+
+
+def log(message: str):
+    """Progression sur stderr (stdout reste réservé au rapport JSON)"""
+    print(message, file=sys.stderr, flush=True)
@@ -0,0 +1,479 @@
+"""
+🚦 GÉNÉRATEUR DE CHARGE DU CHAT AGENT
+=====================================
+
+Rejoue un trafic réaliste contre chat_agent_api.py (client asyncio HTTP/1.1
+keep-alive, bibliothèque standard uniquement) pour dimensionner le matériel:
+
+- chat_memory: POST /chat avec recherche en mémoire
+- chat: POST /chat sans mémoire
+- search: POST /search
+- upload_image: POST /upload d'une image PNG (distincte à chaque requête)
+- upload_pdf: POST /upload d'un PDF texte de quelques pages
+
+Deux modes, par paliers successifs (`--steps`):
+- `--mode concurrency`: N clients en boucle fermée (débit maximal par palier)
+- `--mode rate`: arrivées de Poisson à R requêtes/s (boucle ouverte; la
+  latence est mesurée depuis l'instant d'arrivée prévu, file d'attente incluse)
+
+Chaque palier rapporte débit, p50/p95/p99 et erreurs par opération; le point
+de saturation est le premier palier où le débit ne suit plus la charge, où
+p95 dépasse `--slo-ms` ou où le taux d'erreur dépasse `--max-error-rate`.
+
+`--spawn-stub` démarre l'API avec les modèles factices (STUB_MODELS=1):
+aucun GPU, modèle ni réseau requis.
+
+Usage:
+    python benchmarks/loadgen.py --spawn-stub --steps 1,2,4,8 --duration 20
+    python benchmarks/loadgen.py --url http://127.0.0.1:8001 --mode rate --steps 0.5,1,2 \\
+        --mix chat_memory=60,chat=20,search=15,upload_image=4,upload_pdf=1 --output load.json
+
+Auteur: BelikanM
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import random
+import asyncio
+import argparse
+import subprocess
+import urllib.parse
+from pathlib import Path
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+from bench_utils import summarize, make_report, write_report, log  # noqa: E402
+
+OPERATIONS = ("chat_memory", "chat", "search", "upload_image", "upload_pdf")
+
+DEFAULT_MIX = "chat_memory=50,chat=25,search=15,upload_image=7,upload_pdf=3"
+
+CHAT_MESSAGES = [
+    "Bonjour, comment vas-tu ?",
+    "Rappelle-moi ce que contient le document sur les certifications HSE",
+    "Comment exporter les fiches du personnel au format Excel ?",
+    "Explique-moi comment fonctionne l'application",
+    "Résume les incidents de la semaine",
+    "J'ai un problème: l'alerte d'expiration ne s'affiche pas",
+    "Quelles sont les habilitations électriques enregistrées ?",
+    "Quels équipements de protection sont obligatoires sur la plateforme ?",
+]
+
+SEARCH_QUERIES = [
+    "certifications HSE", "export des fiches", "équipements de protection", "alerte d'expiration",
+    "habilitations électriques", "planning des formations", "audit de conformité", "incidents"
+]
+
+PDF_LINES = [
+    "Le responsable HSE verifie les certifications de securite avant la fin du mois.",
+    "Le service RH exporte la fiche du personnel au format PDF depuis le menu Rapports.",
+    "Le technicien signale les incidents de la semaine sur la plateforme offshore.",
+    "Une alerte est envoyee trente jours avant l'expiration de chaque habilitation.",
+    "Le chef de site planifie les formations selon la procedure interne.",
+]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Poids des opérations depuis "op=poids,..." """
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        if name not in OPERATIONS:
+            raise SystemExit(f"❌ Opération inconnue: {name} (parmi {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise SystemExit("❌ Mélange vide")
+    return mix
+
+
+# ==========================================
+# CHARGES UTILES (SANS DÉPENDANCE)
+# ==========================================
+
+def make_png(rng: random.Random, width: int = 320, height: int = 240) -> bytes:
+    """PNG RVB à bandes de couleurs aléatoires (contenu distinct à chaque appel)"""
+    rows = []
+    colors = [bytes(rng.randrange(256) for _ in range(3)) for _ in range(8)]
+    for y in range(height):
+        color = colors[y * len(colors) // height]
+        rows.append(b"\x00" + color * width)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b""))
+
+
+def make_pdf(rng: random.Random, pages: int = 3) -> bytes:
+    """PDF texte minimal (police Helvetica standard), extractible par PyPDF2"""
+    objects: List[bytes] = []
+    page_ids = [3 + 2 * i for i in range(pages)]
+    font_id = 3 + 2 * pages
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{p} 0 R' for p in page_ids)}] /Count {pages} >>".encode())
+    for page_id in page_ids:
+        lines = [rng.choice(PDF_LINES) for _ in range(40)]
+        text = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(
+            f"({line.replace('(', '').replace(')', '')}) Tj T*" for line in lines
+        ) + " ET"
+        stream = text.encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(output)
+
+
+def multipart(field: str, filename: str, content: bytes, content_type: str) -> Tuple[bytes, str]:
+    boundary = f"loadgen{random.getrandbits(64):016x}"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def build_request(op: str, seq: int, client: int, rng: random.Random) -> Tuple[str, str, bytes, str]:
+    """(méthode, chemin, corps, content-type) d'une opération"""
+    if op in ("chat_memory", "chat"):
+        body = json.dumps({
+            "message": rng.choice(CHAT_MESSAGES),
+            "conversation_id": f"load_{client}",
+            "use_memory": op == "chat_memory"
+        }).encode()
+        return "POST", "/chat", body, "application/json"
+    if op == "search":
+        query = urllib.parse.urlencode({"query": rng.choice(SEARCH_QUERIES), "k": 5})
+        return "POST", f"/search?{query}", b"", "application/json"
+    if op == "upload_image":
+        body, content_type = multipart("file", f"load_{client}_{seq}.png", make_png(rng), "image/png")
+        return "POST", "/upload", body, content_type
+    body, content_type = multipart("file", f"load_{client}_{seq}.pdf", make_pdf(rng), "application/pdf")
+    return "POST", "/upload", body, content_type
+
+
+# ==========================================
+# CLIENT HTTP/1.1 ASYNCIO
+# ==========================================
+
+class Connection:
+    """Connexion HTTP/1.1 keep-alive (réouverte après erreur ou Connection: close)"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", content_type: str = "application/json") -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = (
+                f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: keep-alive\r\n\r\n"
+            ).encode()
+            self.writer.write(head + body)
+            await self.writer.drain()
+
+            status_line = await self.reader.readline()
+            if not status_line:
+                raise ConnectionError("connexion fermée par le serveur")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                chunks = []
+                while True:
+                    size = int((await self.reader.readline()).split(b";")[0], 16)
+                    if size == 0:
+                        while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                            pass
+                        break
+                    chunks.append(await self.reader.readexactly(size))
+                    await self.reader.readexactly(2)
+                payload = b"".join(chunks)
+            elif "content-length" in headers:
+                payload = await self.reader.readexactly(int(headers["content-length"]))
+            else:
+                payload = await self.reader.read()
+                headers["connection"] = "close"
+
+            if headers.get("connection", "").lower() == "close":
+                self.close()
+            return status, payload
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+# ==========================================
+# PALIERS DE CHARGE
+# ==========================================
+
+class Recorder:
+    """Latences et erreurs par opération pour un palier"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_kinds: Dict[str, int] = defaultdict(int)
+
+    def ok(self, op: str, seconds: float):
+        self.latencies[op].append(seconds)
+
+    def fail(self, op: str, kind: str):
+        self.errors[op] += 1
+        self.error_kinds[kind] += 1
+
+    def results(self, wall: float, prefix: str) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for op in sorted(set(self.latencies) | set(self.errors)):
+            results[f"{prefix}.{op}"] = summarize(self.latencies[op], wall, self.errors[op])
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        results[f"{prefix}.all"] = summarize(
+            all_latencies, wall, sum(self.errors.values()), error_kinds=dict(self.error_kinds)
+        )
+        return results
+
+
+async def send(connection: Connection, op: str, seq: int, client: int, rng: random.Random,
+               recorder: Recorder, timeout: float, started: Optional[float] = None):
+    method, path, body, content_type = build_request(op, seq, client, rng)
+    start = started if started is not None else time.perf_counter()
+    try:
+        status, _ = await asyncio.wait_for(connection.request(method, path, body, content_type), timeout)
+    except asyncio.TimeoutError:
+        recorder.fail(op, "timeout")
+        return
+    except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+        recorder.fail(op, type(e).__name__)
+        return
+    if 200 <= status < 300:
+        recorder.ok(op, time.perf_counter() - start)
+    else:
+        recorder.fail(op, f"http_{status}")
+
+
+def choose(mix: Dict[str, float], rng: random.Random) -> str:
+    return rng.choices(list(mix), weights=list(mix.values()))[0]
+
+
+async def run_concurrency(args, mix, level: int, duration: float, recorder: Recorder, rng: random.Random):
+    """Boucle fermée: `level` clients enchaînent les requêtes"""
+    deadline = time.perf_counter() + duration
+
+    async def client(index: int):
+        connection = Connection(args.host, args.port)
+        seq = 0
+        client_rng = random.Random(rng.random())
+        while time.perf_counter() < deadline:
+            await send(connection, choose(mix, client_rng), seq, index, client_rng, recorder, args.timeout)
+            seq += 1
+        connection.close()
+
+    await asyncio.gather(*(client(i) for i in range(level)))
+
+
+async def run_rate(args, mix, rate: float, duration: float, recorder: Recorder, rng: random.Random):
+    """Boucle ouverte: arrivées de Poisson à `rate` req/s, pool de connexions borné"""
+    pool: asyncio.Queue = asyncio.Queue()
+    for _ in range(args.max_connections):
+        pool.put_nowait(Connection(args.host, args.port))
+
+    async def one(seq: int, scheduled: float):
+        connection = await pool.get()
+        try:
+            await send(connection, choose(mix, rng), seq, seq % args.max_connections, rng, recorder,
+                       args.timeout, started=scheduled)
+        finally:
+            pool.put_nowait(connection)
+
+    tasks = []
+    start = time.perf_counter()
+    next_arrival = start
+    seq = 0
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival - start >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        tasks.append(asyncio.create_task(one(seq, next_arrival)))
+        seq += 1
+    if tasks:
+        await asyncio.gather(*tasks)
+    while not pool.empty():
+        pool.get_nowait().close()
+
+
+def detect_saturation(args, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Premier palier où le service ne suit plus (débit, SLO p95, erreurs)"""
+    best = max((s["throughput_per_s"] or 0.0 for s in steps), default=0.0)
+    for i, step in enumerate(steps):
+        reasons = []
+        if step["error_rate"] > args.max_error_rate:
+            reasons.append(f"erreurs {step['error_rate']:.1%}")
+        if args.slo_ms and step["p95_ms"] is not None and step["p95_ms"] > args.slo_ms:
+            reasons.append(f"p95 {step['p95_ms']:.0f} ms > {args.slo_ms:.0f} ms")
+        throughput = step["throughput_per_s"] or 0.0
+        if args.mode == "rate" and throughput < 0.9 * step["level"]:
+            reasons.append(f"débit {throughput:.2f}/s < charge {step['level']}/s")
+        if args.mode == "concurrency" and i > 0:
+            previous = steps[i - 1]["throughput_per_s"] or 0.0
+            if throughput < previous * 1.1:
+                reasons.append(f"débit plafonné ({previous:.2f} → {throughput:.2f}/s)")
+        if reasons:
+            return {"level": step["level"], "reasons": reasons, "max_throughput_per_s": best}
+    return {"level": None, "reasons": ["non atteinte"], "max_throughput_per_s": best}
+
+
+# ==========================================
+# SERVEUR FACTICE
+# ==========================================
+
+def spawn_stub_server(args) -> subprocess.Popen:
+    """Démarrer l'API avec les modèles factices et attendre la fin de l'initialisation"""
+    env = dict(os.environ, STUB_MODELS="1", WEB_SEARCH_BACKEND="stub", STUB_LATENCY_SCALE=str(args.latency_scale))
+    if args.latency:
+        env["STUB_LATENCY"] = args.latency
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "chat_agent_api:app", "--host", args.host, "--port", str(args.port),
+         "--log-level", "warning"],
+        cwd=str(BACKEND_DIR),
+        env=env
+    )
+
+    async def wait_live() -> bool:
+        deadline = time.perf_counter() + args.startup_timeout
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                return False
+            try:
+                status, payload = await Connection(args.host, args.port).request("GET", "/health/live")
+                if status == 200:
+                    # Port ouvert avant le chargement des modèles: attendre le gestionnaire
+                    state = json.loads(payload).get("startup", {}).get("state")
+                    if state == "ready":
+                        return True
+                    if state == "failed":
+                        return False
+            except OSError:
+                pass
+            await asyncio.sleep(0.5)
+        return False
+
+    if not asyncio.run(wait_live()):
+        process.terminate()
+        raise SystemExit("❌ L'API factice n'a pas démarré")
+    log(f"🧪 API factice démarrée (pid {process.pid}) sur {args.host}:{args.port}")
+    return process
+
+
+# ==========================================
+# POINT D'ENTRÉE
+# ==========================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Générateur de charge du chat agent")
+    parser.add_argument("--url", default="http://127.0.0.1:8001", help="URL de l'API")
+    parser.add_argument("--mode", choices=("concurrency", "rate"), default="concurrency")
+    parser.add_argument("--steps", default="1,2,4,8", help="Clients (concurrency) ou req/s (rate) par palier")
+    parser.add_argument("--duration", type=float, default=30.0, help="Durée de chaque palier (s)")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Trafic non mesuré avant le premier palier (s)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Poids des opérations")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Délai maximal par requête (s)")
+    parser.add_argument("--max-connections", type=int, default=64, help="Connexions simultanées (mode rate)")
+    parser.add_argument("--slo-ms", type=float, default=0.0, help="Objectif p95 (0 = ignoré)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--spawn-stub", action="store_true", help="Démarrer l'API avec STUB_MODELS=1")
+    parser.add_argument("--latency", default="", help="STUB_LATENCY de l'API factice")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="STUB_LATENCY_SCALE de l'API factice")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Fichier du rapport JSON (défaut: stdout)")
+    args = parser.parse_args(argv)
+
+    url = urllib.parse.urlparse(args.url)
+    args.host, args.port = url.hostname or "127.0.0.1", url.port or 80
+    mix = parse_mix(args.mix)
+    levels = [float(s) if args.mode == "rate" else int(s) for s in args.steps.split(",") if s.strip()]
+    rng = random.Random(args.seed)
+
+    server = spawn_stub_server(args) if args.spawn_stub else None
+    results: Dict[str, Dict[str, Any]] = {}
+    steps: List[Dict[str, Any]] = []
+    try:
+        if args.warmup > 0:
+            log(f"🔥 Préchauffage ({args.warmup:g}s)")
+            asyncio.run(run_concurrency(args, mix, 1, args.warmup, Recorder(), rng))
+
+        for level in levels:
+            recorder = Recorder()
+            start = time.perf_counter()
+            if args.mode == "concurrency":
+                asyncio.run(run_concurrency(args, mix, level, args.duration, recorder, rng))
+            else:
+                asyncio.run(run_rate(args, mix, level, args.duration, recorder, rng))
+            wall = time.perf_counter() - start
+
+            prefix = f"{args.mode}={level}"
+            results.update(recorder.results(wall, prefix))
+            overall = results[f"{prefix}.all"]
+            steps.append({"level": level, **overall})
+            log(f"   {prefix:<18} {overall['throughput_per_s'] or 0:7.2f} req/s   p50={overall['p50_ms']} ms   "
+                f"p95={overall['p95_ms']} ms   p99={overall['p99_ms']} ms   erreurs={overall['error_rate']:.1%}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    saturation = detect_saturation(args, steps)
+    log(f"📈 Saturation: {saturation['level'] if saturation['level'] is not None else 'non atteinte'} "
+        f"({'; '.join(saturation['reasons'])}), débit max {saturation['max_throughput_per_s']:.2f} req/s")
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    config["mix"] = mix
+    report = make_report("loadgen", config, results)
+    report["steps"] = steps
+    report["saturation"] = saturation
+    write_report(report, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2821 @@
+"""
+🤖 API CHAT AGENT MULTIMODAL AVEC FAISS
+========================================
+
+API REST pour un agent de chat intelligent capable d'analyser:
+- Images (JPEG, PNG, WebP)
+- PDFs (extraction de texte et images)
+- Documents texte
+
+Utilise FAISS pour la recherche vectorielle et tous les modèles IA disponibles.
+
+Auteur: BelikanM
+Date: 13 Novembre 2025
+"""
+
+import time
+_startup_mark = time.perf_counter()  # Début des imports (phases de démarrage)
+
+import os
+import sys
+import shutil
+import logging
+import socket
+import threading
+import hmac
+import queue
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Callable
+from datetime import datetime
+import json
+import base64
+import io
+
+# Démarrage mesuré par phase (imports, construction du gestionnaire, préchauffage)
+STARTUP: Dict[str, Any] = {"started_at": time.time(), "state": "importing", "phases": {}, "error": None}
+
+def startup_phase(name: str):
+    """Clore la phase d'import en cours (durée depuis la marque précédente)"""
+    global _startup_mark
+    now = time.perf_counter()
+    STARTUP["phases"][name] = round(now - _startup_mark, 3)
+    _startup_mark = now
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Header, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from pydantic import BaseModel
+import uvicorn
+import numpy as np
+startup_phase("import_fastapi")
+
+# PIL, PyPDF2, PyMuPDF, sentence_transformers (torch) et faiss sont importés
+# à la première utilisation: le port est ouvert avant tout chargement lourd
+
+# Ajouter le chemin des modèles
+sys.path.append(str(Path(__file__).parent / "models"))
+
+# Charger variables d'environnement (une seule fois, partagé avec l'agent)
+from environment import load_environment
+load_environment()
+
+from unified_agent import UnifiedAgent
+from prompt_packer import PromptSection
+from conversation_store import ConversationStore
+from conversation_summarizer import ConversationSummarizer
+from trigger_matcher import TriggerMatch
+from intent_router import IntentRouter
+from embedding_cache import EmbeddingCache, QueryEmbedding, normalize_text
+from llm_pool import plan_workers
+from corpus_index import CorpusIndex
+from tts_streaming import SpeechStream
+from tracing import trace, span, current_span, EXPORTER as TRACE_EXPORTER
+from metrics import REGISTRY as METRICS, CONTENT_TYPE as METRICS_CONTENT_TYPE, process_memory_bytes
+from profiler import PROFILER
+startup_phase("import_models")
+
+# Configuration
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 10 PROMPTS PUISSANTS POUR KIBALI AGENT
+# ==========================================
+
+SYSTEM_PROMPT = """Tu es Kibali Enfant Agent, un assistant IA ultra-puissant créé par Nyundu Francis Arnaud. 
+Tu es expert en vision par ordinateur, raisonnement avancé, et recherche d'informations. 
+Tu réponds de manière concise, précise et rapide. Maximum 3-4 phrases par réponse sauf si demandé autrement."""
+
+VISION_PROMPT = """Analyse cette image avec précision. Décris les objets, personnes, couleurs, actions et contexte 
+de manière détaillée mais concise. Si c'est une interface, explique chaque élément visible."""
+
+REASONING_PROMPT = """Raisonne étape par étape. Décompose le problème, analyse les options, 
+et donne une réponse logique et structurée. Sois concis mais complet."""
+
+SEARCH_PROMPT = """Recherche des informations précises et récentes sur ce sujet. 
+Utilise Tavily pour trouver des sources fiables. Résume les points clés en 3-5 phrases maximum."""
+
+EXPLAIN_APP_PROMPT = """Tu es un guide expert de l'application CENTER. 
+L'application CENTER est une plateforme de gestion d'employés avec:
+- 👤 Gestion des profils employés (photos, informations)
+- 🤖 Chat intelligent avec Kibali Agent (IA multimodale)
+- 📸 Reconnaissance faciale pour pointage
+- 📊 Tableau de bord et statistiques
+- 🔐 Authentification sécurisée
+
+Explique clairement et simplement comment utiliser les fonctionnalités. 
+Donne des instructions étape par étape si nécessaire."""
+
+TECHNICAL_PROMPT = """Tu es un expert technique. Explique les concepts de manière claire 
+avec des exemples concrets. Adapte ton niveau selon l'utilisateur."""
+
+CREATIVE_PROMPT = """Génère du contenu créatif et original. Sois innovant dans tes propositions 
+tout en restant pertinent et utile."""
+
+PROBLEM_SOLVING_PROMPT = """Analyse le problème, identifie les causes possibles, 
+et propose des solutions concrètes et applicables immédiatement."""
+
+SUMMARIZATION_PROMPT = """Résume l'information en gardant uniquement les points essentiels. 
+Sois ultra-concis : maximum 3-4 phrases pour tout résumé."""
+
+CONVERSATION_PROMPT = """Maintiens une conversation naturelle et engageante. 
+Pose des questions de clarification si nécessaire. Sois amical mais professionnel."""
+
+# Paramètres de performance optimisés
+MAX_TOKENS_FAST = 150  # Réponses rapides
+MAX_TOKENS_NORMAL = 300  # Réponses standard
+TEMPERATURE_PRECISE = 0.3  # Précis et factuel
+TEMPERATURE_BALANCED = 0.7  # Équilibré
+
+# Plafonds en tokens par élément de contexte (remplacent [:150] / [:200])
+MEMORY_ITEM_MAX_TOKENS = 200
+WEB_ITEM_MAX_TOKENS = 150
+HISTORY_ITEM_MAX_TOKENS = 200
+HISTORY_MAX_TOKENS = 600
+SUMMARY_SECTION_MAX_TOKENS = 300
+
+# ==========================================
+# DÉTECTION AUTOMATIQUE DE L'IP
+# ==========================================
+
+def get_local_ip():
+    """Détecte l'IP locale du réseau"""
+    try:
+        # Créer une socket pour obtenir l'IP locale
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        local_ip = s.getsockname()[0]
+        s.close()
+        return local_ip
+    except Exception:
+        return "127.0.0.1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage non bloquant: uvicorn ouvre le port aussitôt, les modèles se
+    chargent dans un thread (routes en 503 jusque-là, /health/live répond)
+    """
+    startup_phase("app_setup")
+    if chat_manager is None:
+        threading.Thread(target=load_chat_manager, name="startup", daemon=True).start()
+    yield
+
+app = FastAPI(title="Chat Agent API", version="1.0.0", lifespan=lifespan)
+
+# CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# ==========================================
+# MÉTRIQUES HTTP
+# ==========================================
+
+HTTP_REQUESTS = METRICS.counter("http_requests_total", "Requêtes HTTP par route et statut", ["method", "route", "status"])
+HTTP_DURATION = METRICS.histogram("http_request_duration_seconds", "Latence par route (jusqu'aux en-têtes pour les flux)", ["method", "route"])
+HTTP_IN_FLIGHT = METRICS.gauge("http_requests_in_flight", "Requêtes HTTP en cours")
+EMBEDDING_DURATION = METRICS.histogram("embedding_duration_seconds", "Calcul d'embeddings MiniLM (hors cache)", ["kind"])
+FAISS_SEARCH_DURATION = METRICS.histogram("faiss_search_duration_seconds", "Recherche k-NN dans l'index FAISS")
+
+# Mode multi-workers: chaque worker uvicorn a son propre registre. Le label
+# `worker` (pid) sépare leurs séries, sinon des scrapes successifs lisent des
+# processus différents et Prometheus y voit des remises à zéro.
+if os.getenv("MODEL_SERVER_SOCKET"):
+    METRICS.constant_labels["worker"] = str(os.getpid())
+
+def route_template(request: Request) -> str:
+    """Gabarit de la route (/pdf/{filename}), pour borner la cardinalité des labels"""
+    route = request.scope.get("route")
+    if route is None:
+        endpoint = request.scope.get("endpoint")
+        route = next((r for r in app.routes if getattr(r, "endpoint", None) is endpoint), None) if endpoint else None
+    return getattr(route, "path", None) or "<unmatched>"
+
+@app.middleware("http")
+async def record_http_metrics(request: Request, call_next):
+    """Latence, statut et requêtes en cours de chaque route"""
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = route_template(request)
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status))
+        HTTP_DURATION.observe(time.perf_counter() - start, method=request.method, route=route)
+
+# ==========================================
+# PROFILAGE À LA DEMANDE
+# ==========================================
+
+# Requêtes simultanées pendant une session (piles de tout le processus)
+PROFILER.concurrency_probe = HTTP_IN_FLIGHT.value
+
+class ProfilingService:
+    """Sessions de profilage de ce processus, en données simples (appelables à distance)"""
+    
+    def start_profile(
+        self,
+        kind: str,
+        label: str = "",
+        seconds: Optional[float] = None,
+        memory: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        session = PROFILER.start(kind, label=label, seconds=seconds, track_memory=memory)
+        if session is None:
+            return None
+        return {"id": session.id, "seconds": min(seconds or PROFILER.max_seconds, PROFILER.max_seconds)}
+    
+    def stop_profile(self, session_id: str):
+        PROFILER.stop(session_id)
+    
+    def profile_sessions(self) -> List[Dict[str, Any]]:
+        return PROFILER.sessions()
+    
+    def profile_result(self, session_id: str, format: str = "json", top: int = 30) -> Optional[Dict[str, Any]]:
+        """Résumé (et piles collapsed si demandées et la session terminée), None si inconnue"""
+        session = PROFILER.get(session_id)
+        if session is None:
+            return None
+        running = session.running
+        return {
+            "running": running,
+            "summary": session.summary(top),
+            "collapsed": session.collapsed() if format == "collapsed" and not running else None
+        }
+
+LOCAL_PROFILING = ProfilingService()
+
+def profiling_service():
+    """
+    Processus à profiler: celui qui exécute l'inférence
+    
+    En mode multi-workers, le serveur de modèles (sessions partagées par tous
+    les workers); sinon ce processus.
+    """
+    if isinstance(chat_manager, RemoteChatManager):
+        return chat_manager
+    return LOCAL_PROFILING
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    Profiler une requête avec l'en-tête X-Profile (réservé à l'administration)
+    
+    X-Profile: 1 échantillonne les piles pendant la requête (flux compris),
+    X-Profile: memory suit aussi les allocations. Le résultat se consulte via
+    GET /admin/profile/{id}, id renvoyé dans l'en-tête X-Profile-Id.
+    Les piles sont celles de tout le processus pendant la requête
+    (X-Profile-Scope: process): à lire avec peak_requests_in_flight.
+    En mode multi-workers, c'est le serveur de modèles qui est profilé.
+    Sans en-tête: une seule lecture de dictionnaire, aucun coût.
+    """
+    mode = request.headers.get("x-profile")
+    if not mode:
+        return await call_next(request)
+    try:
+        verify_admin_token(request.headers.get("x-admin-token"))
+    except HTTPException as e:
+        return JSONResponse(status_code=e.status_code, content={"detail": e.detail})
+    
+    profiling = profiling_service()
+    try:
+        session = await asyncio.to_thread(
+            profiling.start_profile,
+            "request",
+            label=f"{request.method} {request.url.path}",
+            memory=mode.lower() == "memory"
+        )
+    except (OSError, EOFError) as e:
+        return JSONResponse(status_code=503, content={"detail": f"Serveur de modèles injoignable: {e}"})
+    if session is None:
+        return JSONResponse(status_code=409, content={"detail": "Trop de sessions de profilage actives"})
+    
+    try:
+        response = await call_next(request)
+    except BaseException:
+        await asyncio.to_thread(profiling.stop_profile, session["id"])
+        raise
+    
+    body = response.body_iterator
+    
+    async def profiled_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            await asyncio.to_thread(profiling.stop_profile, session["id"])
+    
+    response.body_iterator = profiled_body()
+    response.headers["X-Profile-Id"] = session["id"]
+    response.headers["X-Profile-Scope"] = "process"
+    return response
+
+# ==========================================
+# MODÈLES PYDANTIC
+# ==========================================
+
+class ChatMessage(BaseModel):
+    role: str  # 'user' ou 'assistant'
+    content: str
+    images: Optional[List[str]] = None  # URLs ou base64
+    timestamp: Optional[str] = None
+
+class ChatRequest(BaseModel):
+    message: str
+    conversation_id: Optional[str] = None
+    use_vision: bool = True
+    use_memory: bool = True
+    temperature: float = 0.7
+    debug: bool = False  # Renvoyer la trace des étapes (durées, tokens, caches)
+
+class ChatBatchRequest(BaseModel):
+    questions: List[str]
+    use_memory: bool = True
+    use_web: bool = False  # Questions sur les documents: pas de recherche internet par défaut
+    k: int = 5  # Documents FAISS par question
+
+class ChatResponse(BaseModel):
+    response: str
+    conversation_id: str
+    sources: Optional[List[Dict[str, Any]]] = None
+    reasoning: Optional[str] = None
+    timestamp: str
+    debug: Optional[Dict[str, Any]] = None
+
+# ==========================================
+# GESTIONNAIRE DE MÉMOIRE VECTORIELLE FAISS
+# ==========================================
+
+class FAISSMemoryManager:
+    """Gestionnaire de mémoire avec FAISS pour recherche vectorielle"""
+    
+    def __init__(
+        self,
+        embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        conversation_store: Optional[ConversationStore] = None,
+        embedder: Optional[Any] = None
+    ):
+        """
+        Args:
+            embedder: Modèle d'embeddings déjà construit (méthode `encode`,
+                ex: StubEmbedder des benchmarks) à la place de SentenceTransformer
+        """
+        self.embedding_model_name = getattr(embedder, "name", embedding_model) if embedder is not None else embedding_model
+        if embedder is not None:
+            self.embedding_model = embedder
+        else:
+            try:
+                # Essayer de charger le modèle depuis le cache local (importe torch)
+                from sentence_transformers import SentenceTransformer
+                self.embedding_model = SentenceTransformer(embedding_model, local_files_only=True)
+            except Exception as e:
+                logger.warning(f"⚠️ Impossible de charger le modèle d'embeddings: {e}")
+                logger.info("ℹ️ Fonctionnement sans recherche vectorielle FAISS")
+                self.embedding_model = None
+        
+        self.dimension = 384  # Dimension des embeddings MiniLM
+        
+        # Cache LRU des embeddings de requêtes (texte normalisé -> vecteur)
+        self.query_cache = EmbeddingCache(int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")))
+        
+        # Index FAISS (IndexFlatL2 pour recherche exacte)
+        import faiss
+        self.index = faiss.IndexFlatL2(self.dimension) if self.embedding_model else None
+        
+        # Stockage des métadonnées (même ordre que les vecteurs de l'index)
+        self.documents: List[Dict[str, Any]] = []
+        self.document_embeddings: List[np.ndarray] = []
+        
+        # Identifiants stables (survivent aux suppressions) et statistiques incrémentales
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
+        self.corpus = CorpusIndex()
+        self._lock = threading.RLock()
+        
+        # Conversations (SQLite append-only + queue chaude en mémoire)
+        self.conversations = conversation_store or ConversationStore()
+        
+        if self.embedding_model:
+            logger.info(f"✅ FAISS Memory Manager initialisé (dim={self.dimension})")
+        else:
+            logger.info("✅ Memory Manager initialisé (mode simple sans FAISS)")
+    
+    def add_document(
+        self,
+        text: str,
+        metadata: Dict[str, Any],
+        doc_type: str = "text"
+    ) -> int:
+        """Ajouter un document à la mémoire vectorielle"""
+        
+        if not self.embedding_model:
+            # Mode simple : juste stocker sans embeddings
+            with self._lock:
+                return self._store(text, metadata, doc_type)
+        
+        # Mode FAISS : avec embeddings
+        # Générer l'embedding
+        embedding = self.embedding_model.encode([text])[0]
+        
+        with self._lock:
+            # Ajouter à FAISS
+            self.index.add(np.array([embedding], dtype=np.float32))
+            
+            # Stocker les métadonnées
+            doc_id = self._store(text, metadata, doc_type)
+            self.document_embeddings.append(embedding)
+        
+        logger.info(f"📄 Document ajouté: {doc_type} (ID: {doc_id})")
+        return doc_id
+    
+    def add_documents(self, items: List[Tuple[str, Dict[str, Any], str]]) -> List[int]:
+        """
+        Ajouter plusieurs documents (texte, métadonnées, type) en une fois:
+        un seul passage du modèle d'embeddings, un seul ajout FAISS
+        """
+        if not items:
+            return []
+        
+        embeddings = None
+        if self.embedding_model:
+            embeddings = np.asarray(self.embedding_model.encode([text for text, _, _ in items]), dtype=np.float32)
+        
+        with self._lock:
+            if embeddings is not None:
+                self.index.add(embeddings)
+                self.document_embeddings.extend(embeddings)
+            doc_ids = [self._store(text, metadata, doc_type) for text, metadata, doc_type in items]
+        
+        logger.info(f"📄 {len(doc_ids)} documents ajoutés (IDs {doc_ids[0]}-{doc_ids[-1]})")
+        return doc_ids
+    
+    def _store(self, text: str, metadata: Dict[str, Any], doc_type: str) -> int:
+        """Enregistrer les métadonnées d'un document (sous verrou)"""
+        doc_id = self._next_id
+        self._next_id += 1
+        doc = {
+            "id": doc_id,
+            "text": text,
+            "type": doc_type,
+            "metadata": metadata,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.documents.append(doc)
+        self._by_id[doc_id] = doc
+        self.corpus.add(doc)
+        return doc_id
+    
+    def get_document(self, doc_id: int) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(doc_id)
+    
+    def documents_for_file(self, filename: str) -> List[Dict[str, Any]]:
+        """Documents d'un fichier, via l'index par nom (sans parcourir la mémoire)"""
+        with self._lock:
+            return [self._by_id[doc_id] for doc_id in self.corpus.doc_ids(filename) if doc_id in self._by_id]
+    
+    def delete_documents(self, doc_ids: List[int]) -> int:
+        """
+        Supprimer des documents (vecteurs FAISS et métadonnées)
+        
+        Returns:
+            Nombre de documents supprimés (0 si l'index FAISS est désaligné
+            des métadonnées et ne peut pas être reconstruit)
+        """
+        with self._lock:
+            removed = {doc_id for doc_id in doc_ids if doc_id in self._by_id}
+            if not removed:
+                return 0
+            
+            if self.index is not None and self.index.ntotal != len(self.documents):
+                if len(self.document_embeddings) != len(self.documents):
+                    # Retirer les seules métadonnées creuserait l'écart: la recherche
+                    # renverrait d'autres documents que ceux trouvés par FAISS
+                    logger.error(
+                        f"❌ Suppression refusée: index FAISS ({self.index.ntotal} vecteurs) désaligné "
+                        f"des documents ({len(self.documents)}), embeddings indisponibles pour le reconstruire"
+                    )
+                    return 0
+                logger.warning(
+                    f"⚠️ Index FAISS désaligné ({self.index.ntotal} vecteurs, {len(self.documents)} documents): "
+                    f"reconstruction depuis les embeddings"
+                )
+                self.index.reset()
+                self.index.add(np.array(self.document_embeddings, dtype=np.float32))
+            
+            positions = [i for i, doc in enumerate(self.documents) if doc["id"] in removed]
+            if self.index is not None:
+                # IndexFlat compacte en conservant l'ordre: positions toujours alignées sur self.documents
+                self.index.remove_ids(np.array(positions, dtype=np.int64))
+            if len(self.document_embeddings) == len(self.documents):
+                kept = set(range(len(self.documents))) - set(positions)
+                self.document_embeddings = [self.document_embeddings[i] for i in sorted(kept)]
+            
+            self.documents = [doc for doc in self.documents if doc["id"] not in removed]
+            for doc_id in removed:
+                self.corpus.remove(self._by_id.pop(doc_id))
+        
+        logger.info(f"🗑️ {len(removed)} document(s) supprimé(s)")
+        return len(removed)
+    
+    def delete_file(self, filename: str) -> int:
+        """Supprimer tous les documents d'un fichier (chunks, images extraites)"""
+        return self.delete_documents(self.corpus.doc_ids(filename))
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeddings d'une liste de textes (matrice float32 n × dim)"""
+        return np.asarray(self.embedding_model.encode(texts), dtype=np.float32)
+    
+    def _embed_uncached(self, query: str) -> np.ndarray:
+        current_span().update(cache_hit=False, model=self.embedding_model_name)
+        with EMBEDDING_DURATION.time(kind="query"):
+            vector = self.embed([query])[0]
+        vector.setflags(write=False)  # Partagé via le cache: lecture seule
+        return vector
+    
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """Embedding d'une requête, via le cache LRU (None en mode simple sans modèle)"""
+        if not self.embedding_model:
+            return None
+        with span("embedding.query", cache_hit=True):
+            return self.query_cache.get_or_compute(query, self._embed_uncached)
+    
+    def query(self, text: str) -> QueryEmbedding:
+        """Contexte d'embedding d'une requête (un seul calcul partagé par toutes les étapes)"""
+        return QueryEmbedding(text, self.embed_query)
+    
+    def embed_queries(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Embeddings de plusieurs requêtes: cache LRU d'abord, puis un seul
+        passage du modèle pour les manquantes (doublons calculés une fois)
+        """
+        if not self.embedding_model:
+            return [None] * len(texts)
+        
+        keys = [normalize_text(text) for text in texts]
+        vectors = [self.query_cache.get(key) for key in keys]
+        missing: Dict[str, List[int]] = {}
+        for i, (key, vector) in enumerate(zip(keys, vectors)):
+            if vector is None:
+                missing.setdefault(key, []).append(i)
+        
+        if missing:
+            with span("embedding.batch", texts=len(missing), cached=len(texts) - sum(map(len, missing.values()))), \
+                    EMBEDDING_DURATION.time(kind="batch"):
+                computed = self.embed([texts[indices[0]] for indices in missing.values()])
+            for (key, indices), vector in zip(missing.items(), computed):
+                vector = vector.copy()
+                vector.setflags(write=False)  # Partagé via le cache: lecture seule
+                self.query_cache.put(key, vector)
+                for i in indices:
+                    vectors[i] = vector
+        return vectors
+    
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[np.ndarray] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rechercher les documents les plus similaires
+        
+        Args:
+            query_embedding: Embedding déjà calculé pour `query` (évite un
+                second passage du modèle, ex: partagé avec le routeur d'intention)
+        """
+        
+        if not self.embedding_model:
+            # Mode simple : retourner les derniers documents
+            return self.documents[-k:] if self.documents else []
+        
+        if self.index.ntotal == 0:
+            return []
+        
+        # Embedding de la requête (fourni, en cache, ou calculé)
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        
+        results = self.search_by_vector(query_embedding, k)
+        logger.info(f"🔍 Recherche: {len(results)} résultats pour '{query[:50]}...'")
+        return results
+    
+    def search_by_vector(self, query_embedding: np.ndarray, k: int = 5) -> List[Dict[str, Any]]:
+        """Rechercher les documents les plus proches d'un embedding déjà calculé"""
+        return self.search_many([query_embedding], k)[0]
+    
+    def search_many(self, query_embeddings: List[np.ndarray], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """Recherche k-NN de plusieurs embeddings en une seule requête FAISS (matrice n × dim)"""
+        if not self.embedding_model:
+            latest = self.documents[-k:] if self.documents else []
+            return [list(latest) for _ in query_embeddings]
+        
+        if self.index.ntotal == 0 or not query_embeddings:
+            return [[] for _ in query_embeddings]
+        
+        # Recherche dans FAISS (verrou: une suppression concurrente décalerait les positions)
+        with self._lock:
+            with span("faiss.search", k=k, queries=len(query_embeddings), index_size=self.index.ntotal), \
+                    FAISS_SEARCH_DURATION.time():
+                distances, indices = self.index.search(
+                    np.asarray(np.stack(query_embeddings), dtype=np.float32),
+                    min(k, self.index.ntotal)
+                )
+            documents = self.documents
+        
+        # Récupérer les documents
+        results = []
+        for row_distances, row_indices in zip(distances, indices):
+            docs = []
+            for distance, idx in zip(row_distances, row_indices):
+                if idx != -1:
+                    doc = documents[idx].copy()
+                    doc["similarity"] = float(1 / (1 + distance))  # Convertir distance en similarité
+                    docs.append(doc)
+            results.append(docs)
+        
+        return results
+    
+    def add_to_conversation(self, conv_id: str, message: ChatMessage):
+        """Ajouter un message à une conversation"""
+        self.conversations.append(conv_id, message.dict())
+    
+    def get_conversation(self, conv_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
+        """Récupérer les derniers messages d'une conversation (queue chaude)"""
+        return [
+            ChatMessage(**{k: v for k, v in msg.items() if k != "seq"})
+            for msg in self.conversations.tail(conv_id, limit)
+        ]
+    
+    def save_to_disk(self, path: str):
+        """Sauvegarder l'index FAISS sur disque"""
+        with self._lock:
+            if self.index is not None:
+                import faiss
+                faiss.write_index(self.index, f"{path}/faiss.index")
+            
+            with open(f"{path}/documents.json", "w", encoding="utf-8") as f:
+                json.dump(self.documents, f, ensure_ascii=False, indent=2)
+            
+            with open(f"{path}/corpus_index.json", "w", encoding="utf-8") as f:
+                json.dump({**self.corpus.to_dict(), "next_id": self._next_id}, f, ensure_ascii=False)
+        
+        logger.info(f"💾 Index FAISS sauvegardé: {path}")
+    
+    def warmup(self) -> Dict[str, Any]:
+        """Préchauffer l'embedder et la recherche FAISS (mini requête)"""
+        if not self.embedding_model:
+            return {"enabled": False}
+        
+        report = {"enabled": True}
+        start = time.perf_counter()
+        embedding = self.embedding_model.encode(["préchauffage de la mémoire"])[0]
+        report["embedding_seconds"] = round(time.perf_counter() - start, 3)
+        
+        if self.index.ntotal > 0:
+            start = time.perf_counter()
+            self.index.search(np.array([embedding], dtype=np.float32), 1)
+            report["search_seconds"] = round(time.perf_counter() - start, 3)
+        
+        return report
+    
+    def load_from_disk(self, path: str):
+        """Charger l'index FAISS depuis le disque"""
+        index_path = f"{path}/faiss.index"
+        docs_path = f"{path}/documents.json"
+        
+        if os.path.exists(index_path):
+            import faiss
+            self.index = faiss.read_index(index_path)
+            logger.info(f"📂 Index FAISS chargé: {self.index.ntotal} vecteurs")
+        
+        if os.path.exists(docs_path):
+            with open(docs_path, "r", encoding="utf-8") as f:
+                self.documents = json.load(f)
+            logger.info(f"📂 {len(self.documents)} documents chargés")
+        
+        self._by_id = {doc["id"]: doc for doc in self.documents}
+        self._next_id = max(self._by_id, default=-1) + 1
+        
+        corpus_path = f"{path}/corpus_index.json"
+        saved: Dict[str, Any] = {}
+        if os.path.exists(corpus_path):
+            try:
+                with open(corpus_path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Index du corpus illisible: {e}")
+        if self.corpus.load(saved, len(self.documents)):
+            self._next_id = max(self._next_id, saved.get("next_id", 0))
+        else:
+            # Mémoire antérieure à l'index (ou désynchronisée): un seul parcours au chargement
+            self.corpus.rebuild(self.documents)
+            if self.documents:
+                logger.info(f"🗂️ Index du corpus reconstruit ({len(self.corpus.files)} fichiers)")
+
+# ==========================================
+# IMAGES
+# ==========================================
+
+def flatten_image(image):
+    """Image en RGB (transparence posée sur fond blanc), format attendu par SmolVLM"""
+    from PIL import Image
+    
+    if image.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
+        logger.info(f"🔄 Image convertie de {image.mode} en RGB")
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+# ==========================================
+# GESTIONNAIRE DE CHAT
+# ==========================================
+
+class ChatAgentManager:
+    """Gestionnaire principal du chat agent"""
+    
+    def __init__(
+        self,
+        agent: Optional[UnifiedAgent] = None,
+        embedder: Optional[Any] = None,
+        storage_path: Optional[str] = None
+    ):
+        """
+        Args:
+            agent: Agent déjà construit (None = UnifiedAgent avec les vrais modèles)
+            embedder: Modèle d'embeddings de la mémoire (None = MiniLM)
+            storage_path: Dossier de la mémoire et des conversations
+                (None = storage/chat_memory)
+        """
+        self.agent = agent or UnifiedAgent()
+        
+        # Créer le dossier de stockage
+        self.storage_path = Path(storage_path) if storage_path else Path(__file__).parent / "storage" / "chat_memory"
+        self.storage_path.mkdir(parents=True, exist_ok=True)
+        
+        self.conversations = ConversationStore(
+            str(self.storage_path / "conversations.db"),
+            hot_tail=int(os.getenv("CONVERSATION_HOT_TAIL", "20")),
+            max_hot_conversations=int(os.getenv("CONVERSATION_HOT_MAX", "1000")),
+            retention_days=float(os.getenv("CONVERSATION_RETENTION_DAYS", "30"))
+        )
+        self.memory = FAISSMemoryManager(conversation_store=self.conversations, embedder=embedder)
+        
+        # Routeur d'intention: centroïdes comparés à l'embedding de la requête
+        self.intent_router = None
+        if self.memory.embedding_model and os.getenv("INTENT_ROUTER", "1") != "0":
+            self.intent_router = IntentRouter(
+                embed=self.memory.embed,
+                model_name=self.memory.embedding_model_name,
+                threshold=float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.45")),
+                margin=float(os.getenv("INTENT_ROUTER_MARGIN", "0.04")),
+                cache_path=str(self.storage_path / "intent_centroids.npz")
+            )
+        
+        # Résumé glissant des longues conversations (thread d'arrière-plan)
+        self.summarizer = ConversationSummarizer(
+            self.conversations,
+            generate=lambda prompt, max_tokens: self.agent.generate(prompt, max_tokens, load=False),
+            count_tokens=self.agent.count_tokens,
+            trigger_tokens=int(os.getenv("SUMMARY_TRIGGER_TOKENS", "1200")),
+            keep_recent=int(os.getenv("SUMMARY_KEEP_RECENT", "6")),
+            max_summary_tokens=int(os.getenv("SUMMARY_MAX_TOKENS", "250"))
+        )
+        
+        # Charger la mémoire existante
+        self.memory.load_from_disk(str(self.storage_path))
+        
+        # Préchauffage: outils requis avant de déclarer l'instance prête
+        self.started_at = time.time()
+        self.ready_tools = [
+            k.strip() for k in os.getenv("READY_TOOLS", "llm,vision").split(",") if k.strip()
+        ]
+        self.warmup_report: Dict[str, Any] = {"status": "pending"}
+        
+        logger.info("✅ Chat Agent Manager initialisé")
+    
+    def start_warmup(self):
+        """Lancer le préchauffage en arrière-plan (ne bloque pas le démarrage)"""
+        threading.Thread(target=self._run_warmup, name="warmup", daemon=True).start()
+    
+    def _run_warmup(self):
+        """Charger + préchauffer les outils requis, l'embedder et FAISS"""
+        logger.info(f"🔥 Préchauffage: {', '.join(self.ready_tools)} + mémoire FAISS...")
+        start = time.perf_counter()
+        self.warmup_report = {"status": "running", "started_at": datetime.now().isoformat()}
+        
+        try:
+            self.warmup_report["memory"] = self.memory.warmup()
+            if self.intent_router:
+                self.intent_router.build()
+        except Exception as e:
+            logger.warning(f"⚠️ Préchauffage mémoire échoué: {e}")
+            self.warmup_report["memory"] = {"enabled": True, "error": str(e)}
+        
+        tools_ok = self.agent.warmup(self.ready_tools)
+        
+        self.warmup_report["status"] = "completed" if tools_ok else "incomplete"
+        self.warmup_report["total_seconds"] = round(time.perf_counter() - start, 3)
+        self.warmup_report["completed_at"] = datetime.now().isoformat()
+        logger.info(f"🔥 Préchauffage {self.warmup_report['status']} en {self.warmup_report['total_seconds']:.1f}s")
+    
+    def readiness(self) -> Dict[str, Any]:
+        """État de préparation par outil (pour /health/ready)"""
+        registry = self.agent.registry
+        models_status = registry.status()
+        
+        tools = {}
+        for key in self.ready_tools:
+            info = models_status.get(key)
+            if info is None:
+                continue  # Outil désactivé dans cette configuration
+            tools[key] = {
+                "warm": registry.is_warm(key),
+                "state": info["state"],
+                "load_seconds": info["load_seconds"],
+                "warmup_seconds": info["warmup_seconds"],
+                "error": info["error"] or info["warmup_error"]
+            }
+        
+        memory_report = self.warmup_report.get("memory")
+        memory_ok = bool(memory_report) and "error" not in memory_report
+        
+        return {
+            "ready": memory_ok and all(t["warm"] for t in tools.values()),
+            "tools": tools,
+            "memory": memory_report,
+            "warmup": {k: v for k, v in self.warmup_report.items() if k != "memory"}
+        }
+    
+    # ==========================================
+    # OPÉRATIONS DES ROUTES (LOCALES OU VIA LE SERVEUR DE MODÈLES)
+    # ==========================================
+    
+    def models_status(self) -> Dict[str, Any]:
+        """État des modèles (chargement à la demande, déchargement sur inactivité)"""
+        return self.agent.get_status()
+    
+    def triggers_info(self) -> Dict[str, Any]:
+        return {
+            **self.agent.triggers.stats(),
+            "tables": self.agent.triggers.matcher.tables
+        }
+    
+    def reload_triggers(self) -> Dict[str, Any]:
+        return self.agent.triggers.reload()
+    
+    def synthesize_speech(self, text: str) -> Optional[Dict[str, Any]]:
+        return self.agent.synthesize_speech(text)
+    
+    def audio_path(self, clip: str) -> Optional[str]:
+        """Chemin d'un clip du cache audio (None s'il n'existe pas)"""
+        path = self.agent.audio_cache.path_for(clip)
+        return str(path) if path is not None and path.exists() else None
+    
+    def conversation_page(self, conv_id: str, limit: int, before: Optional[int] = None) -> Dict[str, Any]:
+        return self.conversations.page(conv_id, limit=limit, before=before)
+    
+    def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        return self.memory.search(query, k)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques de la mémoire avec détails RAG PDF (compteurs incrémentaux)"""
+        return {
+            "total_documents": len(self.memory.documents),
+            "total_vectors": self.memory.index.ntotal,
+            "conversations": self.conversations.count(),
+            "summarizer": self.summarizer.stats(),
+            "web_search": self.agent.web_search.stats(),
+            "intent_router": self.intent_router.stats() if self.intent_router else None,
+            "embedding_dimension": self.memory.dimension,
+            "embedding_cache": self.memory.query_cache.stats(),
+            "audio_cache": self.agent.audio_cache.stats(),
+            "rag_statistics": self.memory.corpus.stats()
+        }
+    
+    def clear(self):
+        """Effacer toute la mémoire"""
+        self.conversations.clear()
+        self.memory = FAISSMemoryManager(
+            self.memory.embedding_model_name,
+            conversation_store=self.conversations,
+            embedder=self.memory.embedding_model  # Modèle déjà chargé
+        )
+    
+    def pdf_details(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Détails d'un PDF (index par nom de fichier), None s'il est inconnu"""
+        memory = self.memory
+        summary = memory.corpus.file_stats(filename)
+        if summary is None:
+            return None
+        
+        chunks = []
+        for doc_id in memory.corpus.chunk_ids(filename):
+            doc = memory.get_document(doc_id)
+            if doc is None:
+                continue
+            metadata = doc.get("metadata", {})
+            chunks.append({
+                "chunk_index": metadata.get("chunk_index", doc_id),
+                "chunk_size": metadata.get("chunk_size", len(doc.get("text", ""))),
+                "preview": doc.get("text", "")[:200] + "...",
+                "doc_id": doc_id
+            })
+        
+        return {
+            "filename": filename,
+            **summary,
+            "chunks": sorted(chunks, key=lambda x: x.get("chunk_index", 0))
+        }
+    
+    def delete_file(self, filename: str) -> int:
+        """Retirer un fichier de la base et persister (nombre de documents retirés)"""
+        removed = self.memory.delete_file(filename)
+        if removed:
+            self.memory.save_to_disk(str(self.storage_path))
+        return removed
+    
+    def service_metrics(self) -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+        """Valeurs lues au scrape: tailles, caches, files d'attente, modèles"""
+        memory = self.memory
+        agent = self.agent
+        embedding_cache = memory.query_cache.stats()
+        web = agent.web_search.stats()
+        audio = agent.audio_cache.stats()
+        registry = agent.registry.status()
+        llm_tiers = [key for key in ("llm", "llm_small") if key in agent.tools]
+        
+        def cache_samples(stats: Dict[str, Any], extra: Dict[str, int]) -> List[Tuple[Dict[str, str], float]]:
+            return [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])] + [
+                ({"result": result}, value) for result, value in extra.items()
+            ]
+        
+        return [
+            ("faiss_index_vectors", "gauge", "Vecteurs dans l'index FAISS",
+             [({}, memory.index.ntotal if memory.index is not None else 0)]),
+            ("memory_documents", "gauge", "Documents en mémoire", [({}, len(memory.documents))]),
+            ("embedding_cache_lookups_total", "counter", "Recherches dans le cache d'embeddings",
+             cache_samples(embedding_cache, {})),
+            ("web_search_lookups_total", "counter", "Recherches web par issue",
+             cache_samples(web, {"coalesced": web["coalesced"], "error": web["errors"],
+                                 "timeout": web["timeouts"], "short_circuited": web["short_circuited"]})),
+            ("web_search_breaker_open", "gauge", "Disjoncteur de la recherche web ouvert (1) ou non (0)",
+             [({}, 0 if web["breaker"]["state"] == "closed" else 1)]),
+            ("audio_cache_lookups_total", "counter", "Recherches dans le cache audio", cache_samples(audio, {})),
+            ("audio_cache_bytes", "gauge", "Taille du cache audio", [({}, agent.audio_cache.total_bytes)]),
+            ("summarizer_queue_depth", "gauge", "Conversations en attente de résumé",
+             [({}, self.summarizer.stats()["queued"])]),
+            ("llm_requests_in_flight", "gauge", "Générations en cours par tier",
+             [({"tier": key}, (agent.tools[key].load_info() or (0, 0))[0]) for key in llm_tiers]),
+            ("llm_workers", "gauge", "Workers llama.cpp chargés par tier",
+             [({"tier": key}, (agent.tools[key].load_info() or (0, 0))[1]) for key in llm_tiers]),
+            ("model_loaded", "gauge", "Modèle chargé et prêt (1) ou non (0)",
+             [({"tool": key}, 1 if info["state"] == "ready" else 0) for key, info in registry.items()]),
+            ("model_in_use", "gauge", "Appels en cours par modèle",
+             [({"tool": key}, info["in_use"]) for key, info in registry.items()]),
+            ("model_load_seconds", "gauge", "Durée du dernier chargement par modèle",
+             [({"tool": key}, info["load_seconds"]) for key, info in registry.items()]),
+        ]
+    
+    def detect_intent(
+        self,
+        message: str,
+        triggers: Optional[TriggerMatch] = None,
+        query: Optional[QueryEmbedding] = None
+    ) -> str:
+        """
+        Détecter l'intention de l'utilisateur
+        
+        Mots-clés d'abord, puis routeur par embeddings s'il est confiant.
+        
+        Args:
+            triggers: Déclencheurs déjà calculés pour ce message (évite une passe)
+            query: Embedding paresseux du message (celui utilisé par FAISS)
+        """
+        return self.detect_intent_scored(message, triggers, query)[0]
+    
+    def detect_intent_scored(
+        self,
+        message: str,
+        triggers: Optional[TriggerMatch] = None,
+        query: Optional[QueryEmbedding] = None
+    ) -> Tuple[str, Optional[float]]:
+        """
+        Intention et confiance du routeur (None = mots-clés seuls)
+        
+        L'embedding n'est calculé que si le routeur existe (INTENT_ROUTER=1).
+        """
+        keyword_intent = self.detect_keyword_intent(message, triggers)
+        if self.intent_router is None:
+            return keyword_intent, None
+        return self.intent_router.route_scored(query.vector if query is not None else None, keyword_intent)
+    
+    def detect_keyword_intent(self, message: str, triggers: Optional[TriggerMatch] = None) -> str:
+        """Intention déduite des seuls mots-clés"""
+        if triggers is None:
+            triggers = self.agent.triggers.match(message)
+        
+        # Recherche sur internet
+        if "intent_search" in triggers:
+            return "search"
+        
+        # Explication de l'application
+        if "intent_explain_action" in triggers and "intent_explain_subject" in triggers:
+            return "explain_app"
+        
+        # Problème technique
+        if "intent_problem" in triggers:
+            return "problem_solving"
+        
+        # Résumé
+        if "intent_summary" in triggers:
+            return "summarization"
+        
+        # Créatif
+        if "intent_creative" in triggers:
+            return "creative"
+        
+        # Par défaut : conversation normale
+        return "conversation"
+    
+    def get_prompt_by_intent(self, intent: str) -> str:
+        """Obtenir le prompt approprié selon l'intention"""
+        prompts = {
+            "search": SEARCH_PROMPT,
+            "explain_app": EXPLAIN_APP_PROMPT,
+            "problem_solving": PROBLEM_SOLVING_PROMPT,
+            "summarization": SUMMARIZATION_PROMPT,
+            "creative": CREATIVE_PROMPT,
+            "reasoning": REASONING_PROMPT,
+            "technical": TECHNICAL_PROMPT,
+            "conversation": CONVERSATION_PROMPT
+        }
+        return prompts.get(intent, CONVERSATION_PROMPT)
+    
+    def process_upload(
+        self,
+        file_content: bytes,
+        filename: Optional[str],
+        file_type: Optional[str],
+        description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Traiter un fichier uploadé (image ou PDF) - Supporte TOUS les formats
+        
+        Bloquant (vision, LLM, FAISS): à appeler hors de la boucle d'événements.
+        """
+        from PIL import Image
+        
+        results = {"filename": filename, "type": file_type, "documents": []}
+        
+        try:
+            # === DÉTECTION UNIVERSELLE DU TYPE DE FICHIER ===
+            original_type = file_type
+            
+            # Liste complète des extensions d'images supportées
+            image_extensions = [
+                'jpg', 'jpeg', 'jpe', 'jfif',  # JPEG
+                'png', 'apng',                  # PNG
+                'gif',                          # GIF
+                'bmp', 'dib',                   # Bitmap
+                'webp',                         # WebP
+                'tiff', 'tif',                  # TIFF
+                'svg', 'svgz',                  # SVG
+                'ico', 'cur',                   # Icon
+                'heic', 'heif',                 # HEIC
+                'avif',                         # AVIF
+                'psd',                          # Photoshop
+                'raw', 'cr2', 'nef', 'arw'     # RAW formats
+            ]
+            
+            # 1. DÉTECTION PAR EXTENSION
+            if filename:
+                ext = filename.lower().split('.')[-1].replace('-', '').replace('_', '')
+                # Extraire l'extension même si le nom contient des tirets ou underscores
+                parts = filename.lower().split('.')
+                if len(parts) > 1:
+                    ext = parts[-1]
+                    # Gérer les cas comme "profile-1762679949026-478326994.jpg"
+                    if ext in image_extensions:
+                        file_type = f"image/{ext.replace('jpeg', 'jpg')}"
+                        logger.info(f"📎 Extension détectée: .{ext} → {file_type}")
+                    elif ext == 'pdf':
+                        file_type = "application/pdf"
+                        logger.info(f"📎 Extension PDF détectée")
+            
+            # 2. DÉTECTION PAR CONTENU (si type générique ou inconnu)
+            if file_type in ["application/octet-stream", None, ""] or not file_type.startswith("image/"):
+                try:
+                    # Essayer d'ouvrir comme image avec PIL
+                    test_image = Image.open(io.BytesIO(file_content))
+                    detected_format = test_image.format.lower() if test_image.format else "unknown"
+                    file_type = f"image/{detected_format}"
+                    logger.info(f"📎 Détection par contenu: {detected_format.upper()}")
+                    test_image.close()
+                except Exception as e:
+                    logger.debug(f"Pas une image PIL: {e}")
+            
+            # 3. ACCEPTER TOUT TYPE COMMENÇANT PAR image/
+            if file_type and file_type.startswith("image/"):
+                logger.info(f"✅ Type image validé: {file_type}")
+            
+            logger.info(f"🔍 Type original: {original_type} → Type final: {file_type}")
+            
+            # === TRAITEMENT IMAGE (TOUS FORMATS) ===
+            if file_type and file_type.startswith("image/"):
+                try:
+                    # Convertir en RGB si nécessaire (pour PNG avec transparence, etc.)
+                    image = flatten_image(Image.open(io.BytesIO(file_content)))
+                    
+                    # Analyser l'image avec SmolVLM + YOLO (TOUJOURS ACTIFS)
+                    logger.info(f"👁️ [SmolVLM + YOLO] Analyse complète de l'image: {filename} ({file_type})")
+                    
+                    # Sauvegarder temporairement l'image pour process_image
+                    temp_path = Path(__file__).parent / "storage" / "temp" / filename
+                    temp_path.parent.mkdir(parents=True, exist_ok=True)
+                    image.save(temp_path)
+                    
+                    # UTILISER TOUS LES OUTILS: SmolVLM + YOLO + Mistral + Tavily
+                    analysis = self.agent.process_image(
+                        image_path=str(temp_path),
+                        question=description or "Analyse cette image en détail avec tous les objets visibles.",
+                        detect_objects=True  # ✅ TOUJOURS ACTIVER YOLO
+                    )
+                    
+                    # Nettoyer le fichier temporaire
+                    if temp_path.exists():
+                        temp_path.unlink()
+                    
+                    # Extraire la description depuis le résultat
+                    # process_image retourne: {vision: {description: ...}, detection: ..., synthesis: ...}
+                    if "error" in analysis:
+                        raise HTTPException(500, f"Erreur analyse: {analysis['error']}")
+                    
+                    vision_result = analysis.get("vision", {})
+                    description_text = vision_result.get("description", "")
+                    synthesis_text = analysis.get("synthesis", "")
+                    
+                    # Combiner vision et synthèse pour FAISS
+                    full_description = f"{description_text}\n\nSynthèse: {synthesis_text}" if synthesis_text else description_text
+                    
+                    # Ajouter à la mémoire FAISS
+                    doc_id = self.memory.add_document(
+                        text=full_description,
+                        metadata={
+                            "filename": filename,
+                            "type": "image",
+                            "format": file_type,
+                            "size": len(file_content),
+                            "dimensions": f"{image.width}x{image.height}",
+                            "vision": vision_result,
+                            "synthesis": synthesis_text,
+                            "analysis": analysis
+                        },
+                        doc_type="image"
+                    )
+                    
+                    # AJOUTER LES RÉSULTATS AU FORMAT FLUTTER
+                    results["documents"].append({
+                        "id": doc_id,
+                        "type": "image",
+                        "format": file_type,
+                        "dimensions": f"{image.width}x{image.height}",
+                        "description": description_text,
+                        "synthesis": synthesis_text,
+                        "analysis": analysis
+                    })
+                    
+                    # AJOUTER AUSSI DIRECTEMENT AU NIVEAU RACINE POUR FLUTTER
+                    results["description"] = description_text
+                    results["synthesis"] = synthesis_text
+                    results["vision"] = vision_result
+                    results["detection"] = analysis.get("detection")
+                    results["tools_used"] = analysis.get("tools_used", [])
+                    results["web_search"] = analysis.get("web_search")
+                    
+                    logger.info(f"✅ Image analysée: {filename} ({image.width}x{image.height})")
+                    image.close()
+                    
+                except Exception as e:
+                    logger.error(f"❌ Erreur traitement image: {e}")
+                    raise HTTPException(500, f"Erreur traitement image: {str(e)}")
+            
+            # === TRAITEMENT PDF AVEC CHUNKING INTELLIGENT POUR RAG ===
+            elif file_type == "application/pdf":
+                logger.info(f"📄 Traitement PDF RAG: {filename}")
+                import PyPDF2
+                import fitz  # PyMuPDF pour extraction d'images des PDFs
+                
+                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+                all_text = ""
+                total_chunks = 0
+                
+                # ÉTAPE 1: Extraire tout le texte
+                for page_num, page in enumerate(pdf_reader.pages):
+                    text = page.extract_text()
+                    if text.strip():
+                        all_text += f"\n\n=== Page {page_num + 1} ===\n\n{text}"
+                
+                logger.info(f"📖 PDF: {len(pdf_reader.pages)} pages, {len(all_text)} caractères")
+                
+                # ÉTAPE 1.5: Si le PDF n'a pas de texte (PDF scanné), extraire le texte des images
+                is_scanned_pdf = len(all_text.strip()) < 100  # Moins de 100 caractères = probablement scanné
+                
+                if is_scanned_pdf:
+                    logger.info(f"🖼️ PDF scanné détecté - Extraction du texte via analyse d'images...")
+                    try:
+                        pdf_document = fitz.open(stream=file_content, filetype="pdf")
+                        
+                        # Limiter à 20 pages pour éviter les traitements trop longs
+                        max_pages = min(len(pdf_document), 20)
+                        logger.info(f"📸 Analyse de {max_pages} pages (sur {len(pdf_document)})...")
+                        
+                        # Créer un dossier temporaire pour les images
+                        temp_dir = Path(__file__).parent / "storage" / "temp"
+                        temp_dir.mkdir(parents=True, exist_ok=True)
+                        
+                        for page_num in range(max_pages):
+                            page = pdf_document[page_num]
+                            
+                            # Convertir la page en image
+                            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom pour meilleure qualité
+                            
+                            # Sauvegarder temporairement
+                            temp_img_path = temp_dir / f"pdf_page_{page_num}.png"
+                            pix.save(str(temp_img_path))
+                            
+                            # Analyser l'image avec SmolVLM
+                            try:
+                                page_analysis = self.agent.process_image(
+                                    image_path=str(temp_img_path),
+                                    question=f"Extrais et décris tout le texte visible sur cette page {page_num + 1}. Décris aussi les schémas, tableaux et éléments visuels importants.",
+                                    detect_objects=False  # Pas besoin de YOLO pour du texte
+                                )
+                                
+                                page_text = page_analysis.get("vision", "")
+                                if page_text:
+                                    all_text += f"\n\n=== Page {page_num + 1} (analysée visuellement) ===\n\n{page_text}"
+                                
+                                # Nettoyer l'image temporaire
+                                if temp_img_path.exists():
+                                    temp_img_path.unlink()
+                                    
+                            except Exception as e:
+                                logger.warning(f"⚠️ Erreur analyse page {page_num + 1}: {e}")
+                                # Nettoyer même en cas d'erreur
+                                if temp_img_path.exists():
+                                    temp_img_path.unlink()
+                                continue
+                        
+                        pdf_document.close()
+                        logger.info(f"✅ Analyse visuelle complétée: {len(all_text)} caractères extraits")
+                        
+                    except Exception as e:
+                        logger.error(f"❌ Erreur extraction visuelle PDF: {e}")
+                
+                # ÉTAPE 2: CHUNKING INTELLIGENT (découper en morceaux optimaux)
+                if len(all_text.strip()) > 0:
+                    chunk_size = 1000  # ~1000 caractères par chunk
+                    chunk_overlap = 200  # 200 caractères de chevauchement
+                    
+                    chunks = []
+                    start = 0
+                    while start < len(all_text):
+                        end = start + chunk_size
+                        
+                        # Trouver la fin d'une phrase pour ne pas couper au milieu
+                        if end < len(all_text):
+                            # Chercher le dernier point, point d'exclamation ou point d'interrogation
+                            last_period = max(
+                                all_text.rfind('.', start, end),
+                                all_text.rfind('!', start, end),
+                                all_text.rfind('?', start, end),
+                                all_text.rfind('\n', start, end)
+                            )
+                            if last_period != -1 and last_period > start + chunk_size // 2:
+                                end = last_period + 1
+                        
+                        chunk = all_text[start:end].strip()
+                        if chunk:
+                            chunks.append(chunk)
+                        
+                        start = end - chunk_overlap  # Chevauchement pour garder le contexte
+                    
+                    logger.info(f"✂️ PDF découpé en {len(chunks)} chunks intelligents")
+                else:
+                    logger.warning(f"⚠️ Aucun texte extrait du PDF - Création d'un chunk de métadonnées")
+                    chunks = [f"Document PDF: {filename} - {len(pdf_reader.pages)} pages (PDF scanné sans texte extractible)"]
+                
+                # ÉTAPE 3: Ajouter chaque chunk à FAISS
+                for i, chunk in enumerate(chunks):
+                    doc_id = self.memory.add_document(
+                        text=chunk,
+                        metadata={
+                            "filename": filename,
+                            "chunk_index": i,
+                            "total_chunks": len(chunks),
+                            "type": "pdf_chunk",
+                            "chunk_size": len(chunk)
+                        },
+                        doc_type="pdf_rag"
+                    )
+                    
+                    total_chunks += 1
+                    
+                    results["documents"].append({
+                        "id": doc_id,
+                        "type": "pdf_chunk",
+                        "chunk_index": i,
+                        "preview": chunk[:150] + "..."
+                    })
+                
+                # ÉTAPE 4: Extraire et analyser les images du PDF (SEULEMENT si ce n'est PAS un PDF scanné)
+                # Car si c'est scanné, on a déjà analysé les pages complètes ci-dessus
+                if not is_scanned_pdf:
+                    try:
+                        pdf_document = fitz.open(stream=file_content, filetype="pdf")
+                        
+                        for page_num in range(min(len(pdf_document), 10)):  # Max 10 pages pour les images
+                            page = pdf_document[page_num]
+                            images = page.get_images()
+                            
+                            for img_index, img in enumerate(images[:3]):  # Max 3 images par page
+                                try:
+                                    xref = img[0]
+                                    base_image = pdf_document.extract_image(xref)
+                                    image_bytes = base_image["image"]
+                                    
+                                    # Analyser l'image
+                                    image = Image.open(io.BytesIO(image_bytes))
+                                    
+                                    # Sauvegarder temporairement
+                                    temp_img_path = Path(__file__).parent / "storage" / "temp" / f"pdf_img_{page_num}_{img_index}.jpg"
+                                    temp_img_path.parent.mkdir(parents=True, exist_ok=True)
+                                    image.save(temp_img_path)
+                                    
+                                    analysis = self.agent.process_image(
+                                        image_path=str(temp_img_path),
+                                        question="Décris cette image extraite d'un document PDF.",
+                                        detect_objects=False
+                                    )
+                                    
+                                    # Nettoyer
+                                    if temp_img_path.exists():
+                                        temp_img_path.unlink()
+                                    
+                                    vision_desc = analysis.get("vision", "")
+                                    
+                                    # Ajouter à FAISS
+                                    if vision_desc:
+                                        doc_id = self.memory.add_document(
+                                            text=f"Image page {page_num + 1}: {vision_desc}",
+                                            metadata={
+                                                "filename": filename,
+                                                "page": page_num + 1,
+                                                "image_index": img_index,
+                                                "type": "pdf_image"
+                                            },
+                                            doc_type="pdf_image"
+                                        )
+                                        
+                                        results["documents"].append({
+                                            "id": doc_id,
+                                            "type": "pdf_image",
+                                            "page": page_num + 1
+                                        })
+                                        
+                                except Exception as e:
+                                    logger.warning(f"⚠️ Erreur image PDF page {page_num}: {e}")
+                                    continue
+                        
+                        pdf_document.close()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Extraction images PDF échouée: {e}")
+                
+                results["total_pages"] = len(pdf_reader.pages)
+                results["total_chunks"] = total_chunks
+                results["description"] = f"PDF traité: {len(pdf_reader.pages)} pages, {total_chunks} chunks ajoutés à la base de connaissances"
+                results["synthesis"] = f"✅ Document '{filename}' ajouté à votre base de connaissances RAG avec {total_chunks} sections indexées. Vous pouvez maintenant poser des questions sur ce document !"
+                
+                logger.info(f"✅ PDF RAG traité: {total_chunks} chunks + images indexés")
+            
+            else:
+                raise HTTPException(400, f"Type de fichier non supporté: {file_type}")
+            
+            # Sauvegarder la mémoire
+            self.memory.save_to_disk(str(self.storage_path))
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur traitement fichier: {e}")
+            raise HTTPException(500, f"Erreur traitement: {str(e)}")
+        
+        return results
+    
+    def chat(
+        self,
+        message: str,
+        conversation_id: str,
+        use_memory: bool = True,
+        temperature: float = 0.7,
+        on_text: Optional[Callable[[str], None]] = None,
+        query_embedding: Optional[np.ndarray] = None,
+        relevant_docs: Optional[List[Dict[str, Any]]] = None,
+        use_web: bool = True,
+        remember: bool = True
+    ) -> ChatResponse:
+        """
+        🔥 CHAT ULTRA-INTELLIGENT - UTILISE TOUS LES OUTILS DISPONIBLES
+        
+        Pipeline intelligent:
+        1. Détection d'intention → Type de réponse nécessaire
+        2. FAISS (Mémoire) → Documents/images similaires du passé
+        3. Tavily (Web) → Recherche internet en temps réel si nécessaire
+        4. SmolVLM + YOLO → Analyse visuelle si contexte pertinent
+        5. Mistral-7B (LLM) → Synthèse intelligente avec tous les outils
+        
+        Args:
+            query_embedding, relevant_docs: Embedding et documents FAISS déjà
+                calculés (traitement par lots: un passage et une recherche groupés)
+            use_web: Autoriser la recherche internet
+            remember: Enregistrer l'échange dans la conversation (False: ni
+                historique lu, ni session de l'agent, ni conversation SQLite)
+        """
+        
+        # ========================================
+        # ÉTAPE 1: DÉTECTION D'INTENTION
+        # ========================================
+        # Une seule passe de l'automate pour tous les déclencheurs du message
+        triggers = self.agent.triggers.match(message)
+        
+        # Un seul passage MiniLM (ou cache): l'embedding sert au routage et à FAISS
+        if query_embedding is not None:
+            query = QueryEmbedding(message, lambda _: query_embedding)
+        else:
+            query = self.memory.query(message)
+        with span("intent") as stage:
+            intent, intent_confidence = self.detect_intent_scored(message, triggers, query)
+            stage.update(intent=intent, confidence=intent_confidence)
+        system_prompt = self.get_prompt_by_intent(intent)
+        
+        logger.info(f"🎯 Intention détectée: {intent}")
+        
+        tools_used = []  # Tracer les outils utilisés
+        
+        # Triggers de recherche web élargis
+        needs_web_search = use_web and (intent == "search" or "web_search" in triggers)
+        
+        # Lancer la recherche web tout de suite: elle s'exécute pendant FAISS
+        # et la construction du contexte (attente bornée à l'étape 6)
+        web_future = None
+        if needs_web_search:
+            logger.info(f"🌐 [Tavily] Recherche internet: '{message[:60]}...'")
+            web_future = self.agent.web_search.submit(message, max_results=3, search_depth="basic")
+        
+        # ========================================
+        # ÉTAPE 2: RECHERCHE DANS LA MÉMOIRE FAISS
+        # ========================================
+        if not use_memory:
+            relevant_docs = []
+        else:
+            if relevant_docs is None:
+                logger.info("💾 [FAISS] Recherche dans la mémoire vectorielle...")
+                relevant_docs = self.memory.search(message, k=5, query_embedding=query.vector)  # Augmenté à 5 pour plus de contexte
+            if relevant_docs:
+                tools_used.append(f"FAISS ({len(relevant_docs)} docs)")
+                logger.info(f"   ✓ {len(relevant_docs)} documents pertinents trouvés")
+        
+        # ========================================
+        # ÉTAPE 3: ANALYSE DU BESOIN D'OUTILS VISUELS
+        # ========================================
+        needs_visual_search = "visual_search" in triggers
+        
+        visual_context = None
+        if needs_visual_search and relevant_docs:
+            # Chercher des images dans les documents pertinents
+            for doc in relevant_docs:
+                if doc.get("type") == "image":
+                    logger.info("👁️ [SmolVLM] Document visuel trouvé dans FAISS")
+                    visual_context = doc.get("metadata", {})
+                    tools_used.append("SmolVLM (via FAISS)")
+                    break
+        
+        # ========================================
+        # ÉTAPE 4: CONSTRUIRE CONTEXTE MÉMOIRE + STATISTIQUES
+        # ========================================
+        memory_items = []
+        pdf_chunks_count = 0
+        pdf_files = set()
+        
+        if relevant_docs:
+            for i, doc in enumerate(relevant_docs, 1):
+                doc_type = doc.get('type', 'texte')
+                memory_items.append(f"{i}. [{doc_type}] {doc.get('text', '')}")
+                
+                # Compter les chunks PDF et les fichiers uniques
+                if doc_type in ['pdf_rag', 'pdf_chunk']:
+                    pdf_chunks_count += 1
+                    metadata = doc.get('metadata', {})
+                    filename = metadata.get('filename', '')
+                    if filename:
+                        pdf_files.add(filename)
+        
+        # ========================================
+        # ÉTAPE 5: HISTORIQUE CONVERSATIONNEL
+        # ========================================
+        # Résumé glissant des anciens échanges + derniers messages non résumés
+        with span("history") as stage:
+            summary, recent = self.summarizer.context(conversation_id) if remember else (None, [])
+            history_items = []
+            history_tokens = 0
+            for msg in reversed(recent):  # Garder les plus récents dans le budget
+                item = f"{msg['role']}: {msg['content']}"
+                history_tokens += min(self.agent.count_tokens(item), HISTORY_ITEM_MAX_TOKENS)
+                if history_items and history_tokens > HISTORY_MAX_TOKENS:
+                    break
+                history_items.insert(0, item)
+            stage.update(summary=bool(summary), messages=len(history_items))
+        if summary or history_items:
+            logger.info(f"📜 Historique: résumé={'oui' if summary else 'non'}, {len(history_items)} messages récents")
+        
+        # ========================================
+        # ÉTAPE 6: RECHERCHE WEB TAVILY (Si nécessaire)
+        # ========================================
+        web_items = []
+        
+        # Résultat de la recherche lancée à l'étape 1, attendu dans le budget de latence
+        search_results = self.agent.web_search.wait(web_future)
+        if search_results and search_results.get("results"):
+            for i, result in enumerate(search_results.get("results", [])[:3], 1):
+                title = result.get('title', 'N/A')
+                content = result.get('content', '')
+                url = result.get('url', '')
+                web_items.append(f"{i}. {title} (Source: {url})\n   {content}")
+            
+            tools_used.append(f"Tavily ({len(search_results.get('results', []))} résultats)")
+            logger.info(f"   ✓ {len(search_results.get('results', []))} résultats trouvés")
+        
+        # ========================================
+        # ÉTAPE 7: CONSTRUIRE PROMPT ENRICHI AVEC TOUS LES OUTILS
+        # ========================================
+        # Assemblage sous budget de tokens: les sections sont servies par
+        # priorité et tronquées au besoin (plus de découpage par caractères)
+        memory_section = PromptSection(
+            "memory", "📚 MÉMOIRE CONTEXTUELLE (FAISS):", priority=2,
+            items=memory_items, item_max_tokens=MEMORY_ITEM_MAX_TOKENS
+        )
+        web_section = PromptSection(
+            "web", "🌐 RECHERCHE INTERNET (Tavily):", priority=2,
+            items=web_items, item_max_tokens=WEB_ITEM_MAX_TOKENS
+        )
+        
+        history_provided = False
+        if intent == "explain_app":
+            sections = [
+                PromptSection("system", EXPLAIN_APP_PROMPT, priority=0, required=True, static=True),
+                memory_section,
+                web_section,
+                PromptSection("question", f"Question: {message}", priority=0, required=True),
+                PromptSection("format", "Réponds en 3-4 phrases claires et pratiques.", priority=0, required=True, static=True)
+            ]
+            max_tokens = 150
+            temp = 0.3
+            
+        elif intent == "search" or web_items:
+            web_section.priority = 1  # Les résultats web priment pour une recherche
+            sections = [
+                PromptSection("system", SEARCH_PROMPT, priority=0, required=True, static=True),
+                web_section,
+                memory_section,
+                PromptSection("question", f"Question: {message}", priority=0, required=True),
+                PromptSection("format", "Résume les informations trouvées en 3-5 phrases.", priority=0, required=True, static=True)
+            ]
+            max_tokens = 200
+            temp = 0.3
+            
+        elif intent in ["problem_solving", "summarization"]:
+            prompt_map = {
+                "problem_solving": PROBLEM_SOLVING_PROMPT,
+                "summarization": SUMMARIZATION_PROMPT
+            }
+            sections = [
+                PromptSection("system", prompt_map[intent], priority=0, required=True, static=True),
+                memory_section,
+                web_section,
+                PromptSection("question", message, priority=0, required=True)
+            ]
+            max_tokens = 200
+            temp = 0.5
+            
+        else:
+            # Conversation normale avec TOUS les contextes disponibles
+            sections = [
+                PromptSection("system", SYSTEM_PROMPT, priority=0, required=True, static=True),
+                PromptSection(
+                    "summary", f"📝 RÉSUMÉ DE LA CONVERSATION: {summary}" if summary else "",
+                    priority=1, max_tokens=SUMMARY_SECTION_MAX_TOKENS
+                ),
+                PromptSection(
+                    "history", "", priority=1, items=history_items,
+                    max_tokens=HISTORY_MAX_TOKENS, item_max_tokens=HISTORY_ITEM_MAX_TOKENS
+                ),
+                memory_section,
+                web_section,
+                PromptSection("question", f"Utilisateur: {message}", priority=0, required=True),
+                PromptSection("format", "Réponds de manière naturelle et concise.", priority=0, required=True, static=True)
+            ]
+            max_tokens = 150
+            temp = 0.7
+            history_provided = True
+        
+        with span("prompt.pack") as stage:
+            packed = self.agent.prompt_packer.pack(
+                sections,
+                max_new_tokens=max_tokens,
+                reserved_tokens=self.agent.chat_envelope_tokens()
+            )
+            stage.update(tokens=packed.tokens, budget=packed.budget)
+        full_message = packed.text
+        logger.info(f"📐 Prompt: {packed.tokens}/{packed.budget} tokens")
+        
+        # ========================================
+        # ÉTAPE 8: GÉNÉRATION AVEC MISTRAL-7B
+        # ========================================
+        logger.info("🧠 [Mistral-7B] Génération de réponse avec tous les contextes...")
+        agent_result = self.agent.chat(
+            message=full_message,
+            with_voice=False,
+            context={
+                "intent": intent,
+                "intent_confidence": intent_confidence,  # Choix du tier LLM
+                "request_type": "rag" if memory_items or web_items else "chat",  # Mode spéculatif
+                "max_tokens": max_tokens,
+                "temperature": temp,
+                "tools_used": tools_used,
+                "user_message": message,  # Message brut pour l'historique de session
+                "history_provided": history_provided,  # Historique déjà dans le prompt
+                "remember": remember,  # Session de l'agent (historique court terme)
+                "web_search_done": True,  # Recherche web déjà faite (ou court-circuitée) ici
+                "triggers": triggers,  # Déclencheurs du message brut (pas du prompt enrichi)
+                "on_text": on_text  # Texte généré au fil de l'eau (synthèse vocale en flux)
+            },
+            conversation_id=conversation_id
+        )
+        
+        response_text = agent_result.get("response", "Aucune réponse générée")
+        tools_used.append(f"{agent_result.get('model') or 'Mistral-7B'} (LLM)")
+        
+        # Ajouter les statistiques PDF si présentes
+        if pdf_chunks_count > 0:
+            pdf_stats = f"📄 RAG: {pdf_chunks_count} chunks"
+            if len(pdf_files) > 0:
+                pdf_stats += f" de {len(pdf_files)} PDF"
+            tools_used.append(pdf_stats)
+            logger.info(f"📊 Statistiques RAG: {pdf_chunks_count} chunks de {len(pdf_files)} PDFs")
+        
+        # ========================================
+        # ÉTAPE 9: MÉMORISATION
+        # ========================================
+        if remember:
+            self.memory.add_to_conversation(
+                conversation_id,
+                ChatMessage(role="user", content=message, timestamp=datetime.now().isoformat())
+            )
+            self.memory.add_to_conversation(
+                conversation_id,
+                ChatMessage(role="assistant", content=response_text, timestamp=datetime.now().isoformat())
+            )
+            self.summarizer.schedule(conversation_id)
+        
+        # Résumé des outils utilisés
+        tools_summary = " + ".join(tools_used)
+        logger.info(f"✅ Réponse générée - Outils: {tools_summary}")
+        
+        # Ajouter un footer avec les statistiques si des PDFs ont été utilisés
+        if pdf_chunks_count > 0:
+            response_footer = f"\n\n---\n💡 *Réponse basée sur {pdf_chunks_count} section(s) de {len(pdf_files)} document(s) PDF*"
+            response_text = response_text + response_footer
+        
+        return ChatResponse(
+            response=response_text,
+            conversation_id=conversation_id,
+            sources=[{
+                "id": doc["id"],
+                "type": doc["type"],
+                "similarity": doc["similarity"],
+                "preview": doc["text"][:100],
+                "tool": f"📄 RAG" if doc.get('type') in ['pdf_rag', 'pdf_chunk'] else "FAISS"
+            } for doc in relevant_docs] if relevant_docs else None,
+            reasoning=f"Outils utilisés: {tools_summary}",
+            timestamp=datetime.now().isoformat()
+        )
+    
+    # ==========================================
+    # QUESTIONS PAR LOTS
+    # ==========================================
+    
+    def batch_concurrency(self) -> int:
+        """
+        Questions générées en parallèle: une par worker llama.cpp, moins
+        BATCH_CHAT_RESERVED_WORKERS laissés au chat interactif (au moins une);
+        BATCH_CHAT_CONCURRENCY pour forcer
+        """
+        configured = int(os.getenv("BATCH_CHAT_CONCURRENCY", "0"))
+        if configured > 0:
+            return configured
+        llm = self.agent.tools.get("llm")
+        info = llm.load_info() if llm is not None else None
+        if info:
+            workers = info[1]
+        else:
+            configured_workers = os.getenv("LLM_WORKERS")
+            workers = len(plan_workers(int(configured_workers) if configured_workers else None))  # Pool pas encore chargé
+        return max(1, workers - int(os.getenv("BATCH_CHAT_RESERVED_WORKERS", "1")))
+    
+    def chat_batch(
+        self,
+        questions: List[str],
+        use_memory: bool = True,
+        use_web: bool = False,
+        k: int = 5,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Répondre à des questions indépendantes (traitements back-office)
+        
+        1. Embeddings: un seul passage MiniLM pour les questions hors cache
+        2. FAISS: une seule recherche multi-requêtes (matrice n × dim)
+        3. Génération: autant de questions en vol que de workers llama.cpp,
+           le pool les répartit dès qu'un worker se libère
+        
+        Les échanges ne sont pas enregistrés (ni conversation, ni session de
+        l'agent, ni résumé).
+        
+        Args:
+            on_result: Reçoit {"type": "start"}, puis un événement "result" ou
+                "error" par question dans l'ordre de fin. S'il lève une
+                exception (client déconnecté), les questions pas encore
+                lancées sont abandonnées
+        
+        Returns:
+            Bilan du lot (réussites, échecs, débit)
+        """
+        emit = on_result or (lambda event: None)
+        batch_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}"
+        start = time.perf_counter()
+        
+        vectors = self.memory.embed_queries(questions)
+        documents: List[Optional[List[Dict[str, Any]]]] = [None] * len(questions)
+        if use_memory:
+            documents = self.memory.search_many(vectors, k)
+        prepared = time.perf_counter() - start
+        
+        concurrency = min(self.batch_concurrency(), len(questions)) or 1
+        logger.info(f"📦 Lot {batch_id}: {len(questions)} questions, {concurrency} en parallèle")
+        emit({"type": "start", "batch_id": batch_id, "total": len(questions), "concurrency": concurrency})
+        
+        def answer(i: int) -> Dict[str, Any]:
+            t0 = time.perf_counter()
+            response = self.chat(
+                message=questions[i],
+                conversation_id=f"{batch_id}_{i}",
+                use_memory=use_memory,
+                query_embedding=vectors[i],
+                relevant_docs=documents[i],
+                use_web=use_web,
+                remember=False
+            )
+            return {
+                "type": "result",
+                "index": i,
+                "question": questions[i],
+                "response": response.response,
+                "sources": response.sources,
+                "reasoning": response.reasoning,
+                "seconds": round(time.perf_counter() - t0, 3)
+            }
+        
+        succeeded = failed = 0
+        cancelled = False
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="chat-batch") as pool:
+            futures = {pool.submit(answer, i): i for i in range(len(questions))}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    event = future.result()
+                    succeeded += 1
+                except Exception as e:
+                    logger.error(f"❌ Lot {batch_id}, question {i}: {e}")
+                    event = {"type": "error", "index": i, "question": questions[i], "error": str(e)}
+                    failed += 1
+                try:
+                    emit(event)
+                except Exception as e:
+                    # Plus personne ne lit le flux: libérer les workers LLM
+                    logger.warning(f"⚠️ Lot {batch_id} interrompu ({e}), questions restantes abandonnées")
+                    for pending in futures:
+                        pending.cancel()
+                    cancelled = True
+                    break
+        
+        total_seconds = time.perf_counter() - start
+        logger.info(f"📦 Lot {batch_id} terminé en {total_seconds:.1f}s ({succeeded} réponses, {failed} échecs)")
+        return {
+            "batch_id": batch_id,
+            "total": len(questions),
+            "succeeded": succeeded,
+            "failed": failed,
+            "cancelled": cancelled,
+            "prepare_seconds": round(prepared, 3),
+            "total_seconds": round(total_seconds, 3),
+            "throughput_per_s": round(len(questions) / total_seconds, 3) if total_seconds > 0 else None
+        }
+    
+    def process_upload_batch(
+        self,
+        files: List[Tuple[bytes, Optional[str], Optional[str]]],
+        description: Optional[str] = None,
+        synthesize: Optional[bool] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyser et indexer un lot d'images (photos du personnel, de chantier...)
+        
+        1. Décodage + conversion RGB en parallèle (UPLOAD_DECODE_WORKERS threads)
+        2. SmolVLM par lots complétés (VISION_BATCH_SIZE images par `generate`), YOLO par image
+        3. Synthèses Mistral en parallèle sur les workers llama.cpp, ou aucune
+           (UPLOAD_BATCH_SYNTHESIS=0)
+        4. Un seul passage d'embeddings, un seul ajout FAISS, une seule sauvegarde
+        
+        Les PDF restent traités par /upload (découpage en chunks).
+        
+        Args:
+            files: (contenu, nom, type MIME) par fichier
+            synthesize: Forcer ou désactiver les synthèses (défaut: UPLOAD_BATCH_SYNTHESIS)
+            on_event: Reçoit {"type": "start"}, puis par fichier des événements "progress"
+                (étapes decoded, analyzed, synthesized), puis "result" ou "error".
+                S'il lève une exception (client déconnecté), le lot s'arrête: ni vision,
+                ni synthèse, ni indexation pour les images restantes
+        
+        Returns:
+            Bilan du lot (réussites, échecs, durée de chaque étape, débit)
+        """
+        from PIL import Image
+        
+        notify = on_event or (lambda event: None)
+        cancelled = False
+        if synthesize is None:
+            synthesize = os.getenv("UPLOAD_BATCH_SYNTHESIS", "1") == "1"
+        batch_id = f"upload_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(3).hex()}"
+        names = [Path(filename or f"image_{i}").name for i, (_, filename, _) in enumerate(files)]
+        errors: Dict[int, str] = {}
+        start = time.perf_counter()
+        
+        logger.info(f"📦 Lot {batch_id}: {len(files)} fichiers (synthèse: {'oui' if synthesize else 'non'})")
+        
+        def emit(event: Dict[str, Any]):
+            nonlocal cancelled
+            try:
+                notify(event)
+            except Exception as e:
+                # Plus personne ne lit le flux: libérer SmolVLM et les workers LLM
+                if not cancelled:
+                    logger.warning(f"⚠️ Lot {batch_id} interrompu ({e}), images restantes abandonnées")
+                cancelled = True
+                raise
+        
+        def fail(i: int, error: str):
+            logger.warning(f"⚠️ Lot {batch_id}, {names[i]}: {error}")
+            errors[i] = error
+            emit({"type": "error", "index": i, "filename": names[i], "error": error})
+        
+        # Copies temporaires: YOLO et l'historique de session travaillent sur un chemin
+        temp_dir = Path(__file__).parent / "storage" / "temp" / batch_id
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        
+        def decode(i: int) -> Dict[str, Any]:
+            content, _, content_type = files[i]
+            image = Image.open(io.BytesIO(content))
+            file_type = f"image/{image.format.lower()}" if image.format else (content_type or "image/unknown")
+            image = flatten_image(image)
+            path = temp_dir / f"{i}_{names[i]}"
+            image.save(path, format="PNG")
+            return {"path": str(path), "image": image, "format": file_type, "size": len(content)}
+        
+        decoded: Dict[int, Dict[str, Any]] = {}
+        doc_ids: List[str] = []
+        decode_seconds = analysis_seconds = 0.0
+        try:
+            emit({"type": "start", "batch_id": batch_id, "total": len(files), "synthesis": synthesize})
+            
+            # === 1. DÉCODAGE EN PARALLÈLE ===
+            workers = int(os.getenv("UPLOAD_DECODE_WORKERS", "0")) or min(8, os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload-decode") as pool:
+                futures = {pool.submit(decode, i): i for i in range(len(files))}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        decoded[i] = future.result()
+                    except Exception as e:
+                        fail(i, f"Image illisible: {e}")
+                        continue
+                    try:
+                        emit({"type": "progress", "index": i, "filename": names[i], "stage": "decoded"})
+                    except Exception:
+                        for pending in futures:
+                            pending.cancel()
+                        raise
+            decode_seconds = time.perf_counter() - start
+            
+            # === 2-3. VISION PAR LOTS, DÉTECTION, SYNTHÈSES ===
+            order = sorted(decoded)
+            analyses = self.agent.process_images(
+                images=[{"path": decoded[i]["path"], "image": decoded[i]["image"]} for i in order],
+                question=description or "Analyse cette image en détail avec tous les objets visibles.",
+                synthesize=synthesize,
+                batch_size=int(os.getenv("VISION_BATCH_SIZE", "4")),
+                synthesis_workers=self.batch_concurrency(),
+                on_progress=lambda position, stage: emit({
+                    "type": "progress", "index": order[position], "filename": names[order[position]], "stage": stage
+                })
+            )
+            analysis_seconds = time.perf_counter() - start - decode_seconds
+            
+            # === 4. INDEXATION GROUPÉE ===
+            indexed: List[Tuple[int, Dict[str, Any]]] = []
+            items: List[Tuple[str, Dict[str, Any], str]] = []
+            for i, analysis in zip(order, analyses):
+                if "error" in analysis:
+                    fail(i, f"Erreur analyse: {analysis['error']}")
+                    continue
+                image = decoded[i]["image"]
+                description_text = (analysis.get("vision") or {}).get("description", "")
+                synthesis_text = analysis.get("synthesis") or ""
+                items.append((
+                    f"{description_text}\n\nSynthèse: {synthesis_text}" if synthesis_text else description_text,
+                    {
+                        "filename": names[i],
+                        "type": "image",
+                        "format": decoded[i]["format"],
+                        "size": decoded[i]["size"],
+                        "dimensions": f"{image.width}x{image.height}",
+                        "vision": analysis.get("vision"),
+                        "synthesis": synthesis_text,
+                        "analysis": analysis,
+                        "batch_id": batch_id
+                    },
+                    "image"
+                ))
+                indexed.append((i, analysis))
+            
+            doc_ids = self.memory.add_documents(items)
+            if doc_ids:
+                self.memory.save_to_disk(str(self.storage_path))
+            
+            for doc_id, (i, analysis), (_, metadata, _) in zip(doc_ids, indexed, items):
+                emit({
+                    "type": "result",
+                    "index": i,
+                    "filename": names[i],
+                    "id": doc_id,
+                    "format": metadata["format"],
+                    "dimensions": metadata["dimensions"],
+                    "description": (analysis.get("vision") or {}).get("description", ""),
+                    "synthesis": metadata["synthesis"],
+                    "detection": analysis.get("detection"),
+                    "tools_used": analysis.get("tools_used", [])
+                })
+        except Exception:
+            if not cancelled:
+                raise
+        finally:
+            for entry in decoded.values():
+                entry["image"].close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        
+        total_seconds = time.perf_counter() - start
+        logger.info(f"📦 Lot {batch_id} terminé en {total_seconds:.1f}s ({len(doc_ids)} images indexées, {len(errors)} échecs)")
+        return {
+            "batch_id": batch_id,
+            "total": len(files),
+            "succeeded": len(doc_ids),
+            "failed": len(errors),
+            "cancelled": cancelled,
+            "synthesis": synthesize,
+            "decode_seconds": round(decode_seconds, 3),
+            "analysis_seconds": round(analysis_seconds, 3),
+            "index_seconds": round(total_seconds - decode_seconds - analysis_seconds, 3) if analysis_seconds else 0.0,
+            "total_seconds": round(total_seconds, 3),
+            "throughput_per_s": round(len(files) / total_seconds, 3) if total_seconds > 0 else None
+        }
+
+# ==========================================
+# SERVEUR DE MODÈLES (MODE MULTI-WORKERS)
+# ==========================================
+
+# Opérations du gestionnaire appelables par les workers HTTP (models/model_server.py)
+MODEL_SERVER_METHODS = (
+    "readiness", "models_status", "triggers_info", "reload_triggers", "synthesize_speech",
+    "audio_path", "conversation_page", "search", "stats", "clear", "pdf_details",
+    "delete_file", "service_metrics", "process_upload",
+    "start_profile", "stop_profile", "profile_sessions", "profile_result"
+)
+MODEL_SERVER_STREAM_METHODS = ("chat", "chat_batch", "process_upload_batch")
+
+def model_server_config() -> Tuple[str, bytes]:
+    """Socket et clé partagée du serveur de modèles (MODEL_SERVER_SOCKET, MODEL_SERVER_AUTHKEY)"""
+    address = os.getenv("MODEL_SERVER_SOCKET", "")
+    authkey = os.getenv("MODEL_SERVER_AUTHKEY", "")
+    if not address or not authkey:
+        raise RuntimeError("MODEL_SERVER_SOCKET et MODEL_SERVER_AUTHKEY requis pour le serveur de modèles")
+    return address, authkey.encode()
+
+class ModelService(ProfilingService):
+    """Côté serveur de modèles: opérations du gestionnaire en données simples (picklables)"""
+    
+    def __init__(self, manager: ChatAgentManager):
+        self.manager = manager
+    
+    def __getattr__(self, name: str):
+        return getattr(self.manager, name)
+    
+    def chat(
+        self,
+        message: str,
+        conversation_id: str,
+        use_memory: bool = True,
+        temperature: float = 0.7,
+        on_event: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        return self.manager.chat(
+            message=message,
+            conversation_id=conversation_id,
+            use_memory=use_memory,
+            temperature=temperature,
+            on_text=on_event  # Texte généré renvoyé au worker au fil de l'eau
+        ).dict()
+    
+    def chat_batch(self, questions: List[str], on_event: Optional[Callable] = None, **options) -> Dict[str, Any]:
+        return self.manager.chat_batch(questions, on_result=on_event, **options)
+    
+    def process_upload_batch(self, files: List[Tuple[bytes, Optional[str], Optional[str]]], on_event: Optional[Callable] = None, **options) -> Dict[str, Any]:
+        return self.manager.process_upload_batch(files, on_event=on_event, **options)
+    
+    def service_metrics(self) -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+        return self.manager.service_metrics() + [
+            ("model_server_resident_memory_bytes", "gauge", "Mémoire résidente du serveur de modèles",
+             [({}, process_memory_bytes())])
+        ]
+
+class RemoteChatManager:
+    """
+    Côté worker HTTP: mêmes opérations que ChatAgentManager, exécutées par
+    le serveur de modèles (aucun modèle ni index chargé dans le worker)
+    """
+    
+    def __init__(self, client):
+        self.client = client
+    
+    @classmethod
+    def connect(cls) -> "RemoteChatManager":
+        from model_server import ModelServerClient
+        address, authkey = model_server_config()
+        client = ModelServerClient(address, authkey, max_connections=int(os.getenv("MODEL_SERVER_CONNECTIONS", "8")))
+        logger.info(f"🛰️ Connexion au serveur de modèles: {address}")
+        client.connect(timeout=float(os.getenv("MODEL_SERVER_CONNECT_TIMEOUT", "600")))
+        return cls(client)
+    
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        from model_server import RemoteCallError
+        try:
+            return self.client.call(method, *args, **kwargs)
+        except RemoteCallError as e:
+            if e.status_code is not None:
+                raise HTTPException(e.status_code, e.detail)
+            if e.type_name == "ValueError":
+                raise ValueError(e.message)
+            raise
+    
+    def __getattr__(self, name: str):
+        if name not in MODEL_SERVER_METHODS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+    
+    def start_warmup(self):
+        """Préchauffage fait par le serveur de modèles au démarrage"""
+    
+    def readiness(self) -> Dict[str, Any]:
+        try:
+            return self._call("readiness")
+        except (OSError, EOFError) as e:
+            return {"ready": False, "model_server": f"injoignable: {e}"}
+    
+    def chat(
+        self,
+        message: str,
+        conversation_id: str,
+        use_memory: bool = True,
+        temperature: float = 0.7,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> ChatResponse:
+        return ChatResponse(**self._call(
+            "chat", message, conversation_id, use_memory, temperature, on_event=on_text
+        ))
+    
+    def chat_batch(
+        self,
+        questions: List[str],
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+        **options
+    ) -> Dict[str, Any]:
+        return self._call("chat_batch", questions, on_event=on_result, **options)
+    
+    def process_upload(
+        self,
+        content: bytes,
+        filename: Optional[str],
+        content_type: Optional[str],
+        description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return self._call("process_upload", content, filename, content_type, description)
+    
+    def process_upload_batch(
+        self,
+        files: List[Tuple[bytes, Optional[str], Optional[str]]],
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        **options
+    ) -> Dict[str, Any]:
+        return self._call("process_upload_batch", files, on_event=on_event, **options)
+
+def serve_models():
+    """Processus serveur de modèles: charge les modèles une fois et sert les workers HTTP"""
+    from model_server import ModelServer
+    address, authkey = model_server_config()
+    manager = create_local_chat_manager()
+    manager.start_warmup()
+    server = ModelServer(
+        ModelService(manager), address, authkey,
+        methods=MODEL_SERVER_METHODS,
+        stream_methods=MODEL_SERVER_STREAM_METHODS
+    )
+    PROFILER.concurrency_probe = lambda: server.in_flight  # Appels des workers en cours
+    server.serve_forever()
+
+# ==========================================
+# INSTANCE GLOBALE
+# ==========================================
+
+def create_chat_manager():
+    """Client du serveur de modèles si MODEL_SERVER_SOCKET est défini (workers HTTP), sinon local"""
+    if os.getenv("MODEL_SERVER_SOCKET"):
+        return RemoteChatManager.connect()
+    return create_local_chat_manager()
+
+def create_local_chat_manager() -> ChatAgentManager:
+    """Gestionnaire avec les vrais modèles, ou factices si STUB_MODELS=1 (benchmarks, charge)"""
+    if os.getenv("STUB_MODELS", "0") != "1":
+        return ChatAgentManager()
+    
+    from stub_models import create_stub_agent, create_stub_embedder, latencies_from_env
+    latencies = latencies_from_env()
+    logger.info("🧪 STUB_MODELS=1: modèles factices, mémoire dans storage/chat_memory_stub")
+    return ChatAgentManager(
+        agent=create_stub_agent(latencies, small_tier=os.getenv("STUB_SMALL_TIER", "0") == "1"),
+        embedder=create_stub_embedder(latencies),
+        storage_path=str(Path(__file__).parent / "storage" / "chat_memory_stub")
+    )
+
+# Construit au démarrage par `lifespan` (thread d'arrière-plan), ou remplacé
+# directement par les benchmarks
+chat_manager: Optional[ChatAgentManager] = None
+
+def load_chat_manager(warmup: bool = True) -> Optional[ChatAgentManager]:
+    """Construire l'instance globale puis lancer le préchauffage (phases chronométrées)"""
+    global chat_manager
+    STARTUP["state"] = "loading"
+    start = time.perf_counter()
+    try:
+        manager = create_chat_manager()
+    except Exception as e:
+        STARTUP["state"] = "failed"
+        STARTUP["error"] = str(e)
+        logger.exception(f"❌ Initialisation du gestionnaire échouée: {e}")
+        return None
+    STARTUP["phases"]["chat_manager"] = round(time.perf_counter() - start, 3)
+    chat_manager = manager
+    STARTUP["state"] = "ready"
+    STARTUP["ready_seconds"] = round(time.time() - STARTUP["started_at"], 3)
+    
+    phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in STARTUP["phases"].items())
+    logger.info(f"⏱️ Démarrage en {STARTUP['ready_seconds']:.2f}s ({phases})")
+    if warmup:
+        manager.start_warmup()
+    return manager
+
+def get_chat_manager() -> ChatAgentManager:
+    """Instance globale, ou 503 tant qu'elle n'est pas construite"""
+    if chat_manager is None:
+        if STARTUP["state"] == "failed":
+            raise HTTPException(503, f"Initialisation échouée: {STARTUP['error']}")
+        raise HTTPException(503, "Initialisation des modèles en cours", headers={"Retry-After": "5"})
+    return chat_manager
+
+def collect_service_metrics() -> List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]:
+    """Valeurs lues au scrape: tailles, caches, files d'attente, modèles, mémoire"""
+    worker = dict(METRICS.constant_labels)  # Valeurs propres à ce processus
+    process = [
+        ("process_resident_memory_bytes", "gauge", "Mémoire résidente (poids mmap des modèles inclus)",
+         [(worker, process_memory_bytes())]),
+        ("process_uptime_seconds", "gauge", "Temps depuis le démarrage", [(worker, time.time() - STARTUP["started_at"])]),
+        ("startup_phase_seconds", "gauge", "Durée de chaque phase du démarrage",
+         [({**worker, "phase": name}, seconds) for name, seconds in STARTUP["phases"].items()]),
+    ]
+    manager = chat_manager
+    if manager is None:
+        return process
+    try:
+        return manager.service_metrics() + process
+    except Exception as e:  # Serveur de modèles injoignable: métriques du worker seules
+        logger.warning(f"⚠️ Métriques du service indisponibles: {e}")
+        return process
+
+METRICS.register_collector(collect_service_metrics)
+
+# ==========================================
+# ROUTES API
+# ==========================================
+
+@app.get("/")
+async def root():
+    """Page d'accueil de l'API"""
+    return {
+        "name": "Chat Agent API",
+        "version": "1.0.0",
+        "status": "running",
+        "endpoints": {
+            "upload": "/upload",
+            "upload_batch": "/upload/batch",
+            "chat": "/chat",
+            "chat_voice": "/chat/voice",
+            "chat_batch": "/chat/batch",
+            "audio": "/audio/{clip}.wav",
+            "history": "/conversation/{conv_id}",
+            "search": "/search",
+            "stats": "/stats",
+            "pdf": "/pdf/{filename}",
+            "delete_documents": "DELETE /documents/{filename}",
+            "metrics": "/metrics",
+            "models": "/models",
+            "health_live": "/health/live",
+            "health_ready": "/health/ready"
+        }
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Métriques au format Prometheus (compteurs et histogrammes incrémentaux)"""
+    return Response(content=METRICS.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: le processus répond (ne dépend pas des modèles)"""
+    return {
+        "status": "alive",
+        "uptime_seconds": round(time.time() - STARTUP["started_at"], 1),
+        "startup": STARTUP
+    }
+
+@app.get("/health/ready")
+def health_ready():
+    """
+    Readiness: tous les outils requis sont chargés ET préchauffés
+    
+    Retourne 503 tant que l'instance est froide, pour que le load balancer
+    n'y route pas de trafic.
+    """
+    if chat_manager is None:
+        return JSONResponse(status_code=503, content={"ready": False, "startup": STARTUP})
+    readiness = chat_manager.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/models")
+def get_models_status():
+    """État des modèles (chargement à la demande, déchargement sur inactivité)"""
+    return get_chat_manager().models_status()
+
+# ==========================================
+# ADMINISTRATION
+# ==========================================
+
+def verify_admin_token(token: Optional[str]):
+    """Vérifier l'en-tête X-Admin-Token (routes désactivées si ADMIN_TOKEN est vide)"""
+    expected = os.getenv("ADMIN_TOKEN", "")
+    if not expected:
+        raise HTTPException(403, "Routes d'administration désactivées (ADMIN_TOKEN non défini)")
+    if not token or not hmac.compare_digest(token, expected):
+        raise HTTPException(401, "Jeton d'administration invalide")
+
+@app.get("/admin/triggers")
+def get_triggers(x_admin_token: Optional[str] = Header(None)):
+    """Tables de déclencheurs actives"""
+    verify_admin_token(x_admin_token)
+    return get_chat_manager().triggers_info()
+
+@app.post("/admin/triggers/reload")
+def reload_triggers(x_admin_token: Optional[str] = Header(None)):
+    """Recharger les tables de déclencheurs depuis TRIGGERS_PATH sans redémarrer"""
+    verify_admin_token(x_admin_token)
+    manager = get_chat_manager()
+    try:
+        return {"status": "reloaded", **manager.reload_triggers()}
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.post("/admin/profile")
+def start_profile(
+    seconds: float = 30,
+    memory: bool = False,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Profiler tout le processus pendant `seconds` (plafonné par PROFILER_MAX_SECONDS)
+    
+    En mode multi-workers, le serveur de modèles: c'est là que tourne
+    l'inférence, et la session est consultable depuis n'importe quel worker.
+    """
+    verify_admin_token(x_admin_token)
+    if seconds <= 0:
+        raise HTTPException(400, "seconds doit être positif")
+    session = profiling_service().start_profile("window", label=f"{seconds:g}s", seconds=seconds, memory=memory)
+    if session is None:
+        raise HTTPException(409, "Trop de sessions de profilage actives")
+    return {**session, "result": f"/admin/profile/{session['id']}"}
+
+@app.get("/admin/profile")
+def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Sessions de profilage en cours et récentes"""
+    verify_admin_token(x_admin_token)
+    return {"sessions": profiling_service().profile_sessions()}
+
+@app.get("/admin/profile/{session_id}")
+def get_profile(
+    session_id: str,
+    format: str = "json",
+    top: int = 30,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Résultat d'une session
+    
+    format=json: fonctions les plus coûteuses et allocations;
+    format=collapsed: piles pour flamegraph.pl / speedscope.
+    """
+    verify_admin_token(x_admin_token)
+    if format not in ("json", "collapsed"):
+        raise HTTPException(400, "format doit être json ou collapsed")
+    result = profiling_service().profile_result(session_id, format, top)
+    if result is None:
+        raise HTTPException(404, f"Session de profilage inconnue: {session_id}")
+    if result["running"]:
+        return JSONResponse(status_code=202, content=result["summary"])
+    if format == "collapsed":
+        return Response(content=result["collapsed"], media_type="text/plain; charset=utf-8")
+    return result["summary"]
+
+@app.post("/upload")
+async def upload_file(
+    file: UploadFile = File(...),
+    description: Optional[str] = Form(None),
+    debug: bool = False
+):
+    """
+    Upload un fichier (image ou PDF) pour analyse
+    
+    Le fichier est analysé et ajouté à la mémoire vectorielle FAISS.
+    `?debug=true` ajoute la trace des étapes (vision, détection, LLM...).
+    """
+    manager = get_chat_manager()
+    try:
+        content = await file.read()
+        with trace("POST /upload", filename=file.filename or "") as request_trace:
+            # Vision, LLM et sauvegarde FAISS sont bloquants: hors de la boucle
+            result = await asyncio.to_thread(
+                manager.process_upload, content, file.filename, file.content_type, description
+            )
+        if debug:
+            result["debug"] = request_trace.to_dict()
+        
+        # S'assurer que la structure est correcte pour Flutter
+        if not result.get("documents"):
+            result["documents"] = []
+        
+        # LOG DÉTAILLÉ pour déboguer
+        logger.info(f"📤 Retour API: {len(result.get('documents', []))} documents, {len(str(result))} bytes")
+        logger.info(f"🔍 Clés dans result: {list(result.keys())}")
+        logger.info(f"🔍 Description présente: {'description' in result}")
+        logger.info(f"🔍 Synthesis présente: {'synthesis' in result}")
+        
+        # Afficher un extrait de la réponse
+        if result.get("description"):
+            logger.info(f"📝 Description (100 premiers chars): {result['description'][:100]}...")
+        if result.get("synthesis"):
+            logger.info(f"📝 Synthèse (100 premiers chars): {result['synthesis'][:100]}...")
+        
+        return JSONResponse(content=result)
+    except Exception as e:
+        logger.error(f"❌ Erreur upload: {e}")
+        raise HTTPException(500, str(e))
+
+@app.post("/upload/batch")
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    description: Optional[str] = Form(None),
+    synthesis: Optional[bool] = Form(None)
+):
+    """
+    Upload de plusieurs images (dossier de photos) analysées et indexées en lot
+    
+    `synthesis` force ou désactive les synthèses Mistral (défaut: UPLOAD_BATCH_SYNTHESIS).
+    
+    Réponse en flux NDJSON, un événement JSON par ligne:
+    - {"type": "start", "batch_id", "total", "synthesis"}
+    - {"type": "progress", "index", "filename", "stage"}: decoded, analyzed, synthesized
+    - {"type": "result", "index", "filename", "id", "description", "synthesis", ...}
+      ou {"type": "error", "index", "filename", "error"}
+    - {"type": "done", "succeeded", "failed", "total_seconds", "throughput_per_s", ...}
+    
+    Si le client se déconnecte, les images restantes ne sont ni analysées ni indexées.
+    """
+    max_files = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "200"))
+    if not files:
+        raise HTTPException(400, "Aucun fichier")
+    if len(files) > max_files:
+        raise HTTPException(413, f"Au plus {max_files} fichiers par lot")
+    manager = get_chat_manager()
+    contents = [(await file.read(), file.filename, file.content_type) for file in files]
+    events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+    disconnected = threading.Event()
+    
+    def on_event(event: Dict[str, Any]):
+        if disconnected.is_set():
+            raise ConnectionAbortedError("client déconnecté")
+        events.put(event)
+    
+    def run_batch():
+        try:
+            summary = manager.process_upload_batch(
+                contents,
+                description=description,
+                synthesize=synthesis,
+                on_event=on_event
+            )
+            events.put({"type": "done", **summary})
+        except Exception as e:
+            if not disconnected.is_set():
+                logger.error(f"❌ Erreur lot d'images: {e}")
+            events.put({"type": "failed", "error": str(e)})
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run_batch, name="upload-batch", daemon=True).start()
+    
+    async def stream():
+        try:
+            while True:
+                event = await asyncio.to_thread(events.get)
+                if event is None:
+                    return
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            # Déconnexion (ou fin): le lot s'arrête au prochain événement
+            disconnected.set()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.post("/chat", response_model=ChatResponse)
+def chat(request: ChatRequest):
+    """
+    Envoyer un message de chat
+    
+    L'agent utilise FAISS pour rechercher le contexte pertinent
+    et génère une réponse intelligente.
+    """
+    manager = get_chat_manager()
+    try:
+        # Générer un ID de conversation si non fourni
+        conv_id = request.conversation_id or f"conv_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
+        with trace("POST /chat", conversation_id=conv_id) as request_trace:
+            response = manager.chat(
+                message=request.message,
+                conversation_id=conv_id,
+                use_memory=request.use_memory,
+                temperature=request.temperature
+            )
+        if request.debug:
+            response.debug = request_trace.to_dict()
+        
+        return response
+    except Exception as e:
+        logger.error(f"❌ Erreur chat: {e}")
+        raise HTTPException(500, str(e))
+
+@app.post("/chat/voice")
+async def chat_voice(request: ChatRequest, inline_audio: bool = True):
+    """
+    Chat avec réponse vocale en flux (NDJSON, un événement JSON par ligne)
+    
+    La réponse est découpée en phrases pendant la génération; chaque phrase
+    est synthétisée dès qu'elle est complète, pendant que le LLM continue.
+    
+    Événements, dans l'ordre:
+    - {"type": "sentence", "index", "text"}: phrase prête (texte à afficher)
+    - {"type": "audio", "index", "text", "audio_url", "cached", "audio"?}:
+      clip WAV de la phrase (base64 si inline_audio, sinon via audio_url)
+    - {"type": "audio_error", "index"}: synthèse de la phrase impossible
+    - {"type": "done", ...ChatResponse}: réponse complète
+    """
+    manager = get_chat_manager()
+    conv_id = request.conversation_id or f"conv_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    timeout = float(os.getenv("TTS_STREAM_TIMEOUT", "120"))
+    outcome: Dict[str, Any] = {"streamed": False}
+    started = threading.Event()
+    
+    def on_text(piece: str):
+        outcome["streamed"] = True
+        outcome["stream"].feed(piece)
+    
+    def run_chat():
+        # La trace couvre la génération ET les synthèses (thread du flux)
+        with trace("POST /chat/voice", conversation_id=conv_id) as request_trace:
+            stream = SpeechStream(
+                manager.synthesize_speech,
+                min_chars=int(os.getenv("TTS_STREAM_MIN_CHARS", "20")),
+                max_chars=int(os.getenv("TTS_STREAM_MAX_CHARS", "300"))
+            )
+            outcome.update(stream=stream, trace=request_trace)
+            started.set()
+            try:
+                response = manager.chat(
+                    message=request.message,
+                    conversation_id=conv_id,
+                    use_memory=request.use_memory,
+                    temperature=request.temperature,
+                    on_text=on_text
+                )
+                outcome["response"] = response
+                if not outcome["streamed"]:
+                    stream.feed(response.response)  # Réponse non générée en flux (LLM indisponible)
+                stream.close()
+            except Exception as e:
+                logger.error(f"❌ Erreur chat vocal: {e}")
+                stream.close(error=str(e))
+            stream.join(timeout)
+    
+    threading.Thread(target=run_chat, name="chat-voice", daemon=True).start()
+    
+    def events():
+        started.wait()
+        stream = outcome["stream"]
+        for event in stream.events(timeout=timeout):
+            if event["type"] == "audio":
+                audio = event.pop("audio")
+                event["audio_url"] = f"/audio/{event['key']}.wav"
+                if inline_audio:
+                    event["audio"] = base64.b64encode(audio).decode("ascii")
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+        response = outcome.get("response")
+        if response is not None:
+            if request.debug:
+                response.debug = outcome["trace"].to_dict()
+            yield json.dumps({"type": "done", **response.dict()}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.post("/chat/batch")
+async def chat_batch(request: ChatBatchRequest):
+    """
+    Questions en lot (back-office, contrôles de conformité sur les PDF)
+    
+    Réponse en flux NDJSON, un événement JSON par ligne:
+    - {"type": "start", "batch_id", "total", "concurrency"}
+    - {"type": "result", "index", "question", "response", "sources", "seconds"}
+      ou {"type": "error", "index", "question", "error"}, dans l'ordre de fin
+    - {"type": "done", "succeeded", "failed", "total_seconds", "throughput_per_s", ...}
+    
+    Si le client se déconnecte, les questions pas encore lancées sont abandonnées.
+    """
+    max_questions = int(os.getenv("BATCH_CHAT_MAX_QUESTIONS", "1000"))
+    questions = [q.strip() for q in request.questions]
+    if not questions or not all(questions):
+        raise HTTPException(400, "Liste de questions vide ou question vide")
+    if len(questions) > max_questions:
+        raise HTTPException(413, f"Au plus {max_questions} questions par lot")
+    manager = get_chat_manager()
+    events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+    disconnected = threading.Event()
+    
+    def on_result(event: Dict[str, Any]):
+        if disconnected.is_set():
+            raise ConnectionAbortedError("client déconnecté")
+        events.put(event)
+    
+    def run_batch():
+        try:
+            summary = manager.chat_batch(
+                questions,
+                use_memory=request.use_memory,
+                use_web=request.use_web,
+                k=max(1, min(request.k, 20)),
+                on_result=on_result
+            )
+            events.put({"type": "done", **summary})
+        except Exception as e:
+            if not disconnected.is_set():
+                logger.error(f"❌ Erreur lot: {e}")
+            events.put({"type": "failed", "error": str(e)})
+        finally:
+            events.put(None)
+    
+    threading.Thread(target=run_batch, name="chat-batch", daemon=True).start()
+    
+    async def stream():
+        try:
+            while True:
+                event = await asyncio.to_thread(events.get)
+                if event is None:
+                    return
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        finally:
+            # Déconnexion (ou fin): le lot s'arrête au prochain résultat
+            disconnected.set()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/audio/{clip}")
+def get_audio(clip: str):
+    """Clip audio du cache (adressé par contenu: réponse immuable)"""
+    path = get_chat_manager().audio_path(clip[:-len(".wav")] if clip.endswith(".wav") else clip)
+    if path is None:
+        raise HTTPException(404, "Clip audio introuvable")
+    return Response(
+        content=Path(path).read_bytes(),
+        media_type="audio/wav",
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+@app.get("/conversation/{conv_id}")
+def get_conversation(conv_id: str, limit: int = 50, before: Optional[int] = None):
+    """
+    Récupérer l'historique d'une conversation (paginé)
+    
+    - limit: nombre de messages (max 500)
+    - before: renvoyer les messages antérieurs à ce `seq` (valeur `next_before`
+      de la page précédente)
+    """
+    page = get_chat_manager().conversation_page(conv_id, limit=max(1, min(limit, 500)), before=before)
+    return {
+        "conversation_id": conv_id,
+        **page
+    }
+
+@app.post("/search")
+def search_memory(query: str, k: int = 10):
+    """Rechercher dans la mémoire vectorielle"""
+    results = get_chat_manager().search(query, k)
+    return {
+        "query": query,
+        "results": results,
+        "total": len(results)
+    }
+
+@app.get("/stats")
+def get_stats():
+    """Statistiques de la mémoire avec détails RAG PDF (compteurs incrémentaux)"""
+    return {
+        **get_chat_manager().stats(),
+        "tracing": TRACE_EXPORTER.stats()
+    }
+
+@app.delete("/clear")
+def clear_memory():
+    """Effacer toute la mémoire"""
+    get_chat_manager().clear()
+    return {"status": "memory cleared"}
+
+@app.get("/pdf/{filename}")
+def get_pdf_details(filename: str):
+    """Obtenir les détails d'un PDF spécifique (index par nom de fichier)"""
+    details = get_chat_manager().pdf_details(filename)
+    if details is None:
+        raise HTTPException(404, f"PDF '{filename}' non trouvé dans la base")
+    return details
+
+@app.delete("/documents/{filename}")
+def delete_file_documents(filename: str):
+    """Retirer un fichier de la base de connaissances (chunks, images extraites)"""
+    manager = get_chat_manager()
+    removed = manager.delete_file(filename)
+    if not removed:
+        raise HTTPException(404, f"Fichier '{filename}' non trouvé dans la base")
+    
+    return {
+        "filename": filename,
+        "removed_documents": removed,
+        "total_documents": manager.stats()["total_documents"]
+    }
+
+# ==========================================
+# LANCEMENT
+# ==========================================
+
+def run_workers(host: str, port: int, workers: int):
+    """
+    Mode multi-workers: un serveur de modèles partagé + N workers HTTP uvicorn
+    
+    Les workers héritent de MODEL_SERVER_SOCKET / MODEL_SERVER_AUTHKEY (clé
+    générée si absente) et n'importent aucun modèle.
+    """
+    import secrets
+    import subprocess
+    import tempfile
+    if not os.getenv("MODEL_SERVER_SOCKET"):
+        os.environ["MODEL_SERVER_SOCKET"] = str(Path(tempfile.gettempdir()) / f"chat_agent_models_{port}.sock")
+    if not os.getenv("MODEL_SERVER_AUTHKEY"):
+        os.environ["MODEL_SERVER_AUTHKEY"] = secrets.token_hex(16)
+    
+    server = subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--model-server"])
+    logger.info(f"🛰️ Serveur de modèles lancé (pid {server.pid}), {workers} workers HTTP")
+    try:
+        uvicorn.run(
+            "chat_agent_api:app",
+            host=host,
+            port=port,
+            workers=workers,
+            app_dir=str(Path(__file__).parent),
+            log_level="info"
+        )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Chat Agent API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "1")),
+                        help="Workers HTTP (> 1: modèles servis par un processus partagé)")
+    parser.add_argument("--model-server", action="store_true",
+                        help="Lancer uniquement le serveur de modèles (MODEL_SERVER_SOCKET)")
+    args = parser.parse_args()
+    
+    if args.model_server:
+        serve_models()
+        sys.exit(0)
+    
+    local_ip = get_local_ip()
+    port = args.port
+    
+    print(f"""
+╔═══════════════════════════════════════════════════════╗
+║  🤖 CHAT AGENT API - Multimodal avec FAISS          ║
+║  Version 1.0.0                                        ║
+║                                                       ║
+║  📡 Serveur démarré sur:                             ║
+║     - Local:   http://127.0.0.1:{port}                ║
+║     - Network: http://{local_ip}:{port}              ║
+║                                                       ║
+║  🔗 Endpoints disponibles:                           ║
+║     - POST /chat       : Discussion avec l'agent    ║
+║     - POST /upload     : Upload fichier             ║
+║     - GET  /           : Page d'accueil             ║
+╚═══════════════════════════════════════════════════════╝
+
+✅ Copiez cette URL dans votre application Flutter:
+   http://{local_ip}:{port}
+    """)
+    
+    if args.workers > 1:
+        run_workers(args.host, port, args.workers)
+    else:
+        uvicorn.run(
+            app,
+            host=args.host,
+            port=port,
+            log_level="info"
+        )
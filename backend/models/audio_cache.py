@@ -0,0 +1,151 @@
+"""
+🔊 CACHE AUDIO ADRESSÉ PAR CONTENU
+==================================
+
+Les mêmes phrases (salutations, explications fixes de l'application,
+"Modèle LLM non disponible...") étaient resynthétisées à chaque demande.
+Chaque clip est stocké sous l'empreinte SHA-256 de (modèle, voix, texte
+normalisé): une phrase déjà dite est servie depuis le disque sans charger
+Coqui TTS.
+
+- Fichiers `<racine>/<2 premiers caractères>/<clé>.wav`, écrits atomiquement
+- Taille totale plafonnée: éviction des clips les moins récemment servis
+- La clé sert aussi d'URL stable: GET /audio/<clé>.wav
+
+Auteur: BelikanM
+"""
+
+import os
+import re
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r"\s+")
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+def audio_key(text: str, voice: str = "", model: str = "") -> str:
+    """Empreinte d'un clip: même texte + même voix + même modèle = même audio"""
+    normalized = _SPACES.sub(" ", unicodedata.normalize("NFKC", text or "")).strip()
+    payload = f"{model}\x00{voice}\x00{normalized}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Stockage disque des clips audio synthétisés
+
+    Args:
+        root: Dossier du cache
+        max_bytes: Taille totale maximale (0 = cache désactivé)
+    """
+
+    def __init__(self, root: str, max_bytes: int = 256 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()  # clé -> octets, ordre LRU
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            self._scan()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _scan(self):
+        """Réindexer les clips existants (du plus ancien au plus récent)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.root.glob("*/*.wav"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self.total_bytes += size
+        if entries:
+            logger.info(f"🔊 Cache audio: {len(entries)} clip(s), {self.total_bytes / 1e6:.1f} Mo")
+
+    def path_for(self, key: str) -> Optional[Path]:
+        """Chemin du clip (None si la clé est invalide)"""
+        if not _KEY.match(key or ""):
+            return None
+        return self.root / key[:2] / f"{key}.wav"
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        with self._lock:
+            if path is None or key not in self._sizes:
+                self.misses += 1
+                return None
+            self._sizes.move_to_end(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._sizes.pop(key, 0)
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Récence conservée après redémarrage
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        path = self.path_for(key)
+        if not self.enabled or path is None or not data or len(data) > self.max_bytes:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Écriture du cache audio échouée: {e}")
+            return
+
+        with self._lock:
+            self.total_bytes += len(data) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(data)
+            evicted = []
+            while self.total_bytes > self.max_bytes and len(self._sizes) > 1:
+                old_key, size = self._sizes.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                self.path_for(old_key).unlink()
+            except OSError:
+                pass
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sizes
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "clips": len(self._sizes),
+            "size_mb": round(self.total_bytes / 1e6, 2),
+            "max_mb": round(self.max_bytes / 1e6, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
@@ -0,0 +1,346 @@
+"""
+💬 STOCKAGE DURABLE DES CONVERSATIONS (SQLite)
+===============================================
+
+Remplace le dict en mémoire `FAISSMemoryManager.conversations`, qui grossissait
+sans limite et était perdu à chaque redémarrage.
+
+- Journal append-only par conversation (table `messages`, clé (conversation, seq))
+- Queue chaude en mémoire: les N derniers messages des conversations actives
+  (LRU borné), servie sans requête SQL pour la construction des prompts
+- Pagination de l'historique (curseur `before` sur `seq`)
+- Expiration des conversations inactives depuis `retention_days`
+- Résumé glissant par conversation (table `summaries`, voir
+  `conversation_summarizer.py`)
+
+Mode WAL: les lectures ne bloquent pas les écritures.
+
+Auteur: BelikanM
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations(updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    images TEXT,
+    timestamp TEXT,
+    PRIMARY KEY (conversation_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS summaries (
+    conversation_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    upto_seq INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class ConversationStore:
+    """
+    Stockage persistant et borné des conversations
+
+    Args:
+        db_path: Fichier SQLite (":memory:" pour un stockage volatil)
+        hot_tail: Messages récents gardés en mémoire par conversation
+        max_hot_conversations: Conversations gardées en queue chaude (LRU)
+        retention_days: Expiration des conversations inactives (0 = jamais)
+        purge_interval: Période de la purge en arrière-plan (secondes)
+    """
+
+    def __init__(
+        self,
+        db_path: str = ":memory:",
+        hot_tail: int = 20,
+        max_hot_conversations: int = 1000,
+        retention_days: float = 30,
+        purge_interval: float = 3600
+    ):
+        self.db_path = db_path
+        self.hot_tail = hot_tail
+        self.max_hot_conversations = max_hot_conversations
+        self.retention_days = retention_days
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        self._hot: "OrderedDict[str, deque]" = OrderedDict()
+
+        self._stop = threading.Event()
+        if retention_days > 0 and purge_interval > 0:
+            threading.Thread(
+                target=self._purge_loop,
+                args=(purge_interval,),
+                name="conversation-purge",
+                daemon=True
+            ).start()
+
+        logger.info(f"💬 Conversations: {self.count()} stockées ({db_path})")
+
+    # ==========================================
+    # ÉCRITURE
+    # ==========================================
+
+    def append(self, conversation_id: str, message: Dict[str, Any]) -> int:
+        """Ajouter un message à la fin d'une conversation"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT message_count FROM conversations WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone()
+            seq = row["message_count"] if row else 0
+
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO messages (conversation_id, seq, role, content, images, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        conversation_id,
+                        seq,
+                        message.get("role", ""),
+                        message.get("content", ""),
+                        json.dumps(message["images"]) if message.get("images") else None,
+                        message.get("timestamp")
+                    )
+                )
+                self._conn.execute(
+                    "INSERT INTO conversations (conversation_id, created_at, updated_at, message_count) "
+                    "VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT(conversation_id) DO UPDATE SET "
+                    "updated_at = excluded.updated_at, message_count = message_count + 1",
+                    (conversation_id, now, now)
+                )
+
+            # Mettre à jour la queue chaude seulement si elle est déjà chargée
+            tail = self._hot.get(conversation_id)
+            if tail is not None:
+                tail.append({**message, "seq": seq})
+                self._hot.move_to_end(conversation_id)
+            elif seq == 0:
+                self._put_hot(conversation_id, deque([{**message, "seq": seq}], maxlen=self.hot_tail))
+
+        return seq
+
+    # ==========================================
+    # LECTURE
+    # ==========================================
+
+    def tail(self, conversation_id: str, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Derniers messages d'une conversation (queue chaude, sinon SQLite)"""
+        n = self.hot_tail if n is None else n
+        with self._lock:
+            tail = self._hot.get(conversation_id)
+            if tail is None:
+                rows = self._conn.execute(
+                    "SELECT * FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+                    (conversation_id, self.hot_tail)
+                ).fetchall()
+                if not rows:
+                    return []
+                tail = deque((self._row_to_message(r) for r in reversed(rows)), maxlen=self.hot_tail)
+                self._put_hot(conversation_id, tail)
+            else:
+                self._hot.move_to_end(conversation_id)
+            messages = list(tail)
+
+        if n <= len(messages):
+            return messages[-n:] if n else []
+        # Plus que la queue chaude demandé: lecture paginée
+        return self.page(conversation_id, limit=n)["messages"]
+
+    def page(
+        self,
+        conversation_id: str,
+        limit: int = 50,
+        before: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Page d'historique, du plus ancien au plus récent
+
+        Args:
+            limit: Nombre de messages
+            before: Renvoyer les messages de seq < before (None = les plus récents)
+
+        Returns:
+            {"messages": [...], "total": int, "next_before": seq ou None}
+        """
+        with self._lock:
+            total_row = self._conn.execute(
+                "SELECT message_count FROM conversations WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone()
+            total = total_row["message_count"] if total_row else 0
+
+            if before is None:
+                rows = self._conn.execute(
+                    "SELECT * FROM messages WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+                    (conversation_id, limit)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT * FROM messages WHERE conversation_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                    (conversation_id, before, limit)
+                ).fetchall()
+
+        messages = [self._row_to_message(r) for r in reversed(rows)]
+        first_seq = messages[0]["seq"] if messages else 0
+        return {
+            "messages": messages,
+            "total": total,
+            "next_before": first_seq if first_seq > 0 else None
+        }
+
+    def messages_after(
+        self,
+        conversation_id: str,
+        after: int = -1,
+        limit: int = 200
+    ) -> List[Dict[str, Any]]:
+        """Messages de seq > after, du plus ancien au plus récent"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM messages WHERE conversation_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (conversation_id, after, limit)
+            ).fetchall()
+        return [self._row_to_message(r) for r in rows]
+
+    def message_count(self, conversation_id: str) -> int:
+        """Nombre de messages d'une conversation"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT message_count FROM conversations WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone()
+        return row["message_count"] if row else 0
+
+    # ==========================================
+    # RÉSUMÉS
+    # ==========================================
+
+    def get_summary(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Résumé glissant: {"summary", "upto_seq", "updated_at"} ou None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, upto_seq, updated_at FROM summaries WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def set_summary(self, conversation_id: str, summary: str, upto_seq: int):
+        """Enregistrer le résumé des messages jusqu'à `upto_seq` inclus"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO summaries (conversation_id, summary, upto_seq, updated_at) "
+                    "VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(conversation_id) DO UPDATE SET "
+                    "summary = excluded.summary, upto_seq = excluded.upto_seq, "
+                    "updated_at = excluded.updated_at",
+                    (conversation_id, summary, upto_seq, time.time())
+                )
+
+    def count(self) -> int:
+        """Nombre de conversations stockées"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def __contains__(self, conversation_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM conversations WHERE conversation_id = ?",
+                (conversation_id,)
+            ).fetchone() is not None
+
+    # ==========================================
+    # EXPIRATION / MAINTENANCE
+    # ==========================================
+
+    def purge_expired(self) -> int:
+        """Supprimer les conversations inactives depuis `retention_days`"""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = time.time() - self.retention_days * 86400
+
+        with self._lock:
+            expired = [
+                r["conversation_id"] for r in self._conn.execute(
+                    "SELECT conversation_id FROM conversations WHERE updated_at < ?",
+                    (cutoff,)
+                ).fetchall()
+            ]
+            with self._conn:
+                for conversation_id in expired:
+                    self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+                    self._conn.execute("DELETE FROM summaries WHERE conversation_id = ?", (conversation_id,))
+                    self._conn.execute("DELETE FROM conversations WHERE conversation_id = ?", (conversation_id,))
+                    self._hot.pop(conversation_id, None)
+
+        if expired:
+            logger.info(f"🧹 {len(expired)} conversation(s) expirée(s)")
+        return len(expired)
+
+    def _purge_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.purge_expired()
+            except Exception as e:
+                logger.warning(f"⚠️ Purge des conversations échouée: {e}")
+
+    def clear(self):
+        """Effacer toutes les conversations"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM messages")
+                self._conn.execute("DELETE FROM summaries")
+                self._conn.execute("DELETE FROM conversations")
+            self._hot.clear()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._conn.close()
+
+    # ==========================================
+    # UTILITAIRES
+    # ==========================================
+
+    def _put_hot(self, conversation_id: str, tail: deque):
+        """Ajouter une queue chaude (verrou tenu), en évinçant la plus ancienne"""
+        self._hot[conversation_id] = tail
+        self._hot.move_to_end(conversation_id)
+        while len(self._hot) > self.max_hot_conversations:
+            self._hot.popitem(last=False)
+
+    @staticmethod
+    def _row_to_message(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "seq": row["seq"],
+            "role": row["role"],
+            "content": row["content"],
+            "images": json.loads(row["images"]) if row["images"] else None,
+            "timestamp": row["timestamp"]
+        }
@@ -0,0 +1,186 @@
+"""
+📝 RÉSUMÉ GLISSANT DES CONVERSATIONS
+=====================================
+
+Les longues conversations perdaient leur contexte (seuls les 2 derniers
+messages étaient repris) et élargir la fenêtre faisait exploser la taille
+des prompts. Le résumeur replie les anciens échanges dans un résumé compact:
+
+    prompt = résumé (≤ max_summary_tokens) + derniers échanges (keep_recent)
+
+- Exécuté dans un thread d'arrière-plan, jamais sur le chemin de la requête
+- Déclenché quand les messages non résumés (hors `keep_recent` derniers)
+  dépassent `trigger_tokens`
+- Incrémental: l'ancien résumé + les nouveaux messages → nouveau résumé,
+  par lots bornés en tokens
+- Le résumé et le dernier `seq` résumé sont stockés dans `ConversationStore`
+
+Auteur: BelikanM
+"""
+
+import queue
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = """Tu tiens à jour le résumé d'une conversation entre un utilisateur et un assistant.
+
+Résumé actuel:
+{summary}
+
+Nouveaux échanges:
+{turns}
+
+Réécris le résumé en intégrant les nouveaux échanges. Garde les faits, les
+préférences de l'utilisateur, les décisions et les questions en suspens.
+Réponds uniquement par le résumé, en quelques phrases."""
+
+# Longueur maximale d'un message repris dans un lot (caractères)
+MAX_MESSAGE_CHARS = 1500
+
+
+class ConversationSummarizer:
+    """
+    Résumeur incrémental en arrière-plan
+
+    Args:
+        store: ConversationStore (messages + résumés)
+        generate: Fonction (prompt, max_tokens) -> texte ou None si le LLM
+            n'est pas disponible
+        count_tokens: Fonction de comptage de tokens
+        trigger_tokens: Tokens non résumés déclenchant un résumé
+        keep_recent: Derniers messages jamais résumés (repris tels quels)
+        max_summary_tokens: Longueur maximale du résumé généré
+        batch_tokens: Tokens de messages repliés par appel au LLM
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        generate: Callable[[str, int], Optional[str]],
+        count_tokens: Callable[[str], int],
+        trigger_tokens: int = 1200,
+        keep_recent: int = 6,
+        max_summary_tokens: int = 250,
+        batch_tokens: int = 1500
+    ):
+        self.store = store
+        self.generate = generate
+        self.count_tokens = count_tokens
+        self.trigger_tokens = trigger_tokens
+        self.keep_recent = keep_recent
+        self.max_summary_tokens = max_summary_tokens
+        self.batch_tokens = batch_tokens
+
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.summaries_written = 0
+        self.skipped = 0
+
+        threading.Thread(target=self._worker, name="conversation-summarizer", daemon=True).start()
+
+    # ==========================================
+    # CHEMIN DE LA REQUÊTE
+    # ==========================================
+
+    def schedule(self, conversation_id: str):
+        """Demander une vérification du seuil (non bloquant, dédupliqué)"""
+        with self._lock:
+            if conversation_id in self._pending:
+                return
+            self._pending.add(conversation_id)
+        self._queue.put(conversation_id)
+
+    def context(self, conversation_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Contexte à injecter dans le prompt
+
+        Returns:
+            (résumé ou "", derniers messages non couverts par le résumé)
+        """
+        summary = self.store.get_summary(conversation_id)
+        recent = self.store.tail(conversation_id, self.keep_recent)
+        if summary is None:
+            return "", recent
+        return summary["summary"], [m for m in recent if m["seq"] > summary["upto_seq"]]
+
+    # ==========================================
+    # ARRIÈRE-PLAN
+    # ==========================================
+
+    def _worker(self):
+        while True:
+            conversation_id = self._queue.get()
+            with self._lock:
+                self._pending.discard(conversation_id)
+            try:
+                self.summarize(conversation_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Résumé de {conversation_id} échoué: {e}")
+
+    def summarize(self, conversation_id: str, force: bool = False) -> bool:
+        """
+        Replier les anciens messages dans le résumé si le seuil est atteint
+
+        Returns:
+            True si le résumé a été mis à jour
+        """
+        existing = self.store.get_summary(conversation_id)
+        summary = existing["summary"] if existing else ""
+        upto = existing["upto_seq"] if existing else -1
+
+        # Messages candidats: non résumés et hors des `keep_recent` derniers
+        last_foldable = self.store.message_count(conversation_id) - self.keep_recent - 1
+        if last_foldable <= upto:
+            return False
+        candidates = [
+            m for m in self.store.messages_after(conversation_id, upto, limit=last_foldable - upto)
+            if m["seq"] <= last_foldable
+        ]
+        lines = [f"{m['role']}: {m['content'][:MAX_MESSAGE_CHARS]}" for m in candidates]
+        counts = [self.count_tokens(line) for line in lines]
+
+        if not force and sum(counts) < self.trigger_tokens:
+            return False
+
+        updated = False
+        start = 0
+        while start < len(candidates):
+            # Lot borné en tokens (au moins un message)
+            end, used = start, 0
+            while end < len(candidates) and (end == start or used + counts[end] <= self.batch_tokens):
+                used += counts[end]
+                end += 1
+
+            prompt = SUMMARY_PROMPT.format(
+                summary=summary or "(aucun)",
+                turns="\n".join(lines[start:end])
+            )
+            new_summary = self.generate(prompt, self.max_summary_tokens)
+            if not new_summary:
+                # LLM indisponible: on réessaiera au prochain échange
+                self.skipped += 1
+                break
+
+            summary = new_summary.strip()
+            upto = candidates[end - 1]["seq"]
+            self.store.set_summary(conversation_id, summary, upto)
+            self.summaries_written += 1
+            updated = True
+            start = end
+
+        if updated:
+            logger.info(f"📝 Résumé de {conversation_id} mis à jour (jusqu'au message {upto})")
+        return updated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "summaries_written": self.summaries_written,
+            "skipped_llm_unavailable": self.skipped,
+            "trigger_tokens": self.trigger_tokens,
+            "keep_recent": self.keep_recent
+        }
@@ -0,0 +1,154 @@
+"""
+🗂️ STATISTIQUES INCRÉMENTALES DU CORPUS
+========================================
+
+`/stats` parcourait tous les documents à chaque appel pour compter les
+chunks PDF, les PDFs distincts et les images, et `/pdf/{filename}` parcourait
+toute la liste pour retrouver les chunks d'un seul fichier: les deux
+ralentissaient à chaque upload.
+
+Ici les compteurs sont tenus à jour à l'ajout et à la suppression:
+- compteurs par catégorie (chunks PDF, images, autres)
+- index nom de fichier -> identifiants des documents
+- agrégats par fichier (chunks, caractères)
+
+`/stats` devient O(1) (hors liste des fichiers) et `/pdf/{filename}`
+O(chunks du fichier). L'index est sauvegardé avec la mémoire
+(`corpus_index.json`) et reconstruit une fois si désynchronisé.
+
+Auteur: BelikanM
+"""
+
+import logging
+from typing import Dict, Any, List, Optional, Iterable
+
+logger = logging.getLogger(__name__)
+
+PDF_CHUNK_TYPES = ("pdf_rag", "pdf_chunk")
+IMAGE_TYPES = ("image", "pdf_image")
+
+CORPUS_INDEX_VERSION = 1
+
+
+def document_category(doc: Dict[str, Any]) -> str:
+    """Catégorie de comptage d'un document: pdf_chunks, images ou other"""
+    doc_type = doc.get("type", "")
+    if doc_type in PDF_CHUNK_TYPES:
+        return "pdf_chunks"
+    if doc_type in IMAGE_TYPES:
+        return "images"
+    return "other"
+
+
+def _filename(doc: Dict[str, Any]) -> str:
+    return (doc.get("metadata") or {}).get("filename", "") or ""
+
+
+class CorpusIndex:
+    """Compteurs et index par fichier, mis à jour à chaque ajout/suppression"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {"pdf_chunks": 0, "images": 0, "other": 0}
+        self.documents = 0
+        # nom de fichier -> {"doc_ids": [...], "chunk_ids": [...], "chunk_characters": int}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # Fichiers ayant au moins un chunk PDF (dict utilisé comme ensemble ordonné)
+        self._pdf_files: Dict[str, None] = {}
+
+    def add(self, doc: Dict[str, Any]):
+        category = document_category(doc)
+        self.counts[category] += 1
+        self.documents += 1
+
+        filename = _filename(doc)
+        if not filename:
+            return
+        entry = self.files.setdefault(filename, {"doc_ids": [], "chunk_ids": [], "chunk_characters": 0})
+        entry["doc_ids"].append(doc["id"])
+        if category == "pdf_chunks":
+            entry["chunk_ids"].append(doc["id"])
+            entry["chunk_characters"] += len(doc.get("text", ""))
+            self._pdf_files[filename] = None
+
+    def remove(self, doc: Dict[str, Any]):
+        category = document_category(doc)
+        self.counts[category] = max(0, self.counts[category] - 1)
+        self.documents = max(0, self.documents - 1)
+
+        filename = _filename(doc)
+        entry = self.files.get(filename)
+        if entry is None:
+            return
+        if doc["id"] in entry["doc_ids"]:
+            entry["doc_ids"].remove(doc["id"])
+        if category == "pdf_chunks" and doc["id"] in entry["chunk_ids"]:
+            entry["chunk_ids"].remove(doc["id"])
+            entry["chunk_characters"] -= len(doc.get("text", ""))
+        if not entry["chunk_ids"]:
+            self._pdf_files.pop(filename, None)
+        if not entry["doc_ids"]:
+            del self.files[filename]
+
+    def rebuild(self, documents: Iterable[Dict[str, Any]]):
+        """Recalcul complet (chargement d'une mémoire sans index valide)"""
+        self.__init__()
+        for doc in documents:
+            self.add(doc)
+
+    def doc_ids(self, filename: str) -> List[int]:
+        entry = self.files.get(filename)
+        return list(entry["doc_ids"]) if entry else []
+
+    def chunk_ids(self, filename: str) -> List[int]:
+        entry = self.files.get(filename)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def file_stats(self, filename: str) -> Optional[Dict[str, Any]]:
+        entry = self.files.get(filename)
+        if not entry or not entry["chunk_ids"]:
+            return None
+        chunks = len(entry["chunk_ids"])
+        return {
+            "total_chunks": chunks,
+            "total_characters": entry["chunk_characters"],
+            "average_chunk_size": entry["chunk_characters"] // chunks
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Bloc `rag_statistics` de /stats"""
+        return {
+            "pdf_chunks": self.counts["pdf_chunks"],
+            "unique_pdfs": len(self._pdf_files),
+            "pdf_files": list(self._pdf_files),
+            "images": self.counts["images"],
+            "other_documents": self.counts["other"]
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": CORPUS_INDEX_VERSION,
+            "documents": self.documents,
+            "counts": self.counts,
+            "files": self.files
+        }
+
+    def load(self, data: Dict[str, Any], expected_documents: int) -> bool:
+        """
+        Restaurer un index sauvegardé
+
+        Returns:
+            False si l'index est absent, d'une autre version ou ne correspond
+            pas au nombre de documents chargés (l'appelant reconstruit alors)
+        """
+        if (
+            not data
+            or data.get("version") != CORPUS_INDEX_VERSION
+            or data.get("documents") != expected_documents
+        ):
+            return False
+        self.__init__()
+        self.documents = expected_documents
+        self.counts.update(data.get("counts", {}))
+        self.files = data.get("files", {})
+        self._pdf_files = {name: None for name, entry in self.files.items() if entry.get("chunk_ids")}
+        return True
@@ -0,0 +1,112 @@
+"""
+🧮 CACHE DES EMBEDDINGS DE REQUÊTES
+====================================
+
+Un passage MiniLM par requête: l'embedding du message est calculé une fois
+puis partagé par le routage d'intention, la recherche FAISS et les caches
+sémantiques. Les requêtes répétées (ex: `/search` puis `/chat` sur la même
+question, questions fréquentes) ne repassent pas par le modèle.
+
+- Clé normalisée (NFKC, casse, espaces): MiniLM est insensible à la casse
+- Cache LRU borné, thread-safe
+- `QueryEmbedding`: contexte par requête, calcul paresseux et unique
+
+Auteur: BelikanM
+"""
+
+import re
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Clé de cache d'un texte à embedder"""
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", text or "").lower()).strip()
+
+
+class EmbeddingCache:
+    """
+    Cache LRU texte normalisé -> embedding
+
+    Args:
+        max_entries: Nombre maximum d'embeddings gardés (384 floats ≈ 1.5 Ko chacun)
+    """
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, key: str, vector: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, text: str, compute: Callable[[str], Any]) -> Any:
+        """Embedding en cache, sinon calculé puis mis en cache"""
+        key = normalize_text(text)
+        vector = self.get(key)
+        if vector is None:
+            vector = compute(text)
+            if vector is not None:
+                self.put(key, vector)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None
+        }
+
+
+class QueryEmbedding:
+    """
+    Contexte d'embedding d'une requête: calculé au premier accès, puis
+    réutilisé par toutes les étapes (routage, FAISS, caches sémantiques)
+    """
+
+    __slots__ = ("text", "_embed", "_vector", "_computed")
+
+    def __init__(self, text: str, embed: Callable[[str], Any]):
+        self.text = text
+        self._embed = embed
+        self._vector = None
+        self._computed = False
+
+    @property
+    def vector(self) -> Optional[Any]:
+        if not self._computed:
+            self._vector = self._embed(self.text)
+            self._computed = True
+        return self._vector
@@ -0,0 +1,32 @@
+"""
+🌱 CHARGEMENT UNIQUE DU FICHIER .env
+====================================
+
+L'API et l'agent lisaient chacun models/.env au moment de l'import. Ce
+module le charge une seule fois par processus, quel que soit le point
+d'entrée (API, agent seul, benchmarks).
+
+Les variables déjà définies dans l'environnement restent prioritaires.
+
+Auteur: BelikanM
+"""
+
+import threading
+from pathlib import Path
+
+ENV_PATH = Path(__file__).parent / ".env"
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_environment() -> bool:
+    """Charger models/.env (sans effet après le premier appel)"""
+    global _loaded
+    with _lock:
+        if _loaded:
+            return False
+        from dotenv import load_dotenv
+        load_dotenv(ENV_PATH)
+        _loaded = True
+        return True
@@ -0,0 +1,257 @@
+"""
+🧭 ROUTAGE D'INTENTION PAR EMBEDDINGS (CENTROÏDES)
+===================================================
+
+`detect_intent` reposait uniquement sur des mots-clés: "trouve-moi une idée
+de cadeau" partait en recherche internet, "ça ne marche plus depuis la mise
+à jour" restait une conversation. Un mauvais routage choisit le mauvais
+prompt, le mauvais `max_tokens` et déclenche des appels Tavily inutiles.
+
+Le routeur réutilise l'embedding de la requête déjà calculé pour FAISS
+(MiniLM, aucun passage de modèle supplémentaire) et le compare aux
+centroïdes des intentions en un seul produit matrice-vecteur:
+
+    scores = centroïdes (n_intents × dim) · requête (dim)
+
+Les centroïdes (moyenne normalisée des exemples de chaque intention) sont
+calculés une fois, puis mis en cache sur disque (clé: modèle + exemples).
+Si le meilleur score est trop faible ou trop proche du second, l'intention
+issue des mots-clés est conservée.
+
+Auteur: BelikanM
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Exemples représentatifs de chaque intention (modifiables sans toucher au code)
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "search": [
+        "Cherche sur internet les dernières actualités",
+        "Quelles sont les news du jour ?",
+        "Trouve des informations sur cette entreprise",
+        "Qui est le président actuel du Gabon ?",
+        "Quel temps fait-il aujourd'hui à Libreville ?",
+        "Quel est le prix actuel du pétrole ?",
+        "Recherche le site web officiel de cette société",
+    ],
+    "explain_app": [
+        "Comment utiliser l'application ?",
+        "Comment fonctionne la plateforme CENTER ?",
+        "Où trouver le menu des paramètres dans l'app ?",
+        "Comment ajouter un employé dans le système ?",
+        "À quoi sert cette fonction de l'application ?",
+        "Aide-moi à publier un document sur la plateforme",
+    ],
+    "problem_solving": [
+        "J'ai une erreur quand je lance le serveur",
+        "Ça ne marche plus depuis la mise à jour",
+        "L'upload de fichier plante à chaque fois",
+        "Pourquoi mon code renvoie une exception ?",
+        "La connexion échoue, comment corriger ce bug ?",
+        "Le téléphone n'arrive pas à se connecter au backend",
+    ],
+    "summarization": [
+        "Résume ce document en quelques lignes",
+        "Fais-moi une synthèse du rapport",
+        "Donne-moi les points clés de ce PDF",
+        "En bref, que dit ce texte ?",
+        "Peux-tu condenser cette conversation ?",
+    ],
+    "creative": [
+        "Imagine une histoire courte sur un robot",
+        "Écris un poème sur la mer",
+        "Propose-moi des idées de nom pour mon entreprise",
+        "Invente un slogan pour notre produit",
+        "Trouve-moi une idée de cadeau original",
+    ],
+    "conversation": [
+        "Bonjour, comment vas-tu ?",
+        "Merci beaucoup pour ton aide",
+        "Qu'est-ce que tu penses de ça ?",
+        "Parle-moi un peu de toi",
+        "D'accord, je comprends",
+        "Bonne journée !",
+    ],
+}
+
+
+class IntentRouter:
+    """
+    Classifieur d'intention par similarité cosinus aux centroïdes
+
+    Args:
+        embed: Fonction (liste de textes) -> matrice d'embeddings (n × dim)
+        model_name: Nom du modèle d'embeddings (clé du cache disque)
+        examples: Intention -> phrases d'exemple
+        threshold: Score cosinus minimal pour suivre le routeur
+        margin: Écart minimal entre la meilleure et la deuxième intention
+        cache_path: Fichier .npz des centroïdes (None = pas de cache disque)
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], np.ndarray],
+        model_name: str = "",
+        examples: Optional[Dict[str, List[str]]] = None,
+        threshold: float = 0.45,
+        margin: float = 0.04,
+        cache_path: Optional[str] = None
+    ):
+        self.embed = embed
+        self.model_name = model_name
+        self.examples = examples or INTENT_EXAMPLES
+        self.threshold = threshold
+        self.margin = margin
+        self.cache_path = cache_path
+
+        self.intents: List[str] = list(self.examples.keys())
+        self.centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+        self.routed = 0
+        self.fallbacks = 0
+        self.overrides = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None
+
+    # ==========================================
+    # CENTROÏDES
+    # ==========================================
+
+    def _fingerprint(self) -> str:
+        payload = json.dumps([self.model_name, self.examples], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def build(self) -> bool:
+        """Calculer (ou recharger depuis le disque) les centroïdes"""
+        if self.centroids is not None:
+            return True
+        with self._lock:
+            if self.centroids is not None:
+                return True
+
+            fingerprint = self._fingerprint()
+            centroids = self._load_cache(fingerprint)
+            if centroids is None:
+                texts = [text for intent in self.intents for text in self.examples[intent]]
+                vectors = self._normalize(np.asarray(self.embed(texts), dtype=np.float32))
+
+                rows, start = [], 0
+                for intent in self.intents:
+                    count = len(self.examples[intent])
+                    rows.append(vectors[start:start + count].mean(axis=0))
+                    start += count
+                centroids = self._normalize(np.stack(rows))
+                self._save_cache(fingerprint, centroids)
+
+            self.centroids = centroids
+        logger.info(f"🧭 Routeur d'intention prêt: {len(self.intents)} intentions")
+        return True
+
+    def _load_cache(self, fingerprint: str) -> Optional[np.ndarray]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if str(data["fingerprint"]) != fingerprint or list(data["intents"]) != self.intents:
+                    return None
+                return data["centroids"].astype(np.float32)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache des centroïdes illisible: {e}")
+            return None
+
+    def _save_cache(self, fingerprint: str, centroids: np.ndarray):
+        if not self.cache_path:
+            return
+        try:
+            np.savez(
+                self.cache_path,
+                fingerprint=np.array(fingerprint),
+                intents=np.array(self.intents),
+                centroids=centroids
+            )
+        except OSError as e:
+            logger.warning(f"⚠️ Sauvegarde des centroïdes échouée: {e}")
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    # ==========================================
+    # CLASSIFICATION
+    # ==========================================
+
+    def classify(self, query_embedding: np.ndarray) -> Tuple[str, float, Dict[str, float]]:
+        """
+        Scores de toutes les intentions en un produit matrice-vecteur
+
+        Returns:
+            (meilleure intention, score, scores par intention)
+        """
+        self.build()
+        query = self._normalize(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+        scores = self.centroids @ query
+        best = int(np.argmax(scores))
+        return self.intents[best], float(scores[best]), {
+            intent: round(float(score), 4) for intent, score in zip(self.intents, scores)
+        }
+
+    def route(self, query_embedding: Optional[np.ndarray], keyword_intent: str) -> str:
+        """
+        Intention finale: le routeur s'il est confiant, sinon les mots-clés
+        """
+        return self.route_scored(query_embedding, keyword_intent)[0]
+
+    def route_scored(
+        self,
+        query_embedding: Optional[np.ndarray],
+        keyword_intent: str
+    ) -> Tuple[str, Optional[float]]:
+        """
+        Intention finale et sa confiance (score cosinus de l'intention retenue,
+        None si le routeur n'a pas pu classer)
+        """
+        if query_embedding is None:
+            self.fallbacks += 1
+            return keyword_intent, None
+
+        try:
+            intent, score, scores = self.classify(query_embedding)
+        except Exception as e:
+            logger.warning(f"⚠️ Routeur d'intention indisponible: {e}")
+            self.fallbacks += 1
+            return keyword_intent, None
+
+        runner_up = sorted(scores.values(), reverse=True)[1] if len(scores) > 1 else 0.0
+        if score < self.threshold or score - runner_up < self.margin:
+            self.fallbacks += 1
+            return keyword_intent, scores.get(keyword_intent)
+
+        self.routed += 1
+        if intent != keyword_intent:
+            self.overrides += 1
+            logger.info(f"🧭 Intention {keyword_intent} → {intent} (score {score:.2f})")
+        return intent, score
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "intents": self.intents,
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+            "overrides_keyword_intent": self.overrides,
+            "threshold": self.threshold,
+            "margin": self.margin
+        }
@@ -0,0 +1,303 @@
+"""
+🧵 POOL DE WORKERS LLM (llama.cpp) - POIDS GGUF PARTAGÉS
+=========================================================
+
+Plusieurs instances `Llama` chargent le même fichier GGUF avec `use_mmap=True`:
+les poids sont mappés depuis le page cache du noyau et partagés entre les
+instances (une seule copie en RAM). Seuls le contexte et le cache KV sont
+propres à chaque worker.
+
+- Nombre de workers et threads par worker dimensionnés automatiquement à
+  partir des cœurs physiques disponibles et de la topologie NUMA
+- Chaque worker est épinglé sur les CPUs d'un nœud NUMA pendant l'inférence
+- Dispatch vers le worker le moins chargé (requêtes en cours, puis servies)
+
+Variables d'environnement:
+- LLM_WORKERS: nombre de workers (défaut: auto)
+- LLM_THREADS_PER_WORKER: threads llama.cpp par worker (défaut: auto)
+
+Auteur: BelikanM
+"""
+
+import os
+import glob
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Au-delà de ~8 threads, le décodage CPU est limité par la bande passante
+# mémoire: mieux vaut plusieurs workers qu'un seul worker très large.
+MAX_EFFICIENT_THREADS = 8
+
+
+# ==========================================
+# TOPOLOGIE CPU / NUMA
+# ==========================================
+
+def parse_cpulist(cpulist: str) -> List[int]:
+    """Convertir une liste CPU Linux ("0-3,8,10-11") en liste d'indices"""
+    cpus = []
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus() -> List[int]:
+    """CPUs utilisables par ce processus (respecte cgroups/taskset)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def physical_cpus(cpus: List[int]) -> List[int]:
+    """Garder un seul CPU logique par cœur physique (ignore l'hyperthreading)"""
+    physical = []
+    seen = set()
+    for cpu in cpus:
+        siblings_path = f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"
+        try:
+            with open(siblings_path) as f:
+                siblings = tuple(parse_cpulist(f.read()))
+        except OSError:
+            siblings = (cpu,)
+        if siblings not in seen:
+            seen.add(siblings)
+            physical.append(cpu)
+    return physical
+
+
+def numa_nodes(cpus: List[int]) -> List[List[int]]:
+    """CPUs disponibles regroupés par nœud NUMA (un seul groupe si non-NUMA)"""
+    allowed = set(cpus)
+    nodes = []
+    for node_path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        try:
+            with open(node_path) as f:
+                node_cpus = [c for c in parse_cpulist(f.read()) if c in allowed]
+        except OSError:
+            continue
+        if node_cpus:
+            nodes.append(node_cpus)
+    return nodes or [cpus]
+
+
+def plan_workers(
+    n_workers: Optional[int] = None,
+    n_threads: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Répartir les cœurs physiques entre les workers, nœud NUMA par nœud NUMA
+
+    Returns:
+        Liste de plans {"cpus": [...], "n_threads": int, "numa_node": int}
+    """
+    nodes = [physical_cpus(node) for node in numa_nodes(available_cpus())]
+    total_cores = sum(len(node) for node in nodes)
+
+    if n_workers is None:
+        per_node = [max(1, len(node) // MAX_EFFICIENT_THREADS) for node in nodes]
+    else:
+        # Répartir les workers demandés proportionnellement aux cœurs des nœuds
+        n_workers = max(1, n_workers)
+        per_node = [max(1, round(n_workers * len(node) / total_cores)) for node in nodes]
+        while sum(per_node) > n_workers and max(per_node) > 1:
+            per_node[per_node.index(max(per_node))] -= 1
+        per_node = per_node[:n_workers]
+
+    plans = []
+    for node_index, (node, count) in enumerate(zip(nodes, per_node)):
+        share = max(1, len(node) // count)
+        for i in range(count):
+            cpus = node[i * share:(i + 1) * share] or node
+            plans.append({
+                "cpus": cpus,
+                "n_threads": n_threads or len(cpus),
+                "numa_node": node_index
+            })
+    return plans
+
+
+def llama_perf(llm: Any) -> Optional[Dict[str, float]]:
+    """
+    Compteurs cumulés de llama.cpp pour un contexte (évaluation du prompt /
+    décodage). La différence entre deux lectures donne le coût d'un appel.
+    """
+    try:
+        import llama_cpp
+        data = llama_cpp.llama_perf_context(llm._ctx.ctx)
+    except Exception:
+        return None
+    return {
+        "prompt_eval_ms": data.t_p_eval_ms,
+        "decode_ms": data.t_eval_ms,
+        "prompt_eval_tokens": data.n_p_eval,
+        "decode_tokens": data.n_eval
+    }
+
+
+# ==========================================
+# WORKERS
+# ==========================================
+
+class LLMWorker:
+    """Une instance llama.cpp avec son verrou et ses compteurs"""
+
+    def __init__(self, index: int, llm: Any, cpus: List[int], n_threads: int, numa_node: int):
+        self.index = index
+        self.llm = llm
+        self.cpus = cpus
+        self.n_threads = n_threads
+        self.numa_node = numa_node
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.served = 0
+        self.busy_seconds = 0.0
+
+
+class LLMWorkerPool:
+    """
+    Pool de N instances llama.cpp partageant les poids mmap d'un même GGUF
+
+    Args:
+        model_path: Chemin du fichier GGUF
+        n_ctx: Taille de contexte de chaque worker
+        n_workers: Nombre de workers (None = auto selon cœurs/NUMA)
+        n_threads: Threads par worker (None = cœurs attribués au worker)
+        pin_threads: Épingler chaque worker sur ses CPUs pendant l'inférence
+        **llama_kwargs: Paramètres supplémentaires passés à `Llama`
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        n_ctx: int = 4096,
+        n_workers: Optional[int] = None,
+        n_threads: Optional[int] = None,
+        pin_threads: bool = True,
+        **llama_kwargs
+    ):
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_workers = n_workers
+        self.n_threads = n_threads
+        self.pin_threads = pin_threads and hasattr(os, "sched_setaffinity")
+        self.llama_kwargs = llama_kwargs
+        self.workers: List[LLMWorker] = []
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Créer les instances llama.cpp (les poids sont mappés une seule fois)"""
+        from llama_cpp import Llama
+
+        plans = plan_workers(self.n_workers, self.n_threads)
+        logger.info(f"🧵 Pool LLM: {len(plans)} worker(s) sur {len(available_cpus())} CPU(s)")
+
+        for index, plan in enumerate(plans):
+            llm = Llama(
+                model_path=self.model_path,
+                n_ctx=self.n_ctx,
+                n_threads=plan["n_threads"],
+                n_threads_batch=plan["n_threads"],
+                use_mmap=True,  # Poids partagés via le page cache
+                verbose=False,
+                **self.llama_kwargs
+            )
+            self.workers.append(LLMWorker(
+                index=index,
+                llm=llm,
+                cpus=plan["cpus"],
+                n_threads=plan["n_threads"],
+                numa_node=plan["numa_node"]
+            ))
+            logger.info(
+                f"   ✓ Worker {index}: {plan['n_threads']} threads, "
+                f"nœud NUMA {plan['numa_node']}, CPUs {plan['cpus'][0]}-{plan['cpus'][-1]}"
+            )
+
+    def close(self):
+        """Libérer toutes les instances"""
+        for worker in self.workers:
+            if hasattr(worker.llm, "close"):
+                worker.llm.close()
+        self.workers = []
+
+    @property
+    def primary(self) -> Optional[Any]:
+        """Première instance (tokenizer, métadonnées du modèle)"""
+        return self.workers[0].llm if self.workers else None
+
+    def _pick_worker(self) -> LLMWorker:
+        """Choisir le worker le moins chargé et le réserver"""
+        with self._lock:
+            worker = min(self.workers, key=lambda w: (w.inflight, w.served))
+            worker.inflight += 1
+            return worker
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """
+        Réserver une instance llama.cpp pour une génération
+
+        Usage:
+            with pool.acquire() as llm:
+                llm(prompt, max_tokens=...)
+        """
+        worker = self._pick_worker()
+        try:
+            with worker.lock:
+                previous_affinity = self._pin(worker)
+                start = time.perf_counter()
+                try:
+                    yield worker.llm
+                finally:
+                    worker.busy_seconds += time.perf_counter() - start
+                    self._unpin(previous_affinity)
+        finally:
+            with self._lock:
+                worker.inflight -= 1
+                worker.served += 1
+
+    def _pin(self, worker: LLMWorker) -> Optional[set]:
+        """Épingler le thread appelant (et les threads ggml créés) sur le nœud du worker"""
+        if not self.pin_threads:
+            return None
+        try:
+            previous = os.sched_getaffinity(0)
+            os.sched_setaffinity(0, worker.cpus)
+            return previous
+        except OSError:
+            return None
+
+    def _unpin(self, previous: Optional[set]):
+        if previous is not None:
+            try:
+                os.sched_setaffinity(0, previous)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Charge et utilisation de chaque worker"""
+        return {
+            "workers": [
+                {
+                    "index": w.index,
+                    "n_threads": w.n_threads,
+                    "numa_node": w.numa_node,
+                    "inflight": w.inflight,
+                    "served": w.served,
+                    "busy_seconds": round(w.busy_seconds, 2)
+                }
+                for w in self.workers
+            ],
+            "inflight": sum(w.inflight for w in self.workers)
+        }
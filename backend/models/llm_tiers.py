@@ -0,0 +1,129 @@
+"""
+🪜 ÉTAGEMENT DES MODÈLES LLM (PETIT MODÈLE / MISTRAL-7B)
+=========================================================
+
+Toutes les réponses passaient par Mistral-7B Q4 sur CPU, y compris les
+salutations et les explications de l'application plafonnées à 150 tokens.
+Un petit modèle GGUF (1-3B) enregistré à côté de Mistral répond à ces
+demandes simples 3 à 5 fois plus vite.
+
+Politique de routage (du moins cher au plus cher):
+1. Intention "simple" (LLM_SMALL_INTENTS), prompt et réponse courts, et
+   intention sûre (score du routeur ≥ min_confidence) → petit modèle.
+   Sans score (routeur désactivé ou en échec, pas d'embedding), l'intention
+   n'est qu'une correspondance de mots-clés: Mistral, sauf trust_unscored
+2. Mistral saturé (tous ses workers occupés) et demande compatible avec le
+   petit modèle (hors intentions exigeantes) → petit modèle en débordement
+3. Sinon (ou intention incertaine) → Mistral-7B
+
+Auteur: BelikanM
+"""
+
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, Optional, Callable, Set
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TIER_DECISIONS = REGISTRY.counter("llm_tier_decisions_total", "Choix du tier LLM par raison", ["tier", "reason"])
+
+TIER_SMALL = "llm_small"
+TIER_LARGE = "llm"
+
+
+class LLMTierPolicy:
+    """
+    Choix du modèle LLM le moins cher qui répond au besoin
+
+    Args:
+        is_available: Fonction (clé) -> bool, le tier peut-il servir (enregistré, non en échec)
+        get_load: Fonction (clé) -> (requêtes en cours, workers), None si non chargé
+        small_intents: Intentions servies par le petit modèle
+        large_only_intents: Intentions jamais envoyées au petit modèle
+        max_small_prompt_tokens: Prompt maximum pour le petit modèle
+        max_small_new_tokens: Réponse maximum pour le petit modèle
+        min_confidence: Score d'intention minimal
+        trust_unscored: Servir les intentions sans score par le petit modèle
+    """
+
+    def __init__(
+        self,
+        is_available: Callable[[str], bool],
+        get_load: Callable[[str], Optional[tuple]],
+        small_intents: Optional[Set[str]] = None,
+        large_only_intents: Optional[Set[str]] = None,
+        max_small_prompt_tokens: int = 1500,
+        max_small_new_tokens: int = 200,
+        min_confidence: float = 0.5,
+        trust_unscored: bool = False
+    ):
+        self.is_available = is_available
+        self.get_load = get_load
+        self.small_intents = small_intents if small_intents is not None else {"conversation", "explain_app", "creative"}
+        self.large_only_intents = large_only_intents if large_only_intents is not None else {"problem_solving", "summarization", "image_synthesis"}
+        self.max_small_prompt_tokens = max_small_prompt_tokens
+        self.max_small_new_tokens = max_small_new_tokens
+        self.min_confidence = min_confidence
+        self.trust_unscored = trust_unscored
+
+        self._lock = threading.Lock()
+        self.decisions: Counter = Counter()
+
+    def choose(
+        self,
+        intent: Optional[str],
+        prompt_tokens: int,
+        max_new_tokens: int,
+        confidence: Optional[float] = None
+    ) -> str:
+        """Clé du tier à utiliser pour cette génération"""
+        tier, reason = self._decide(intent, prompt_tokens, max_new_tokens, confidence)
+        with self._lock:
+            self.decisions[f"{tier}:{reason}"] += 1
+        TIER_DECISIONS.inc(tier=tier, reason=reason)
+        logger.info(f"🪜 Tier {tier} ({reason}) - intention={intent}, prompt={prompt_tokens} tokens")
+        return tier
+
+    def _decide(self, intent, prompt_tokens, max_new_tokens, confidence):
+        if not self.is_available(TIER_SMALL):
+            return TIER_LARGE, "small_unavailable"
+        if not self.is_available(TIER_LARGE):
+            return TIER_SMALL, "large_unavailable"
+
+        fits_small = (
+            prompt_tokens <= self.max_small_prompt_tokens
+            and max_new_tokens <= self.max_small_new_tokens
+        )
+        if not fits_small:
+            return TIER_LARGE, "too_long"
+        if intent in self.large_only_intents:
+            return TIER_LARGE, "intent"
+
+        confident = self.trust_unscored if confidence is None else confidence >= self.min_confidence
+        if intent in self.small_intents:
+            return (TIER_SMALL, "intent") if confident else (TIER_LARGE, "low_confidence")
+
+        # Débordement: Mistral saturé, le petit modèle absorbe la demande
+        load = self.get_load(TIER_LARGE)
+        if load is not None:
+            inflight, workers = load
+            if workers and inflight >= workers:
+                return TIER_SMALL, "overflow"
+
+        return TIER_LARGE, "default"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            decisions = dict(self.decisions)
+        return {
+            "small_intents": sorted(self.small_intents),
+            "large_only_intents": sorted(self.large_only_intents),
+            "max_small_prompt_tokens": self.max_small_prompt_tokens,
+            "max_small_new_tokens": self.max_small_new_tokens,
+            "min_confidence": self.min_confidence,
+            "trust_unscored": self.trust_unscored,
+            "decisions": decisions
+        }
@@ -0,0 +1,362 @@
+"""
+🗂️ REGISTRE DES MODÈLES - CHARGEMENT À LA DEMANDE
+==================================================
+
+Chaque outil (SmolVLM, Mistral-7B, Coqui TTS, YOLO) est enregistré sans être
+chargé. Le premier appel déclenche le chargement dans un thread d'arrière-plan
+et les appels suivants attendent qu'il soit prêt. Après chargement, une mini
+inférence de préchauffage (warm-up) est exécutée pour payer le page-in des
+poids et l'initialisation du premier appel avant de déclarer l'outil prêt.
+Un thread de surveillance décharge les modèles inutilisés depuis plus de
+`idle_timeout` secondes.
+
+États possibles d'un modèle:
+- unloaded : enregistré, pas en mémoire
+- loading  : chargement en cours (thread dédié)
+- warming  : chargé, préchauffage en cours
+- ready    : chargé et utilisable
+- failed   : échec du chargement (nouvel essai après `retry_after` secondes)
+
+Auteur: BelikanM
+"""
+
+import gc
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Iterator
+
+logger = logging.getLogger(__name__)
+
+STATE_UNLOADED = "unloaded"
+STATE_LOADING = "loading"
+STATE_WARMING = "warming"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+class _ModelEntry:
+    """Entrée du registre: un outil et son cycle de vie"""
+
+    def __init__(self, key: str, tool: Any, label: str, pinned: bool):
+        self.key = key
+        self.tool = tool
+        self.label = label
+        self.pinned = pinned
+        self.state = STATE_UNLOADED
+        self.error: Optional[str] = None
+        self.ready_event = threading.Event()
+        self.in_use = 0
+        self.last_used = 0.0
+        self.loaded_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.load_count = 0
+        self.warmed = False
+        self.warmup_seconds: Optional[float] = None
+        self.warmup_error: Optional[str] = None
+
+
+class ModelRegistry:
+    """
+    Registre d'outils à chargement paresseux avec déchargement sur inactivité
+
+    Args:
+        idle_timeout: Secondes d'inactivité avant déchargement (0 = jamais)
+        load_timeout: Attente maximale d'un chargement côté requête
+        retry_after: Délai avant de retenter un modèle en échec
+        check_interval: Période du thread de surveillance
+        warmup: Exécuter `tool.warmup()` après chaque chargement
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 1800,
+        load_timeout: float = 600,
+        retry_after: float = 300,
+        check_interval: float = 30,
+        warmup: bool = True
+    ):
+        self.idle_timeout = idle_timeout
+        self.load_timeout = load_timeout
+        self.retry_after = retry_after
+        self.check_interval = check_interval
+        self.warmup = warmup
+
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+        if self.idle_timeout > 0:
+            self._reaper = threading.Thread(
+                target=self._reap_idle_loop,
+                name="model-registry-reaper",
+                daemon=True
+            )
+            self._reaper.start()
+
+    # ==========================================
+    # ENREGISTREMENT
+    # ==========================================
+
+    def register(self, key: str, tool: Any, label: str = "", pinned: bool = False):
+        """Enregistrer un outil (non chargé) sous une clé"""
+        with self._lock:
+            self._entries[key] = _ModelEntry(key, tool, label or key, pinned)
+        logger.info(f"🗂️ Outil enregistré (chargement à la demande): {key}")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def keys(self) -> List[str]:
+        return list(self._entries.keys())
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Retourner l'outil sans déclencher de chargement"""
+        entry = self._entries.get(key)
+        return entry.tool if entry else None
+
+    def state(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        return entry.state if entry else None
+
+    def pin(self, key: str, pinned: bool = True):
+        """Exclure (ou réintégrer) un outil du déchargement sur inactivité"""
+        entry = self._entries.get(key)
+        if entry:
+            entry.pinned = pinned
+
+    # ==========================================
+    # CHARGEMENT
+    # ==========================================
+
+    def load_async(self, key: str) -> Optional[threading.Event]:
+        """Démarrer le chargement en arrière-plan si nécessaire"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        with self._lock:
+            if entry.state in (STATE_READY, STATE_LOADING, STATE_WARMING):
+                return entry.ready_event
+            if entry.state == STATE_FAILED and time.time() - (entry.failed_at or 0) < self.retry_after:
+                return entry.ready_event
+
+            entry.state = STATE_LOADING
+            entry.error = None
+            entry.ready_event = threading.Event()
+            event = entry.ready_event
+
+        thread = threading.Thread(
+            target=self._load_entry,
+            args=(entry, event),
+            name=f"model-load-{key}",
+            daemon=True
+        )
+        thread.start()
+        return event
+
+    def _load_entry(self, entry: _ModelEntry, event: threading.Event):
+        """Charger un outil (exécuté dans un thread dédié)"""
+        logger.info(f"🔄 Chargement à la demande: {entry.key}...")
+        start = time.perf_counter()
+        error = None
+
+        try:
+            ready = entry.tool.load()
+        except Exception as e:
+            ready = False
+            error = str(e)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            entry.load_seconds = elapsed
+            entry.warmed = False
+            if ready:
+                entry.state = STATE_WARMING if self.warmup else STATE_READY
+                entry.loaded_at = time.time()
+                entry.load_count += 1
+                logger.info(f"✅ {entry.key} chargé en {elapsed:.1f}s")
+            else:
+                entry.state = STATE_FAILED
+                entry.failed_at = time.time()
+                entry.error = error or "Outil non prêt après chargement"
+                logger.error(f"❌ Échec chargement {entry.key}: {entry.error}")
+
+        if ready and self.warmup:
+            self._warmup_entry(entry)
+
+        with self._lock:
+            if entry.state == STATE_WARMING:
+                entry.state = STATE_READY
+            entry.last_used = time.time()
+        event.set()
+
+    def _warmup_entry(self, entry: _ModelEntry):
+        """Mini inférence représentative avant de déclarer l'outil prêt"""
+        start = time.perf_counter()
+        try:
+            entry.tool.warmup()
+            entry.warmed = True
+            entry.warmup_error = None
+        except Exception as e:
+            entry.warmup_error = str(e)
+            logger.warning(f"⚠️ Préchauffage {entry.key} échoué: {e}")
+        entry.warmup_seconds = time.perf_counter() - start
+        if entry.warmed:
+            logger.info(f"🔥 {entry.key} préchauffé en {entry.warmup_seconds:.2f}s")
+
+    def preload(self, keys: List[str]):
+        """Lancer le chargement en arrière-plan d'une liste d'outils"""
+        for key in keys:
+            if key in self._entries:
+                self.load_async(key)
+            else:
+                logger.warning(f"⚠️ Préchargement ignoré, outil inconnu: {key}")
+
+    def wait_ready(self, keys: List[str], timeout: Optional[float] = None) -> bool:
+        """Attendre que tous les outils listés soient prêts (ou en échec)"""
+        deadline = None if timeout is None else time.time() + timeout
+        for key in keys:
+            event = self.load_async(key)
+            if event is None:
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            event.wait(remaining)
+        return all(self.is_warm(key) for key in keys if key in self._entries)
+
+    def is_warm(self, key: str) -> bool:
+        """Outil chargé ET préchauffé (prêt à recevoir du trafic)"""
+        entry = self._entries.get(key)
+        if entry is None or entry.state != STATE_READY:
+            return False
+        return entry.warmed or not self.warmup
+
+    def get(self, key: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Obtenir un outil prêt, en le chargeant si besoin
+
+        Returns:
+            L'outil si prêt, None s'il est absent, en échec ou trop long à charger
+        """
+        event = self.load_async(key)
+        if event is None:
+            return None
+
+        entry = self._entries[key]
+        if entry.state != STATE_READY:
+            event.wait(self.load_timeout if timeout is None else timeout)
+
+        if entry.state != STATE_READY:
+            return None
+
+        entry.last_used = time.time()
+        return entry.tool
+
+    @contextmanager
+    def use(self, key: str, timeout: Optional[float] = None) -> Iterator[Optional[Any]]:
+        """
+        Utiliser un outil en le protégeant du déchargement pendant l'appel
+
+        Usage:
+            with registry.use("llm") as llm:
+                if llm:
+                    llm.execute(...)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            yield None
+            return
+
+        with self._lock:
+            entry.in_use += 1
+        try:
+            yield self.get(key, timeout=timeout)
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.time()
+
+    # ==========================================
+    # DÉCHARGEMENT
+    # ==========================================
+
+    def unload(self, key: str) -> bool:
+        """Décharger un outil s'il n'est pas en cours d'utilisation"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+
+        with self._lock:
+            if entry.state != STATE_READY or entry.in_use > 0:
+                return False
+            entry.state = STATE_UNLOADED
+            entry.warmed = False
+            entry.ready_event = threading.Event()
+
+        try:
+            entry.tool.unload()
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur déchargement {key}: {e}")
+
+        self._release_memory()
+        logger.info(f"💤 {key} déchargé")
+        return True
+
+    def _release_memory(self):
+        """Rendre la mémoire libérée au système"""
+        gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            try:
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            except Exception:
+                pass
+
+    def _reap_idle_loop(self):
+        """Décharger périodiquement les modèles inactifs"""
+        while not self._stop.wait(self.check_interval):
+            now = time.time()
+            for key, entry in list(self._entries.items()):
+                if (
+                    entry.state == STATE_READY
+                    and not entry.pinned
+                    and entry.in_use == 0
+                    and now - entry.last_used > self.idle_timeout
+                ):
+                    logger.info(f"💤 {key} inactif depuis {now - entry.last_used:.0f}s")
+                    self.unload(key)
+
+    def shutdown(self):
+        """Arrêter la surveillance et décharger tous les outils"""
+        self._stop.set()
+        for key in self.keys():
+            self.unload(key)
+
+    # ==========================================
+    # ÉTAT
+    # ==========================================
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """État détaillé de chaque outil enregistré"""
+        now = time.time()
+        return {
+            key: {
+                "state": entry.state,
+                "label": entry.label,
+                "pinned": entry.pinned,
+                "in_use": entry.in_use,
+                "load_seconds": round(entry.load_seconds, 3) if entry.load_seconds is not None else None,
+                "load_count": entry.load_count,
+                "warmed": entry.warmed,
+                "warmup_seconds": round(entry.warmup_seconds, 3) if entry.warmup_seconds is not None else None,
+                "warmup_error": entry.warmup_error,
+                "idle_seconds": round(now - entry.last_used, 1) if entry.state == STATE_READY else None,
+                "error": entry.error
+            }
+            for key, entry in self._entries.items()
+        }
@@ -0,0 +1,239 @@
+"""
+🛰️ SERVEUR DE MODÈLES PARTAGÉ (IPC LOCAL)
+==========================================
+
+`uvicorn --workers N` ferait charger Mistral, SmolVLM, TTS et FAISS par
+chaque worker: N fois la mémoire, et N mémoires vectorielles divergentes.
+Ici, un seul processus possède les modèles et la mémoire; les workers HTTP
+(légers) l'appellent par un socket Unix local.
+
+- Transport: multiprocessing.connection (messages picklés, authentification
+  HMAC par clé partagée, socket en 0600)
+- Un thread serveur par connexion: les appels concurrents des workers
+  s'exécutent en parallèle (le gestionnaire est déjà multi-thread)
+- Côté client, un pool de connexions par worker (une connexion n'est
+  utilisée que par un appel à la fois)
+- Appels en flux: le serveur renvoie des événements intermédiaires
+  (ex: texte généré au fil de l'eau) avant le résultat
+- Seules les méthodes déclarées sont appelables
+
+Protocole (dictionnaires picklés):
+    client → {"method", "args", "kwargs", "stream"}
+    serveur → {"event": données}* puis {"result": valeur} ou {"error": {...}}
+
+Auteur: BelikanM
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Dict, Any, Optional, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteCallError(RuntimeError):
+    """Exception levée dans le serveur de modèles, transmise au worker"""
+
+    def __init__(self, error: Dict[str, Any]):
+        super().__init__(f"{error.get('type')}: {error.get('message')}")
+        self.type_name = error.get("type")
+        self.message = error.get("message")
+        self.status_code = error.get("status_code")
+        self.detail = error.get("detail")
+
+
+def _describe_error(e: BaseException) -> Dict[str, Any]:
+    """Exception → dictionnaire transportable (les exceptions ne sont pas toutes picklables)"""
+    return {
+        "type": type(e).__name__,
+        "message": str(e),
+        "status_code": getattr(e, "status_code", None),
+        "detail": getattr(e, "detail", None)
+    }
+
+
+# ==========================================
+# SERVEUR
+# ==========================================
+
+class ModelServer:
+    """
+    Exposer les méthodes d'un objet sur un socket Unix
+
+    Args:
+        target: Objet servi (ex: service du gestionnaire de chat)
+        address: Chemin du socket Unix
+        authkey: Clé partagée avec les workers
+        methods: Méthodes appelables à distance
+        stream_methods: Méthodes en flux (reçoivent `on_event`)
+    """
+
+    def __init__(
+        self,
+        target: Any,
+        address: str,
+        authkey: bytes,
+        methods: Iterable[str],
+        stream_methods: Iterable[str] = ()
+    ):
+        self.target = target
+        self.address = address
+        self.authkey = authkey
+        self.methods = set(methods) | set(stream_methods)
+        self.stream_methods = set(stream_methods)
+        self.listener: Optional[Listener] = None
+        self.connections = 0
+        self.calls = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # Socket d'une exécution précédente
+        self.listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        logger.info(f"🛰️ Serveur de modèles à l'écoute sur {self.address}")
+        try:
+            while True:
+                try:
+                    conn = self.listener.accept()
+                except OSError:
+                    if self.listener is None:
+                        break  # close()
+                    raise
+                except Exception as e:
+                    # Authentification refusée: ne concerne que ce client
+                    logger.warning(f"⚠️ Connexion refusée: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), name="model-server-conn", daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"address": self.address, "connections": self.connections, "calls": self.calls, "in_flight": self.in_flight}
+
+    def _handle(self, conn: Connection):
+        with self._lock:
+            self.connections += 1
+        send_lock = threading.Lock()
+
+        def send(message: Dict[str, Any]):
+            with send_lock:  # Événements émis depuis d'autres threads (génération)
+                conn.send(message)
+
+        def reply(message: Dict[str, Any]) -> bool:
+            try:
+                send(message)
+                return True
+            except OSError:
+                return False  # Client parti (ex: flux HTTP fermé en cours d'appel)
+
+        try:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                with self._lock:
+                    self.calls += 1
+                    self.in_flight += 1
+                method = request.get("method")
+                try:
+                    if method not in self.methods:
+                        raise AttributeError(f"Méthode non exposée: {method}")
+                    kwargs = dict(request.get("kwargs") or {})
+                    if method in self.stream_methods and request.get("stream"):
+                        kwargs["on_event"] = lambda data: send({"event": data})
+                    result = getattr(self.target, method)(*request.get("args", ()), **kwargs)
+                except Exception as e:
+                    result = {"error": _describe_error(e)}
+                else:
+                    result = {"result": result}
+                finally:
+                    with self._lock:
+                        self.in_flight -= 1
+                if not reply(result):
+                    return
+        finally:
+            with self._lock:
+                self.connections -= 1
+            conn.close()
+
+
+# ==========================================
+# CLIENT (WORKERS HTTP)
+# ==========================================
+
+class ModelServerClient:
+    """
+    Pool de connexions vers le serveur de modèles
+
+    Args:
+        address: Chemin du socket Unix
+        authkey: Clé partagée avec le serveur
+        max_connections: Appels simultanés maximum de ce worker
+    """
+
+    def __init__(self, address: str, authkey: bytes, max_connections: int = 8):
+        self.address = address
+        self.authkey = authkey
+        self._idle: "queue.LifoQueue[Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def connect(self, timeout: float = 600, interval: float = 0.5):
+        """Attendre que le serveur écoute (il charge les modèles avant d'ouvrir le socket)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._idle.put(Client(self.address, family="AF_UNIX", authkey=self.authkey))
+                return
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"Serveur de modèles injoignable: {self.address}")
+                time.sleep(interval)
+
+    def call(self, method: str, *args, on_event: Optional[Callable[[Any], None]] = None, **kwargs) -> Any:
+        """
+        Appeler une méthode du serveur (bloquant)
+
+        Args:
+            on_event: Reçoit les événements d'une méthode en flux, dans ce thread
+        """
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+            try:
+                conn.send({"method": method, "args": args, "kwargs": kwargs, "stream": on_event is not None})
+                while True:
+                    message = conn.recv()
+                    if "event" in message:
+                        if on_event is not None:
+                            on_event(message["event"])
+                        continue
+                    break
+            except BaseException:
+                conn.close()  # Réponse partielle possible: connexion inutilisable
+                raise
+            self._idle.put(conn)
+
+        if "error" in message:
+            raise RemoteCallError(message["error"])
+        return message["result"]
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
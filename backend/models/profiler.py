@@ -0,0 +1,306 @@
+"""
+🔬 PROFILEUR PAR ÉCHANTILLONNAGE (REQUÊTE OU FENÊTRE DE TEMPS)
+==============================================================
+
+Lors d'un pic de latence, les traces disent quelle étape est lente, pas
+pourquoi: glue Python (assemblage des prompts, regex de
+`_extract_search_query`, sérialisation JSON de `analysis`) ou inférence
+native (llama.cpp, torch). Ce profileur échantillonne les piles Python de
+tous les threads, sans dépendance:
+
+- `start("request")` / `stop(id)`: une requête (en-tête X-Profile côté API)
+- `start("window", seconds=30)`: tout le processus pendant N secondes
+- Sortie "collapsed" (pile;pile;feuille N) lisible par flamegraph.pl,
+  speedscope ou Grafana (flame graph)
+- Allocations optionnelles (tracemalloc): lignes ayant le plus alloué
+  pendant la session, pic mémoire
+
+Le temps passé dans du code natif est attribué à la fonction Python qui
+l'a appelé (ex: `llama.py:generate`). Les threads en attente (verrous,
+files, select de la boucle asyncio) sont ignorés.
+
+Une session "request" échantillonne aussi tout le processus: le travail
+d'une requête passe par la boucle asyncio partagée et des pools de threads
+(Starlette, LLM, recherche web), impossibles à lui attribuer de façon
+fiable. Le résumé l'indique (`scope`) avec le pic de requêtes simultanées
+observé: au-delà de 1, le profil mélange les requêtes concurrentes.
+
+Sans session active, aucun thread ne tourne et rien n'est mesuré: le coût
+est nul en fonctionnement normal.
+
+Auteur: BelikanM
+"""
+
+import os
+import sys
+import time
+import uuid
+import logging
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Feuilles de pile d'un thread inactif (attente d'un verrou, d'une file, d'E/S)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("ssl.py", "read"),
+    ("connection.py", "wait"),
+    ("thread.py", "_worker"),  # concurrent.futures en attente de tâche
+}
+
+MAX_STACK_DEPTH = 128
+MEMORY_TOP = 25
+
+
+def _collapse(frame) -> Optional[str]:
+    """Pile racine -> feuille au format collapsed (None si le thread attend)"""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """Échantillons (et allocations) d'une requête ou d'une fenêtre de temps"""
+
+    def __init__(self, kind: str, label: str, interval: float, track_memory: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.interval = interval
+        self.track_memory = track_memory
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.memory: Optional[Dict[str, Any]] = None
+        self.peak_concurrency: Optional[int] = None  # Requêtes simultanées (si sonde)
+        self._memory_baseline = None
+        self.done = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.ended_at is None
+
+    @property
+    def duration(self) -> float:
+        return (self.ended_at or time.time()) - self.started_at
+
+    def collapsed(self) -> str:
+        """Format flame graph: une ligne "cadre;cadre;feuille nombre" par pile"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, top: int = 30) -> Dict[str, Any]:
+        """Fonctions les plus coûteuses: en propre (feuille) et en cumulé"""
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        threads: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            threads[frames[0]] += count
+            own[frames[-1]] += count
+            for name in set(frames[1:]):
+                cumulative[name] += count
+        busy = sum(self.stacks.values())
+
+        def ranked(counter: Counter) -> List[Dict[str, Any]]:
+            return [
+                {"frame": name, "samples": count, "percent": round(100 * count / busy, 1)}
+                for name, count in counter.most_common(top)
+            ]
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "scope": "process",  # Tous les threads, y compris les autres requêtes
+            "pid": os.getpid(),
+            "peak_requests_in_flight": self.peak_concurrency,
+            "running": self.running,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration, 3),
+            "interval_ms": round(self.interval * 1000, 2),
+            "ticks": self.samples,
+            "busy_samples": busy,
+            "threads": dict(threads.most_common()),
+            "self": ranked(own) if busy else [],
+            "cumulative": ranked(cumulative) if busy else [],
+            "memory": self.memory
+        }
+
+
+class SamplingProfiler:
+    """
+    Échantillonneur partagé par les sessions actives
+
+    Args:
+        interval: Période d'échantillonnage (secondes)
+        max_seconds: Durée maximale d'une session (requête ou fenêtre)
+        keep: Sessions terminées conservées pour consultation
+        max_active: Sessions simultanées maximum
+        concurrency_probe: Fonction () -> requêtes en cours, relevée à chaque échantillon
+    """
+
+    def __init__(self, interval: float = 0.005, max_seconds: float = 120, keep: int = 20, max_active: int = 4):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.keep = keep
+        self.max_active = max_active
+        self._active: Dict[str, ProfileSession] = {}
+        self._finished: "OrderedDict[str, ProfileSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._memory_sessions = 0
+        self._owns_tracemalloc = False
+        self.concurrency_probe: Optional[Callable[[], float]] = None
+
+    def start(
+        self,
+        kind: str = "window",
+        label: str = "",
+        seconds: Optional[float] = None,
+        track_memory: bool = False
+    ) -> Optional[ProfileSession]:
+        """
+        Ouvrir une session (None si trop de sessions sont déjà actives)
+
+        Args:
+            seconds: Arrêt automatique (plafonné à max_seconds, qui s'applique aussi
+                aux sessions sans durée comme garde-fou)
+        """
+        session = ProfileSession(kind, label, self.interval, track_memory)
+        with self._lock:
+            if len(self._active) >= self.max_active:
+                return None
+            if track_memory:
+                self._start_tracemalloc(session)
+            self._active[session.id] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+        limit = min(seconds, self.max_seconds) if seconds else self.max_seconds
+        timer = threading.Timer(limit, self.stop, [session.id])
+        timer.daemon = True
+        timer.start()
+        logger.info(f"🔬 Profilage {kind} démarré ({session.id}{', allocations' if track_memory else ''})")
+        return session
+
+    def stop(self, session_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            session = self._active.pop(session_id, None)
+            if session is None:
+                return None
+            if session.track_memory:
+                session.memory = self._stop_tracemalloc(session)
+            session.ended_at = time.time()
+            self._finished[session.id] = session
+            while len(self._finished) > self.keep:
+                self._finished.popitem(last=False)
+        session.done.set()
+        return session
+
+    def get(self, session_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self._active.get(session_id) or self._finished.get(session_id)
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sessions = list(self._active.values()) + list(self._finished.values())
+        return [
+            {"id": s.id, "kind": s.kind, "label": s.label, "running": s.running,
+             "started_at": s.started_at, "duration_seconds": round(s.duration, 3), "ticks": s.samples}
+            for s in sessions
+        ]
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._active.values())
+                if not sessions:
+                    self._thread = None
+                    return
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _collapse(frame)
+                if stack is not None:
+                    stacks.append(f"{names.get(ident, ident)};{stack}")
+            del frame
+
+            probe = self.concurrency_probe
+            concurrency = int(probe()) if probe is not None else None
+            for session in sessions:
+                session.samples += 1
+                session.stacks.update(stacks)
+                if concurrency is not None:
+                    session.peak_concurrency = max(session.peak_concurrency or 0, concurrency)
+            time.sleep(self.interval)
+
+    # ==========================================
+    # ALLOCATIONS (TRACEMALLOC)
+    # ==========================================
+
+    def _start_tracemalloc(self, session: ProfileSession):
+        """(sous verrou) Démarrer tracemalloc pour la première session qui le demande"""
+        if self._memory_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(16)
+            self._owns_tracemalloc = True
+        self._memory_sessions += 1
+        tracemalloc.reset_peak()
+        session._memory_baseline = tracemalloc.take_snapshot()
+
+    def _stop_tracemalloc(self, session: ProfileSession) -> Dict[str, Any]:
+        """(sous verrou) Allocations depuis le début de la session"""
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        diff = snapshot.compare_to(session._memory_baseline, "lineno")
+        session._memory_baseline = None
+
+        self._memory_sessions -= 1
+        if self._memory_sessions == 0 and self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "top": [
+                {
+                    "location": str(stat.traceback[0]) if stat.traceback else "?",
+                    "size_diff": stat.size_diff,
+                    "count_diff": stat.count_diff,
+                    "size": stat.size
+                }
+                for stat in sorted(diff, key=lambda s: s.size_diff, reverse=True)[:MEMORY_TOP]
+                if stat.size_diff > 0
+            ]
+        }
+
+
+PROFILER = SamplingProfiler(
+    interval=float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000,
+    max_seconds=float(os.getenv("PROFILER_MAX_SECONDS", "120")),
+    keep=int(os.getenv("PROFILER_KEEP", "20")),
+    max_active=int(os.getenv("PROFILER_MAX_ACTIVE", "4"))
+)
@@ -0,0 +1,232 @@
+"""
+📐 ASSEMBLAGE DE PROMPTS SOUS BUDGET DE TOKENS
+===============================================
+
+Remplace le découpage par caractères (`[:150]`, `[:200]`) par un budget en
+tokens calculé avec le tokenizer du modèle:
+
+    budget = n_ctx - max_new_tokens - réserve
+
+Chaque section du prompt (instructions, historique, mémoire FAISS, résultats
+web, question) a une priorité. Les sections requises passent en premier,
+puis les autres par priorité croissante, tronquées ou supprimées quand le
+budget est épuisé. L'ordre d'affichage reste celui des sections fournies.
+
+Le comptage des sections statiques (prompts système, instructions) est mis
+en cache: seul le texte dynamique est tokenisé à chaque requête.
+
+Auteur: BelikanM
+"""
+
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+# Approximation pour du français avec le tokenizer Mistral (~3.5 caractères/token)
+CHARS_PER_TOKEN = 3.5
+
+
+class HeuristicTokenizer:
+    """Tokenizer approximatif utilisé tant que le LLM n'est pas chargé"""
+
+    name = "heuristic"
+
+    def count_tokens(self, text: str) -> int:
+        return int(len(text) / CHARS_PER_TOKEN) + 1 if text else 0
+
+    def truncate_tokens(self, text: str, max_tokens: int) -> str:
+        return text[:int(max_tokens * CHARS_PER_TOKEN)]
+
+
+HEURISTIC_TOKENIZER = HeuristicTokenizer()
+
+
+class PromptSection:
+    """
+    Section de prompt
+
+    Args:
+        name: Nom (pour les statistiques)
+        text: Texte de la section (ou en-tête si `items` est fourni)
+        priority: 0 = plus important; les sections sont servies par priorité
+        required: Toujours incluse (tronquée en dernier recours)
+        static: Texte constant entre requêtes (comptage mis en cache)
+        max_tokens: Plafond de tokens pour la section
+        items: Éléments ajoutés un par un sous l'en-tête (docs, résultats web)
+        item_max_tokens: Plafond de tokens par élément
+    """
+
+    def __init__(
+        self,
+        name: str,
+        text: str = "",
+        priority: int = 5,
+        required: bool = False,
+        static: bool = False,
+        max_tokens: Optional[int] = None,
+        items: Optional[List[str]] = None,
+        item_max_tokens: Optional[int] = None
+    ):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        self.required = required
+        self.static = static
+        self.max_tokens = max_tokens
+        self.items = items
+        self.item_max_tokens = item_max_tokens
+
+
+class PackedPrompt:
+    """Résultat de l'assemblage"""
+
+    def __init__(self, text: str, tokens: int, budget: int, sections: Dict[str, Dict[str, Any]]):
+        self.text = text
+        self.tokens = tokens
+        self.budget = budget
+        self.sections = sections
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class PromptPacker:
+    """
+    Assembleur de prompts sous budget de tokens
+
+    Args:
+        get_tokenizer: Retourne un objet avec `name`, `count_tokens(text)` et
+            `truncate_tokens(text, n)` (le LLM s'il est chargé, sinon l'heuristique)
+        n_ctx: Taille du contexte du modèle
+        reserve: Tokens réservés au template ([INST]...) et aux séparateurs
+        static_cache_size: Nombre maximum de comptages statiques en cache
+    """
+
+    def __init__(
+        self,
+        get_tokenizer: Callable[[], Any],
+        n_ctx: int = 4096,
+        reserve: int = 32,
+        static_cache_size: int = 512
+    ):
+        self.get_tokenizer = get_tokenizer
+        self.n_ctx = n_ctx
+        self.reserve = reserve
+        self.static_cache_size = static_cache_size
+        self._static_counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    # ==========================================
+    # COMPTAGE
+    # ==========================================
+
+    def count(self, text: str, static: bool = False, tokenizer: Any = None) -> int:
+        """Compter les tokens d'un texte (mis en cache si statique)"""
+        tokenizer = tokenizer or self.get_tokenizer()
+        if not static:
+            return tokenizer.count_tokens(text)
+
+        key = (tokenizer.name, text)
+        cached = self._static_counts.get(key)
+        if cached is not None:
+            return cached
+
+        count = tokenizer.count_tokens(text)
+        with self._lock:
+            if len(self._static_counts) >= self.static_cache_size:
+                self._static_counts.pop(next(iter(self._static_counts)))
+            self._static_counts[key] = count
+        return count
+
+    def truncate(self, text: str, max_tokens: int, tokenizer: Any = None) -> str:
+        """Tronquer un texte à `max_tokens` tokens"""
+        tokenizer = tokenizer or self.get_tokenizer()
+        if max_tokens <= 0:
+            return ""
+        if tokenizer.count_tokens(text) <= max_tokens:
+            return text
+        return tokenizer.truncate_tokens(text, max_tokens).rstrip() + "..."
+
+    # ==========================================
+    # ASSEMBLAGE
+    # ==========================================
+
+    def pack(
+        self,
+        sections: List[PromptSection],
+        max_new_tokens: int,
+        reserved_tokens: int = 0
+    ) -> PackedPrompt:
+        """
+        Assembler les sections dans le budget de contexte
+
+        Args:
+            sections: Sections dans leur ordre d'affichage
+            max_new_tokens: Tokens réservés à la génération
+            reserved_tokens: Tokens supplémentaires réservés (enveloppe ajoutée ensuite)
+        """
+        tokenizer = self.get_tokenizer()
+        budget = max(0, self.n_ctx - max_new_tokens - self.reserve - reserved_tokens)
+        remaining = budget
+        rendered: Dict[int, str] = {}
+        stats: Dict[str, Dict[str, Any]] = {}
+
+        # Requises d'abord, puis par priorité (ordre stable)
+        order = sorted(
+            range(len(sections)),
+            key=lambda i: (not sections[i].required, sections[i].priority, i)
+        )
+
+        for i in order:
+            section = sections[i]
+            limit = remaining if section.max_tokens is None else min(remaining, section.max_tokens)
+
+            if section.items is not None:
+                text, used, kept = self._pack_items(section, limit, tokenizer)
+                stats[section.name] = {"tokens": used, "items": kept, "of": len(section.items)}
+            else:
+                needed = self.count(section.text, static=section.static, tokenizer=tokenizer)
+                if needed <= limit:
+                    text, used = section.text, needed
+                else:
+                    text = self.truncate(section.text, limit, tokenizer=tokenizer)
+                    used = tokenizer.count_tokens(text) if text else 0
+                stats[section.name] = {"tokens": used, "truncated": needed > limit}
+
+            if text:
+                rendered[i] = text
+                remaining -= used + 1  # +1: séparateur
+
+        text = "\n\n".join(rendered[i] for i in sorted(rendered))
+        packed = PackedPrompt(text=text, tokens=budget - remaining, budget=budget, sections=stats)
+        logger.debug(f"📐 Prompt: {packed.tokens}/{budget} tokens - {stats}")
+        return packed
+
+    def _pack_items(self, section: PromptSection, limit: int, tokenizer: Any):
+        """Ajouter les éléments un par un jusqu'à épuisement du budget"""
+        if not section.items:
+            return "", 0, 0
+
+        header_tokens = self.count(section.text, static=True, tokenizer=tokenizer) if section.text else 0
+        if header_tokens >= limit:
+            return "", 0, 0
+
+        lines = [section.text] if section.text else []
+        used = header_tokens
+        kept = 0
+        for item in section.items:
+            item_limit = limit - used - 1
+            if section.item_max_tokens is not None:
+                item_limit = min(item_limit, section.item_max_tokens)
+            if item_limit <= 8:  # Un fragment de quelques tokens n'apporte rien
+                break
+            item_text = self.truncate(item, item_limit, tokenizer=tokenizer)
+            lines.append(item_text)
+            used += tokenizer.count_tokens(item_text) + 1
+            kept += 1
+
+        if kept == 0:
+            return "", 0, 0
+        return "\n".join(lines), used, kept
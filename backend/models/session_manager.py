@@ -0,0 +1,203 @@
+"""
+🧩 SESSIONS PAR CONVERSATION
+=============================
+
+Remplace la liste globale `UnifiedAgent.context["short_term"]` partagée par
+tous les utilisateurs. Chaque `conversation_id` possède son propre tampon
+circulaire (`deque(maxlen=N)`) d'enregistrements compacts (`TurnRecord`).
+
+- Lecture/écriture d'un tampon sans verrou: `deque.append` et `tuple(deque)`
+  sont atomiques sous le GIL
+- Le verrou ne protège que la création et l'éviction des sessions
+- Éviction: TTL d'inactivité, nombre maximum de sessions (LRU) et plafond
+  mémoire approximatif
+
+Auteur: BelikanM
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION = "default"
+
+# Coût fixe estimé d'un enregistrement (tuple + objets str)
+_RECORD_OVERHEAD_BYTES = 200
+
+
+class TurnRecord(NamedTuple):
+    """Enregistrement compact d'un échange (texte tronqué, pas de résultat brut)"""
+    kind: str  # "chat" ou "image_analysis"
+    user: str
+    assistant: str
+    tools: Tuple[str, ...]
+    timestamp: float
+
+    def nbytes(self) -> int:
+        return (
+            len(self.user) + len(self.assistant)
+            + sum(len(t) for t in self.tools)
+            + _RECORD_OVERHEAD_BYTES
+        )
+
+
+class _Session:
+    __slots__ = ("turns", "created_at", "last_access", "nbytes")
+
+    def __init__(self, max_turns: int):
+        self.turns: deque = deque(maxlen=max_turns)
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.nbytes = 0
+
+
+class SessionManager:
+    """
+    Gestionnaire de sessions par conversation
+
+    Args:
+        max_turns: Taille du tampon circulaire de chaque session
+        max_sessions: Nombre maximum de sessions actives (éviction LRU)
+        ttl: Secondes d'inactivité avant expiration d'une session
+        max_bytes: Plafond mémoire approximatif de toutes les sessions
+        max_text_chars: Longueur maximale stockée par message
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 10,
+        max_sessions: int = 10000,
+        ttl: float = 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_text_chars: int = 2000
+    ):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_text_chars = max_text_chars
+
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+        self._records_since_sweep = 0
+        self.evicted = 0
+
+    # ==========================================
+    # ÉCRITURE / LECTURE
+    # ==========================================
+
+    def record(
+        self,
+        session_id: Optional[str],
+        kind: str,
+        user: str,
+        assistant: str,
+        tools: Optional[List[str]] = None
+    ) -> TurnRecord:
+        """Ajouter un échange compact à la session"""
+        turn = TurnRecord(
+            kind=kind,
+            user=(user or "")[:self.max_text_chars],
+            assistant=(assistant or "")[:self.max_text_chars],
+            tools=tuple(tools or ()),
+            timestamp=time.time()
+        )
+
+        session = self._get_or_create(session_id or DEFAULT_SESSION)
+        turns = session.turns
+        if len(turns) == turns.maxlen:
+            session.nbytes -= turns[0].nbytes()
+        turns.append(turn)
+        session.nbytes += turn.nbytes()
+        session.last_access = turn.timestamp
+
+        self._records_since_sweep += 1
+        if self._records_since_sweep >= 64:
+            self._records_since_sweep = 0
+            self.sweep()
+        return turn
+
+    def recent(self, session_id: Optional[str], n: int = 5) -> List[TurnRecord]:
+        """Derniers échanges d'une session (plus ancien en premier)"""
+        session = self._sessions.get(session_id or DEFAULT_SESSION)
+        if session is None:
+            return []
+        session.last_access = time.time()
+        turns = tuple(session.turns)  # Copie atomique sous le GIL
+        return list(turns[-n:]) if n else []
+
+    def clear(self, session_id: Optional[str] = None):
+        """Effacer une session (ou toutes si `session_id` est None)"""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    # ==========================================
+    # ÉVICTION
+    # ==========================================
+
+    def _get_or_create(self, session_id: str) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            return session
+
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    self._evict_lru(len(self._sessions) - self.max_sessions + 1 + self.max_sessions // 10)
+                session = _Session(self.max_turns)
+                self._sessions[session_id] = session
+        return session
+
+    def sweep(self):
+        """Expirer les sessions inactives et respecter le plafond mémoire"""
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if now - s.last_access > self.ttl]
+            for sid in expired:
+                del self._sessions[sid]
+            self.evicted += len(expired)
+
+            total = sum(s.nbytes for s in self._sessions.values())
+            if total > self.max_bytes:
+                # Libérer 10% sous le plafond pour amortir les balayages
+                target = total - int(self.max_bytes * 0.9)
+                freed = 0
+                for sid, session in sorted(self._sessions.items(), key=lambda kv: kv[1].last_access):
+                    if freed >= target:
+                        break
+                    freed += session.nbytes
+                    del self._sessions[sid]
+                    self.evicted += 1
+
+        if expired:
+            logger.info(f"🧹 {len(expired)} session(s) expirée(s)")
+
+    def _evict_lru(self, count: int):
+        """Retirer les `count` sessions les moins récemment utilisées (verrou tenu)"""
+        oldest = sorted(self._sessions.items(), key=lambda kv: kv[1].last_access)[:count]
+        for sid, _ in oldest:
+            del self._sessions[sid]
+        self.evicted += len(oldest)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques des sessions"""
+        sessions = list(self._sessions.values())
+        return {
+            "active_sessions": len(sessions),
+            "total_turns": sum(len(s.turns) for s in sessions),
+            "approx_bytes": sum(s.nbytes for s in sessions),
+            "evicted": self.evicted,
+            "max_turns": self.max_turns,
+            "ttl_seconds": self.ttl
+        }
@@ -0,0 +1,237 @@
+"""
+🚀 DÉCODAGE SPÉCULATIF (MODÈLE BROUILLON / PROMPT LOOKUP)
+==========================================================
+
+Sur CPU, le décodage de Mistral-7B est limité par la bande passante mémoire:
+chaque token relit tous les poids. En décodage spéculatif, des tokens
+candidats sont proposés à bas coût puis vérifiés par Mistral en une seule
+passe (les poids ne sont lus qu'une fois pour plusieurs tokens). Le texte
+produit est identique: les candidats refusés sont simplement écartés.
+
+Deux sources de candidats (llama-cpp-python, `Llama.draft_model`):
+- "prompt_lookup": recopie des n-grammes déjà présents dans le prompt.
+  Aucun modèle en plus; très efficace pour les réponses RAG et les synthèses
+  qui reprennent des passages des chunks, de la vision ou du web.
+- "draft": un petit GGUF de même vocabulaire que Mistral (ex: un modèle
+  ~100-500M dérivé de Llama/Mistral) génère k tokens en glouton.
+
+Le mode est choisi par type de requête (chat, rag, synthesis, summary):
+LLM_SPECULATIVE="rag:prompt_lookup,synthesis:prompt_lookup,chat:draft"
+
+⚠️ La vérification exige `logits_all=True` sur les workers Mistral
+(≈ n_ctx × n_vocab × 4 octets par worker, ~512 Mo pour 4096 × 32000).
+
+Auteur: BelikanM
+"""
+
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_NONE = "none"
+SPECULATIVE_PROMPT_LOOKUP = "prompt_lookup"
+SPECULATIVE_DRAFT = "draft"
+SPECULATIVE_MODES = (SPECULATIVE_NONE, SPECULATIVE_PROMPT_LOOKUP, SPECULATIVE_DRAFT)
+
+REQUEST_TYPES = ("chat", "rag", "synthesis", "summary")
+
+
+def parse_speculative_modes(spec: str) -> Dict[str, str]:
+    """
+    Lire "type:mode,type:mode" (ex: "rag:prompt_lookup,chat:draft")
+
+    "*:mode" s'applique aux types non listés. Les entrées invalides sont
+    ignorées avec un avertissement.
+    """
+    modes: Dict[str, str] = {}
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        request_type, _, mode = entry.partition(":")
+        request_type, mode = request_type.strip(), mode.strip()
+        if mode not in SPECULATIVE_MODES or (request_type not in REQUEST_TYPES and request_type != "*"):
+            logger.warning(f"⚠️ Entrée LLM_SPECULATIVE ignorée: {entry}")
+            continue
+        modes[request_type] = mode
+
+    default = modes.pop("*", None)
+    if default:
+        for request_type in REQUEST_TYPES:
+            modes.setdefault(request_type, default)
+    return {request_type: mode for request_type, mode in modes.items() if mode != SPECULATIVE_NONE}
+
+
+def _draft_base():
+    from llama_cpp.llama_speculative import LlamaDraftModel
+    return LlamaDraftModel
+
+
+def create_prompt_lookup(num_pred_tokens: int = 10, max_ngram_size: int = 2):
+    """Candidats par recopie du prompt (sans état: partagé par tous les workers)"""
+    from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+    return LlamaPromptLookupDecoding(max_ngram_size=max_ngram_size, num_pred_tokens=num_pred_tokens)
+
+
+def create_small_model_draft(model_path: str, n_ctx: int, n_threads: int, num_pred_tokens: int = 4):
+    """
+    Petit modèle brouillon pour un worker (il garde son propre cache KV)
+
+    Le sous-classement de `LlamaDraftModel` est fait ici pour que llama_cpp
+    ne soit importé qu'au chargement du LLM.
+    """
+    import numpy as np
+    from llama_cpp import Llama
+
+    class SmallModelDraft(_draft_base()):
+        """k tokens proposés en glouton par un petit GGUF de même vocabulaire"""
+
+        def __init__(self):
+            self.llm = Llama(
+                model_path=model_path,
+                n_ctx=n_ctx,
+                n_threads=n_threads,
+                n_threads_batch=n_threads,
+                use_mmap=True,
+                verbose=False
+            )
+            self.num_pred_tokens = num_pred_tokens
+
+        def __call__(self, input_ids, /, **kwargs):
+            # generate() réutilise le plus long préfixe déjà dans le cache KV:
+            # seuls les tokens acceptés depuis le dernier appel sont évalués
+            draft = []
+            eos = self.llm.token_eos()
+            for token in self.llm.generate(input_ids.tolist(), top_k=1, temp=0.0, repeat_penalty=1.0):
+                if token == eos:
+                    break
+                draft.append(token)
+                if len(draft) >= self.num_pred_tokens:
+                    break
+            return np.array(draft, dtype=np.intc)
+
+        def close(self):
+            if hasattr(self.llm, "close"):
+                self.llm.close()
+
+    return SmallModelDraft()
+
+
+class SpeculativeDecoding:
+    """
+    Sources de candidats par type de requête pour les workers d'un LLMTool
+
+    Args:
+        modes: Type de requête -> mode ("prompt_lookup" | "draft")
+        draft_model_path: GGUF brouillon (mode "draft")
+        prompt_lookup_tokens: Tokens proposés par recopie du prompt
+        draft_tokens: Tokens proposés par le modèle brouillon
+        n_ctx: Contexte du modèle brouillon (celui de Mistral)
+    """
+
+    def __init__(
+        self,
+        modes: Dict[str, str],
+        draft_model_path: Optional[str] = None,
+        prompt_lookup_tokens: int = 10,
+        draft_tokens: int = 4,
+        n_ctx: int = 4096
+    ):
+        self.modes = dict(modes)
+        self.draft_model_path = draft_model_path
+        self.prompt_lookup_tokens = prompt_lookup_tokens
+        self.draft_tokens = draft_tokens
+        self.n_ctx = n_ctx
+
+        if SPECULATIVE_DRAFT in self.modes.values() and not draft_model_path:
+            logger.warning("⚠️ Mode spéculatif 'draft' sans LLM_DRAFT_MODEL_PATH: prompt_lookup utilisé")
+            self.modes = {
+                t: (SPECULATIVE_PROMPT_LOOKUP if m == SPECULATIVE_DRAFT else m)
+                for t, m in self.modes.items()
+            }
+
+        self._prompt_lookup = None
+        self._drafts: Dict[int, Any] = {}  # id(llm worker) -> modèle brouillon
+        self._draft_failed = False
+        self._lock = threading.Lock()
+        self.usage: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.modes)
+
+    def mode_for(self, request_type: str) -> str:
+        if self._draft_failed and self.modes.get(request_type) == SPECULATIVE_DRAFT:
+            return SPECULATIVE_PROMPT_LOOKUP
+        return self.modes.get(request_type, SPECULATIVE_NONE)
+
+    def draft_for(self, llm: Any, request_type: str) -> Optional[Any]:
+        """
+        Source de candidats pour ce worker et ce type de requête
+
+        À appeler sous le verrou du worker: le modèle brouillon d'un worker
+        n'est jamais utilisé par deux générations à la fois.
+        """
+        mode = self.mode_for(request_type)
+        if mode == SPECULATIVE_NONE:
+            return None
+
+        if mode == SPECULATIVE_DRAFT:
+            draft = self._drafts.get(id(llm))
+            if draft is None:
+                draft = self._load_draft(llm)
+            if draft is not None:
+                self._count(mode)
+                return draft
+            mode = SPECULATIVE_PROMPT_LOOKUP
+
+        if self._prompt_lookup is None:
+            self._prompt_lookup = create_prompt_lookup(self.prompt_lookup_tokens)
+        self._count(mode)
+        return self._prompt_lookup
+
+    def _load_draft(self, llm: Any) -> Optional[Any]:
+        try:
+            # Même nombre de threads que le worker: les deux modèles alternent
+            # sur les mêmes cœurs
+            draft = create_small_model_draft(
+                self.draft_model_path, self.n_ctx, getattr(llm, "n_threads", 1), self.draft_tokens
+            )
+            if draft.llm.n_vocab() != llm.n_vocab():
+                logger.warning(
+                    f"⚠️ Modèle brouillon incompatible (vocabulaire {draft.llm.n_vocab()} ≠ "
+                    f"{llm.n_vocab()}): prompt_lookup utilisé"
+                )
+                draft.close()
+                self._draft_failed = True
+                return None
+            self._drafts[id(llm)] = draft
+            logger.info(f"✅ Modèle brouillon chargé: {self.draft_model_path}")
+            return draft
+        except Exception as e:
+            logger.error(f"❌ Modèle brouillon indisponible: {e}")
+            self._draft_failed = True
+            return None
+
+    def _count(self, mode: str):
+        with self._lock:
+            self.usage[mode] = self.usage.get(mode, 0) + 1
+
+    def close(self):
+        """Libérer les modèles brouillons (déchargement du LLM)"""
+        for draft in self._drafts.values():
+            draft.close()
+        self._drafts.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "modes": self.modes,
+            "draft_model": self.draft_model_path,
+            "draft_loaded": len(self._drafts),
+            "draft_failed": self._draft_failed,
+            "prompt_lookup_tokens": self.prompt_lookup_tokens,
+            "draft_tokens": self.draft_tokens,
+            "usage": dict(self.usage)
+        }
@@ -0,0 +1,427 @@
+"""
+🧪 MODÈLES FACTICES DÉTERMINISTES (BENCHMARKS, CHARGE, HORS LIGNE)
+===================================================================
+
+SmolVLM, Mistral-7B, Coqui TTS et MiniLM pèsent plusieurs Go: impossible de
+mesurer une optimisation de l'API (FAISS, prompts, caches, concurrence) sur
+une machine sans les modèles, et leurs temps de réponse varient trop pour
+comparer deux exécutions.
+
+Ces outils ont la même interface que les vrais (BaseTool, `encode`) et:
+- produisent des sorties déterministes (dérivées d'une empreinte de l'entrée)
+- simulent une latence configurable, proche des vrais modèles sur CPU
+  (décodage par token, évaluation du prompt, vision par image...)
+- bloquent le thread appelant comme les vrais modèles (time.sleep)
+
+Latences (secondes) réglables par STUB_LATENCY="llm_token=0.02,vision=0.5"
+et STUB_LATENCY_SCALE (0 = instantané). Activés dans l'API par STUB_MODELS=1.
+
+Auteur: BelikanM
+"""
+
+import io
+import os
+import re
+import time
+import wave
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+
+from unified_agent import BaseTool, UnifiedAgent
+from prompt_packer import HEURISTIC_TOKENIZER
+from llm_tiers import TIER_LARGE, TIER_SMALL
+from web_search import WebSearch, StubSearchBackend
+
+logger = logging.getLogger(__name__)
+
+STUB_EMBEDDING_DIMENSION = 384  # Même dimension que MiniLM: index FAISS compatibles
+
+# Latences par défaut (secondes), ordre de grandeur des vrais modèles sur CPU
+DEFAULT_LATENCIES: Dict[str, float] = {
+    "load": 0.0,                 # Chargement d'un outil
+    "embedding": 0.004,          # Appel du modèle d'embeddings (par lot)
+    "embedding_text": 0.001,     # + par texte du lot
+    "vision": 1.5,               # SmolVLM, par image
+    "vision_batch_image": 0.4,   # + par image supplémentaire d'un lot complété
+    "detection": 0.02,           # YOLO, par image
+    "llm_prompt_token": 0.0005,  # Mistral-7B, évaluation du prompt (par token)
+    "llm_token": 0.08,           # Mistral-7B, décodage (par token)
+    "llm_small_token": 0.02,     # Petit tier, décodage (par token)
+    "tts_char": 0.002,           # Coqui, par caractère
+    "web_search": 0.3            # Recherche web (backend stub)
+}
+
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+# Vocabulaire des réponses générées (phrases françaises plausibles)
+_VOCABULARY = (
+    "la plateforme permet de gérer les employés et les certifications avec un suivi "
+    "précis des équipements de sécurité sur chaque site ainsi que des rapports détaillés "
+    "pour le responsable qui reçoit une alerte avant chaque expiration et peut exporter "
+    "les fiches au format PDF ou Excel depuis le menu dédié"
+).split()
+
+_VISION_SUBJECTS = [
+    "un technicien portant un casque jaune", "une plateforme pétrolière", "un bureau avec un ordinateur",
+    "une vanne industrielle", "un groupe de personnes en réunion", "un document imprimé",
+    "un véhicule de chantier", "une salle de contrôle avec plusieurs écrans"
+]
+
+_DETECTION_LABELS = ["person", "helmet", "safety vest", "valve", "laptop", "truck", "chair", "document"]
+
+
+def parse_latencies(spec: str = "", scale: float = 1.0) -> Dict[str, float]:
+    """
+    Latences des stubs depuis "clé=secondes,..." (clés de DEFAULT_LATENCIES)
+
+    Args:
+        scale: Multiplicateur appliqué à toutes les latences (0 = instantané)
+    """
+    latencies = dict(DEFAULT_LATENCIES)
+    for item in (spec or "").split(","):
+        key, _, value = item.partition("=")
+        key = key.strip()
+        if not key:
+            continue
+        if key not in latencies:
+            logger.warning(f"⚠️ Latence de stub inconnue ignorée: {key}")
+            continue
+        try:
+            latencies[key] = float(value)
+        except ValueError:
+            logger.warning(f"⚠️ Latence de stub invalide: {item}")
+    return {key: value * scale for key, value in latencies.items()}
+
+
+def latencies_from_env() -> Dict[str, float]:
+    return parse_latencies(os.getenv("STUB_LATENCY", ""), float(os.getenv("STUB_LATENCY_SCALE", "1")))
+
+
+def _digest(*parts: Any) -> bytes:
+    return hashlib.sha256("\x00".join(str(p) for p in parts).encode("utf-8")).digest()
+
+
+def _sleep(seconds: float):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+# ==========================================
+# EMBEDDINGS
+# ==========================================
+
+class StubEmbedder:
+    """
+    Embeddings déterministes par hachage des mots (remplace SentenceTransformer)
+
+    Deux textes partageant des mots ont des vecteurs proches: la recherche
+    FAISS et le routeur d'intention restent significatifs.
+    """
+
+    def __init__(self, dimension: int = STUB_EMBEDDING_DIMENSION, latency: float = 0.0, latency_per_text: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.latency_per_text = latency_per_text
+        self.name = f"stub-hash-{dimension}"
+        self.calls = 0
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _WORDS.findall((text or "").lower()):
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """Même signature utile que SentenceTransformer.encode (matrice n × dim)"""
+        if isinstance(texts, str):
+            texts = [texts]
+        self.calls += 1
+        _sleep(self.latency + self.latency_per_text * len(texts))
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+
+
+# ==========================================
+# OUTILS
+# ==========================================
+
+class StubVisionTool(BaseTool):
+    """SmolVLM factice: description dérivée du contenu du fichier"""
+
+    def __init__(self, latency: float = 0.0, load_latency: float = 0.0, batch_image_latency: float = 0.0):
+        super().__init__(name="vision_analyzer", description="Vision factice (benchmarks). Remplace SmolVLM-500M-Instruct.")
+        self.latency = latency
+        self.load_latency = load_latency
+        self.batch_image_latency = batch_image_latency
+
+    def _initialize(self):
+        _sleep(self.load_latency)
+        self.is_ready = True
+
+    def execute(self, image_path: str, question: str = "Décris cette image en détail") -> Dict[str, Any]:
+        try:
+            with open(image_path, "rb") as f:
+                digest = _digest(hashlib.sha256(f.read()).hexdigest(), question)
+        except OSError as e:
+            return {"error": str(e)}
+        _sleep(self.latency)
+        return self._describe(digest, question, image_path)
+
+    def execute_batch(self, images: List[Any], questions: List[str]) -> List[Dict[str, Any]]:
+        """Un seul `generate` par lot: la première image coûte `latency`, les suivantes moins"""
+        results = []
+        for image, question in zip(images, questions):
+            try:
+                if isinstance(image, str):
+                    with open(image, "rb") as f:
+                        content = f.read()
+                else:
+                    content = image.tobytes()  # Image PIL déjà décodée
+            except OSError as e:
+                results.append({"error": str(e)})
+                continue
+            digest = _digest(hashlib.sha256(content).hexdigest(), question)
+            results.append(self._describe(digest, question, image if isinstance(image, str) else None))
+        if images:
+            _sleep(self.latency + self.batch_image_latency * (len(images) - 1))
+        return results
+
+    def _describe(self, digest: bytes, question: str, image_path: Optional[str]) -> Dict[str, Any]:
+        subjects = [_VISION_SUBJECTS[b % len(_VISION_SUBJECTS)] for b in digest[:2]]
+        return {
+            "success": True,
+            "description": f"L'image montre {subjects[0]} et {subjects[1]}, dans un environnement professionnel bien éclairé.",
+            "question": question,
+            "image": image_path
+        }
+
+
+class StubDetectionTool(BaseTool):
+    """YOLO factice: détections dérivées du contenu du fichier"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(name="object_detector", description="Détection factice (benchmarks). Remplace YOLO TensorFlow.js.")
+        self.latency = latency
+
+    def execute(self, image_path: str, confidence: float = 0.5) -> Dict[str, Any]:
+        try:
+            with open(image_path, "rb") as f:
+                digest = _digest(hashlib.sha256(f.read()).hexdigest())
+        except OSError as e:
+            return {"error": str(e)}
+        _sleep(self.latency)
+        detections = [
+            {
+                "label": _DETECTION_LABELS[digest[i] % len(_DETECTION_LABELS)],
+                "confidence": round(0.5 + digest[i + 8] / 512, 2),
+                "box": [digest[i + 16] % 200, digest[i + 17] % 200, 200 + digest[i + 18], 200 + digest[i + 19]]
+            }
+            for i in range(digest[31] % 4 + 1)
+        ]
+        return {
+            "success": True,
+            "detections": [d for d in detections if d["confidence"] >= confidence],
+            "image": image_path
+        }
+
+
+class StubLLMTool(BaseTool):
+    """
+    LLM factice: texte déterministe, latence prompt + décodage par token
+
+    Args:
+        workers: Générations simultanées (comme le pool de workers llama.cpp)
+    """
+
+    def __init__(
+        self,
+        model_name: str = "stub-mistral",
+        token_latency: float = 0.0,
+        prompt_token_latency: float = 0.0,
+        load_latency: float = 0.0,
+        workers: int = 1,
+        max_response_tokens: int = 60,
+        name: str = "reasoning_engine"
+    ):
+        super().__init__(name=name, description=f"LLM factice (benchmarks). Remplace {model_name}.")
+        self.model_name = model_name
+        self.token_latency = token_latency
+        self.prompt_token_latency = prompt_token_latency
+        self.load_latency = load_latency
+        self.workers = max(1, workers)
+        self.max_response_tokens = max_response_tokens
+        self.speculative = None
+        self._slots = threading.Semaphore(self.workers)
+        self._stats_lock = threading.Lock()
+        self.inflight = 0
+        self.requests = 0
+        self.generated_tokens = 0
+        self.generation_seconds = 0.0
+
+    def _initialize(self):
+        _sleep(self.load_latency)
+        self.is_ready = True
+
+    def execute(
+        self,
+        prompt: str,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        request_type: str = "chat",
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        if not self.is_ready:
+            return {"error": "LLM tool not ready"}
+
+        digest = _digest(prompt, max_tokens)
+        n_tokens = min(max_tokens, self.max_response_tokens // 2 + digest[0] % (self.max_response_tokens // 2 + 1))
+        prompt_tokens = self.count_tokens(prompt)
+
+        start = time.perf_counter()
+        with self._slots:
+            with self._stats_lock:
+                self.inflight += 1
+            try:
+                _sleep(prompt_tokens * self.prompt_token_latency)
+                pieces = []
+                for i in range(n_tokens):
+                    _sleep(self.token_latency)
+                    word = _VOCABULARY[(digest[i % len(digest)] + i) % len(_VOCABULARY)]
+                    piece = (" " if i else "") + word + ("." if i == n_tokens - 1 or i % 12 == 11 else "")
+                    pieces.append(piece)
+                    if on_text is not None:
+                        on_text(piece)
+            finally:
+                with self._stats_lock:
+                    self.inflight -= 1
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self.requests += 1
+            self.generated_tokens += n_tokens
+            self.generation_seconds += elapsed
+
+        return {
+            "success": True,
+            "response": "".join(pieces).strip().capitalize(),
+            "prompt": prompt,
+            "tokens": prompt_tokens + n_tokens,
+            "model": self.model_name,
+            "seconds": round(elapsed, 3)
+        }
+
+    def count_tokens(self, text: str) -> int:
+        return HEURISTIC_TOKENIZER.count_tokens(text)
+
+    def truncate_tokens(self, text: str, max_tokens: int) -> str:
+        return HEURISTIC_TOKENIZER.truncate_tokens(text, max_tokens)
+
+    def load_info(self) -> Optional[tuple]:
+        if not self.is_ready:
+            return None
+        return self.inflight, self.workers
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "workers": self.workers,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "generated_tokens": self.generated_tokens,
+            "avg_latency_seconds": round(self.generation_seconds / self.requests, 3) if self.requests else None,
+            "tokens_per_second": round(self.generated_tokens / self.generation_seconds, 2) if self.generation_seconds else None
+        }
+
+
+class StubTTSTool(BaseTool):
+    """Coqui factice: WAV de silence, durée proportionnelle au texte"""
+
+    SAMPLE_RATE = 16000
+
+    def __init__(self, latency_per_char: float = 0.0):
+        super().__init__(name="voice_synthesizer", description="Synthèse vocale factice (benchmarks). Remplace Coqui TTS.")
+        self.latency_per_char = latency_per_char
+        self.model_name = "stub-tts"
+        self.voice = ""
+
+    def synthesize_wav(self, text: str) -> bytes:
+        _sleep(len(text) * self.latency_per_char)
+        frames = int(self.SAMPLE_RATE * min(30.0, 0.06 * len(text)))
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            wav.writeframes(b"\x00\x00" * frames)
+        return buffer.getvalue()
+
+    def execute(self, text: str, language: str = "fr") -> Dict[str, Any]:
+        self.synthesize_wav(text)
+        return {"success": True, "text": text, "audio_url": None, "method": "stub", "language": language}
+
+
+# ==========================================
+# CONSTRUCTION
+# ==========================================
+
+def create_stub_embedder(latencies: Optional[Dict[str, float]] = None) -> StubEmbedder:
+    latencies = latencies if latencies is not None else latencies_from_env()
+    return StubEmbedder(latency=latencies["embedding"], latency_per_text=latencies["embedding_text"])
+
+
+def create_stub_agent(
+    latencies: Optional[Dict[str, float]] = None,
+    llm_workers: Optional[int] = None,
+    small_tier: bool = False
+) -> UnifiedAgent:
+    """
+    Agent unifié dont tous les outils sont factices (aucun modèle chargé)
+
+    Args:
+        latencies: Voir DEFAULT_LATENCIES (None = STUB_LATENCY / STUB_LATENCY_SCALE)
+        llm_workers: Générations simultanées (None = LLM_WORKERS ou 1)
+        small_tier: Enregistrer aussi un petit tier LLM (routage par tier)
+    """
+    latencies = latencies if latencies is not None else latencies_from_env()
+    workers = llm_workers or int(os.getenv("LLM_WORKERS", "1"))
+
+    tools = {
+        "vision": (StubVisionTool(latencies["vision"], latencies["load"], latencies["vision_batch_image"]), "👁️ Vision (stub)"),
+        "detection": (StubDetectionTool(latencies["detection"]), "🎯 Détection (stub)"),
+        TIER_LARGE: (
+            StubLLMTool(
+                token_latency=latencies["llm_token"],
+                prompt_token_latency=latencies["llm_prompt_token"],
+                load_latency=latencies["load"],
+                workers=workers
+            ),
+            "🧠 Raisonnement (stub)"
+        ),
+        "tts": (StubTTSTool(latencies["tts_char"]), "🗣️ Synthèse vocale (stub)")
+    }
+    if small_tier:
+        tools[TIER_SMALL] = (
+            StubLLMTool(
+                model_name="stub-small",
+                token_latency=latencies["llm_small_token"],
+                prompt_token_latency=latencies["llm_prompt_token"] / 4,
+                load_latency=latencies["load"],
+                workers=workers,
+                name="fast_reasoning_engine"
+            ),
+            "⚡ Réponses rapides (stub)"
+        )
+
+    logger.info("🧪 Agent factice: aucun modèle réel ne sera chargé")
+    return UnifiedAgent(
+        tools=tools,
+        idle_timeout=0,
+        preload=[],
+        web_search=WebSearch(StubSearchBackend(latency=latencies["web_search"]))
+    )
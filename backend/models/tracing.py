@@ -0,0 +1,355 @@
+"""
+⏱️ TRAÇAGE DES ÉTAPES PAR REQUÊTE (SPANS)
+=========================================
+
+Les seules mesures de temps étaient les lignes de log emoji de
+`process_image`, `chat` et `ChatAgentManager.chat`: impossible de savoir
+comment une requête lente se répartit entre embedding, FAISS, Tavily,
+SmolVLM, Mistral (évaluation du prompt vs décodage) et TTS.
+
+Couche de traçage légère, sans dépendance:
+- `trace("POST /chat")` ouvre une trace par requête (span racine)
+- `span("faiss.search", k=5)` mesure une étape, imbriquée sous l'étape courante
+- `current_span().update(tokens=..., cache_hit=True)` ajoute des attributs
+- Le span courant est porté par un `contextvars.ContextVar`: `propagate(fn)`
+  le transmet aux threads (pools, workers de recherche, synthèse vocale)
+- Hors d'une trace, `span()` ne coûte presque rien (span vide partagé)
+
+Export (TRACE_EXPORT), en tâche de fond, au format OTLP/JSON d'OpenTelemetry:
+- "file:storage/traces/traces.jsonl": une ligne `resourceSpans` par trace
+- "otlp:http://127.0.0.1:4318/v1/traces": POST vers un collecteur OTLP/HTTP
+
+Auteur: BelikanM
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """Une étape mesurée d'une trace"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "thread")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def update(self, **attributes):
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float = 1):
+        """Incrémenter un compteur (ex: hits de cache sur plusieurs appels)"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def fail(self, message: str):
+        """Marquer l'étape en erreur sans lever d'exception"""
+        self.error = message
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self, origin_ns: int) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start_ns - origin_ns) / 1e6, 2),
+            "duration_ms": round(self.duration_ms, 2),
+            "thread": self.thread,
+            "attributes": self.attributes,
+            **({"error": self.error} if self.error else {})
+        }
+
+
+class _NoopSpan:
+    """Span hors trace: les attributs sont ignorés"""
+
+    __slots__ = ()
+    name = None
+    span_id = None
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def update(self, **attributes):
+        pass
+
+    def add(self, key: str, amount: float = 1):
+        pass
+
+    def fail(self, message: str):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Ensemble des spans d'une requête"""
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self.root: Optional[Span] = None
+
+    def _add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Vue compacte (champ `debug` des réponses): spans et temps par étape"""
+        with self._lock:
+            spans = list(self.spans)
+        origin = self.root.start_ns if self.root else (spans[0].start_ns if spans else 0)
+        stages: Dict[str, float] = {}
+        for span in spans:
+            if span is not self.root:
+                stages[span.name] = round(stages.get(span.name, 0.0) + span.duration_ms, 2)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round(self.root.duration_ms, 2) if self.root else None,
+            "stages_ms": stages,
+            "spans": [span.to_dict(origin) for span in spans]
+        }
+
+    def to_otlp(self, service_name: str) -> Dict[str, Any]:
+        """Trace au format OTLP/JSON (ExportTraceServiceRequest)"""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "center.chat_agent"},
+                    "spans": [
+                        {
+                            "traceId": self.trace_id,
+                            "spanId": span.span_id,
+                            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                            "name": span.name,
+                            "kind": 2 if span is self.root else 1,  # SERVER / INTERNAL
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+                            "attributes": [
+                                _otlp_attribute(key, value)
+                                for key, value in {**span.attributes, "thread.name": span.thread}.items()
+                            ],
+                            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    elif isinstance(value, str):
+        typed = {"stringValue": value}
+    else:
+        typed = {"stringValue": json.dumps(value, ensure_ascii=False, default=str)}
+    return {"key": key, "value": typed}
+
+
+# ==========================================
+# API DE TRAÇAGE
+# ==========================================
+
+@contextmanager
+def trace(name: str, **attributes) -> Iterator[Trace]:
+    """
+    Ouvrir une trace (une par requête) et son span racine
+
+    Usage:
+        with trace("POST /chat", conversation_id=conv_id) as t:
+            ...
+        response["debug"] = t.to_dict()
+    """
+    current = Trace(name)
+    root = Span(current, name, None, attributes)
+    current.root = root
+    current._add(root)
+    token = _current_span.set(root)
+    try:
+        yield current
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.end()
+        _current_span.reset(token)
+        EXPORTER.export(current)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Any]:
+    """Mesurer une étape sous le span courant (sans effet hors trace)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    parent.trace._add(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end()
+        _current_span.reset(token)
+
+
+def current_span() -> Any:
+    """Span courant (span vide hors trace)"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def current_trace() -> Optional[Trace]:
+    current = _current_span.get()
+    return current.trace if current is not None else None
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Lier une fonction au contexte de traçage de l'appelant
+
+    À utiliser pour toute fonction exécutée dans un autre thread
+    (`executor.submit(propagate(fn))`, `Thread(target=propagate(fn))`):
+    ses spans s'imbriquent sous le span courant de l'appelant.
+    """
+    context = contextvars.copy_context()
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        # Une copie par appel: un même Context ne peut pas être actif dans deux threads
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+# ==========================================
+# EXPORT
+# ==========================================
+
+class TraceExporter:
+    """
+    Export asynchrone des traces terminées (OTLP/JSON)
+
+    Args:
+        target: "" (désactivé), "file:<chemin.jsonl>" ou "otlp:<url /v1/traces>"
+        service_name: Attribut `service.name` des traces
+        max_queue: Traces en attente maximum (au-delà: abandonnées et comptées)
+    """
+
+    def __init__(self, target: str = "", service_name: str = "chat-agent", max_queue: int = 1000):
+        self.target = target or ""
+        self.service_name = service_name
+        self.kind, _, self.destination = self.target.partition(":")
+        self.exported = 0
+        self.dropped = 0
+        self.errors = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._worker: Optional[threading.Thread] = None
+
+        if self.kind not in ("", "file", "otlp") or (self.kind and not self.destination):
+            logger.warning(f"⚠️ TRACE_EXPORT invalide ({self.target}): export désactivé")
+            self.kind = ""
+        if self.kind:
+            self._worker = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._worker.start()
+            logger.info(f"⏱️ Export des traces: {self.target}")
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.kind)
+
+    def export(self, finished: Trace):
+        if not self.kind:
+            return
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            finished = self._queue.get()
+            try:
+                payload = json.dumps(finished.to_otlp(self.service_name), ensure_ascii=False, default=str)
+                if self.kind == "file":
+                    path = Path(self.destination)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(path, "a", encoding="utf-8") as f:
+                        f.write(payload + "\n")
+                else:
+                    request = urllib.request.Request(
+                        self.destination,
+                        data=payload.encode("utf-8"),
+                        headers={"Content-Type": "application/json"},
+                        method="POST"
+                    )
+                    urllib.request.urlopen(request, timeout=5).close()
+                self.exported += 1
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1 or self.errors % 100 == 0:
+                    logger.warning(f"⚠️ Export de trace échoué ({self.errors}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "target": self.target or None,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "queued": self._queue.qsize()
+        }
+
+
+EXPORTER = TraceExporter(
+    os.getenv("TRACE_EXPORT", ""),
+    service_name=os.getenv("TRACE_SERVICE_NAME", "chat-agent")
+)
@@ -0,0 +1,248 @@
+"""
+🎯 DÉTECTION DE MOTS-CLÉS EN UNE PASSE (AHO-CORASICK)
+======================================================
+
+`detect_intent`, les tests `needs_web_search` / `needs_memory_search` /
+`needs_visual_search` et les `search_triggers` de `process_image` mettaient
+chacun le texte en minuscules puis enchaînaient des `any(k in text ...)` sur
+des listes reconstruites à chaque appel, plusieurs fois par requête.
+
+Ici, toutes les tables de déclencheurs sont compilées dans un seul automate
+Aho-Corasick: un seul parcours du texte renvoie toutes les catégories
+reconnues (y compris les motifs qui se chevauchent, ex: "recherche" et
+"cherche"). La sémantique reste celle de `k in text` (sous-chaîne, sans
+tenir compte de la casse).
+
+Les tables sont configurables (fichier JSON `TRIGGERS_PATH`, qui remplace
+les catégories par défaut du même nom) et rechargeables à chaud:
+l'automate est reconstruit puis échangé atomiquement.
+
+Auteur: BelikanM
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Tables par défaut (catégorie -> motifs)
+DEFAULT_TRIGGERS: Dict[str, List[str]] = {
+    # Intentions (ChatAgentManager.detect_intent)
+    "intent_search": ["recherche", "cherche", "trouve", "internet", "google", "web"],
+    "intent_explain_action": ["comment", "utiliser", "fonctionner", "faire", "aide", "option", "fonction", "menu"],
+    "intent_explain_subject": ["application", "app", "center", "plateforme", "système"],
+    "intent_problem": ["erreur", "bug", "problème", "marche pas", "fonctionne pas"],
+    "intent_summary": ["résume", "résumer", "synthèse", "bref", "court"],
+    "intent_creative": ["imagine", "crée", "génère", "invente", "idée"],
+
+    # Besoin d'une recherche internet (ChatAgentManager.chat)
+    "web_search": [
+        "actualité", "news", "aujourd'hui", "récent", "maintenant",
+        "qui est", "c'est quoi", "qu'est-ce", "définition",
+        "recherche", "trouve", "cherche", "google",
+        "dernière", "dernier", "nouveau", "nouvelle",
+        "site web", "internet", "en ligne",
+        "logo", "marque", "entreprise", "société", "produit"
+    ],
+    # Besoin d'une recherche internet (UnifiedAgent.chat)
+    "agent_web_search": [
+        "actualité", "news", "aujourd'hui", "récent", "maintenant",
+        "qui est", "c'est quoi", "qu'est-ce que", "recherche",
+        "dernière", "dernier", "nouveau", "nouvelle",
+        "site web", "internet", "en ligne"
+    ],
+    # Référence à la mémoire (UnifiedAgent.chat)
+    "memory_search": [
+        "précédent", "avant", "déjà", "parlé", "dit",
+        "dernière fois", "conversation", "historique",
+        "image précédente", "photo d'avant"
+    ],
+    # Référence à une image passée (ChatAgentManager.chat)
+    "visual_search": [
+        "image", "photo", "voir", "montre", "visuel", "capture",
+        "précédent", "dernier", "avant", "historique visuel"
+    ],
+    # Recherche automatique après analyse d'image (UnifiedAgent.process_image)
+    "image_web_search": [
+        "logo", "marque", "entreprise", "société", "nom", "texte", "écrit",
+        "inscription", "enseigne", "panneau",
+        "équipement", "appareil", "instrument", "outil", "machine",
+        "uniforme", "tenue", "professionnel", "métier",
+        "rechercher", "identifier", "plus d'infos", "c'est quoi",
+        "bâtiment", "lieu", "endroit", "structure"
+    ]
+}
+
+
+class TriggerMatch:
+    """Résultat d'une passe: catégorie -> motifs reconnus"""
+
+    __slots__ = ("categories",)
+
+    def __init__(self, categories: Dict[str, Set[str]]):
+        self.categories = categories
+
+    def __contains__(self, category: str) -> bool:
+        return category in self.categories
+
+    def get(self, category: str) -> Set[str]:
+        return self.categories.get(category, set())
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {category: sorted(patterns) for category, patterns in self.categories.items()}
+
+    def __repr__(self) -> str:
+        return f"<TriggerMatch {sorted(self.categories)}>"
+
+
+class TriggerMatcher:
+    """
+    Automate Aho-Corasick compilé à partir de tables de déclencheurs
+
+    Args:
+        tables: Catégorie -> liste de motifs (insensibles à la casse)
+    """
+
+    def __init__(self, tables: Dict[str, Iterable[str]]):
+        self.tables = {
+            category: sorted({p.lower() for p in patterns if p})
+            for category, patterns in tables.items()
+        }
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[str, str], ...]] = [()]
+
+        for category, patterns in self.tables.items():
+            for pattern in patterns:
+                self._insert(pattern, category)
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, category: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] = self._out[state] + ((category, pattern),)
+
+    def _build_failure_links(self):
+        """Liens d'échec en largeur; les sorties héritent de celles du lien"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                if self._out[self._fail[next_state]]:
+                    self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    @property
+    def size(self) -> int:
+        """Nombre d'états de l'automate"""
+        return len(self._goto)
+
+    def match(self, *texts: str) -> TriggerMatch:
+        """Toutes les catégories reconnues dans les textes, en une passe chacun"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: Dict[str, Set[str]] = {}
+
+        for text in texts:
+            if not text:
+                continue
+            state = 0
+            for char in text.lower():
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                if out[state]:
+                    for category, pattern in out[state]:
+                        found.setdefault(category, set()).add(pattern)
+
+        return TriggerMatch(found)
+
+
+class TriggerTables:
+    """
+    Tables de déclencheurs rechargeables à chaud
+
+    Args:
+        path: Fichier JSON {catégorie: [motifs]} fusionné avec les tables par
+            défaut (None = TRIGGERS_PATH, vide = tables par défaut seules)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path if path is not None else (os.getenv("TRIGGERS_PATH") or None)
+        self._lock = threading.Lock()
+        self.version = 0
+        self.loaded_at = 0.0
+        self.matcher = TriggerMatcher(DEFAULT_TRIGGERS)
+        try:
+            self.reload()
+        except ValueError as e:
+            logger.error(f"❌ {e} - tables par défaut utilisées")
+
+    def _read_tables(self) -> Dict[str, List[str]]:
+        tables = {category: list(patterns) for category, patterns in DEFAULT_TRIGGERS.items()}
+        if not self.path:
+            return tables
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                overrides = json.load(f)
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Fichier de déclencheurs introuvable: {self.path}")
+            return tables
+        except (OSError, ValueError) as e:
+            raise ValueError(f"Fichier de déclencheurs invalide ({self.path}): {e}")
+
+        if not isinstance(overrides, dict) or not all(
+            isinstance(patterns, list) and all(isinstance(p, str) for p in patterns)
+            for patterns in overrides.values()
+        ):
+            raise ValueError(f"Fichier de déclencheurs invalide ({self.path}): attendu {{catégorie: [motifs]}}")
+
+        tables.update(overrides)
+        return tables
+
+    def reload(self) -> Dict[str, Any]:
+        """
+        Recompiler l'automate depuis le fichier (l'ancien reste actif en cas d'erreur)
+
+        Raises:
+            ValueError si le fichier est invalide
+        """
+        with self._lock:
+            matcher = TriggerMatcher(self._read_tables())
+            self.matcher = matcher  # Échange atomique: les requêtes en cours gardent l'ancien
+            self.version += 1
+            self.loaded_at = time.time()
+        logger.info(f"🎯 Déclencheurs v{self.version}: {len(matcher.tables)} catégories, {matcher.size} états")
+        return self.stats()
+
+    def match(self, *texts: str) -> TriggerMatch:
+        return self.matcher.match(*texts)
+
+    def stats(self) -> Dict[str, Any]:
+        matcher = self.matcher
+        return {
+            "version": self.version,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "categories": {category: len(patterns) for category, patterns in matcher.tables.items()},
+            "states": matcher.size
+        }
@@ -0,0 +1,181 @@
+"""
+🗣️ SYNTHÈSE VOCALE EN FLUX, PHRASE PAR PHRASE
+==============================================
+
+`TTSTool.execute` synthétisait toute la réponse après la fin de la
+génération: le premier son arrivait après LLM + TTS complets. Ici le texte
+est découpé aux fins de phrase au fil de la génération; dès qu'une phrase
+est complète elle est synthétisée (dans un thread dédié) pendant que le LLM
+continue, et chaque clip est envoyé au client dans l'ordre.
+
+    LLM (tokens) ──▶ SentenceSplitter ──▶ file ──▶ thread TTS ──▶ événements
+
+Auteur: BelikanM
+"""
+
+import re
+import queue
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+from tracing import propagate
+
+logger = logging.getLogger(__name__)
+
+# Fin de phrase: ponctuation finale (éventuellement suivie de guillemets ou
+# parenthèse fermante) puis un espace, ou saut de ligne
+_BOUNDARY = re.compile(r"(?<=[.!?…])[\"»)\]]*\s+|\n+")
+
+# Abréviations courantes qui ne terminent pas une phrase
+ABBREVIATIONS = {"m.", "mme.", "mlle.", "dr.", "pr.", "st.", "etc.", "ex.", "cf.", "p.", "n°.", "av.", "bd."}
+
+
+class SentenceSplitter:
+    """
+    Découpage incrémental d'un texte en phrases
+
+    Args:
+        min_chars: Longueur minimale d'un segment (les phrases très courtes
+            sont regroupées avec la suivante: moins de clips, prosodie meilleure)
+        max_chars: Longueur maximale avant coupure forcée (virgule ou espace)
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 300):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Ajouter du texte, renvoyer les phrases complètes"""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for boundary in _BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:boundary.start()].strip()
+            last_word = candidate.rsplit(" ", 1)[-1].lower()
+            if len(candidate) < self.min_chars or last_word in ABBREVIATIONS:
+                continue
+            sentences.append(candidate)
+            start = boundary.end()
+        self._buffer = self._buffer[start:]
+
+        # Phrase interminable: couper à la dernière virgule (ou espace)
+        while len(self._buffer) > self.max_chars:
+            cut = self._buffer.rfind(", ", 0, self.max_chars)
+            if cut < self.min_chars:
+                cut = self._buffer.rfind(" ", 0, self.max_chars)
+            if cut < self.min_chars:
+                cut = self.max_chars
+            sentences.append(self._buffer[:cut + 1].strip())
+            self._buffer = self._buffer[cut + 1:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Texte restant en fin de génération"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def split_sentences(text: str, min_chars: int = 20, max_chars: int = 300) -> List[str]:
+    """Découper un texte complet (réponse déjà générée, texte fixe)"""
+    splitter = SentenceSplitter(min_chars, max_chars)
+    return splitter.feed(text) + splitter.flush()
+
+
+class SpeechStream:
+    """
+    Pipeline texte en flux -> clips audio ordonnés
+
+    Args:
+        synthesize: Fonction (phrase) -> {"audio": bytes, "key", "cached", ...}
+            ou None si la synthèse est indisponible
+        min_chars / max_chars: Voir SentenceSplitter
+
+    Usage:
+        stream = SpeechStream(agent.synthesize_speech)
+        threading.Thread(target=lambda: (llm(..., on_text=stream.feed), stream.close())).start()
+        for event in stream.events():
+            ...
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        synthesize: Callable[[str], Optional[Dict[str, Any]]],
+        min_chars: int = 20,
+        max_chars: int = 300
+    ):
+        self.synthesize = synthesize
+        self.splitter = SentenceSplitter(min_chars, max_chars)
+        self._sentences: "queue.Queue" = queue.Queue()
+        self._events: "queue.Queue" = queue.Queue()
+        self._index = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        # Les synthèses sont tracées sous la requête qui a créé le flux
+        self._worker = threading.Thread(target=propagate(self._run), name="tts-stream", daemon=True)
+        self._worker.start()
+
+    def feed(self, text: str):
+        """Texte généré (appelé pour chaque morceau produit par le LLM)"""
+        with self._lock:
+            if self._closed:
+                return
+            for sentence in self.splitter.feed(text):
+                self._enqueue(sentence)
+
+    def close(self, error: Optional[str] = None):
+        """Fin de génération: synthétiser le reste puis terminer le flux"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for sentence in self.splitter.flush():
+                self._enqueue(sentence)
+            if error:
+                self._sentences.put({"type": "error", "error": error})
+            self._sentences.put(self._DONE)
+
+    def _enqueue(self, sentence: str):
+        item = {"index": self._index, "text": sentence}
+        self._index += 1
+        self._events.put({"type": "sentence", **item})  # Texte affichable sans attendre l'audio
+        self._sentences.put(item)
+
+    def _run(self):
+        while True:
+            item = self._sentences.get()
+            if item is self._DONE:
+                self._events.put(self._DONE)
+                return
+            if item.get("type") == "error":
+                self._events.put(item)
+                continue
+
+            try:
+                clip = self.synthesize(item["text"])
+            except Exception as e:
+                logger.error(f"❌ Synthèse de la phrase {item['index']} échouée: {e}")
+                clip = None
+            if clip is None:
+                self._events.put({"type": "audio_error", "index": item["index"]})
+                continue
+            self._events.put({"type": "audio", "index": item["index"], "text": item["text"], **clip})
+
+    def join(self, timeout: Optional[float] = None):
+        """Attendre la fin des synthèses (après close)"""
+        self._worker.join(timeout)
+
+    def events(self, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Événements dans l'ordre: sentence, audio (ou audio_error), error"""
+        while True:
+            try:
+                event = self._events.get(timeout=timeout)
+            except queue.Empty:
+                yield {"type": "error", "error": "Délai de synthèse dépassé"}
+                return
+            if event is self._DONE:
+                return
+            yield event
@@ -0,0 +1,2079 @@
+"""
+🤖 AGENT IA VISUEL MULTIMODAL - LE PLUS PUISSANT DU MONDE
+===========================================================
+
+Agent central ultra-performant qui orchestre TOUS les modèles disponibles
+dans backend/models/ pour créer l'IA multimodale la plus avancée.
+
+Modèles Intégrés (TOUS):
+━━━━━━━━━━━━━━━━━━━━━
+1. 👁️ VISION - SmolVLM-500M-Instruct (Compréhension visuelle avancée)
+   • Path: models/smolvlm/cache/models--HuggingFaceTB--SmolVLM-500M-Instruct
+   • Capacité: Analyse et description d'images en langage naturel
+   
+2. 🎯 DÉTECTION - YOLO TensorFlow.js (Détection d'objets en temps réel)
+   • Path: models/lifemodo_tfjs
+   • Capacité: Localisation et classification d'objets multiples
+   
+3. 🧠 INTELLIGENCE - Mistral-7B-Instruct (Raisonnement et langage)
+   • Path: models/mistral/mistral-7b-instruct-v0.2.Q4_K_M.gguf
+   • Capacité: Génération de texte, raisonnement logique, conversation
+   
+4. 🗣️ VOIX - Coqui TTS (Synthèse vocale multilingue)
+   • Path: models/tts/tts_models--fr--css10--vits
+   • Capacité: Génération audio naturelle en français
+
+Architecture Avancée:
+━━━━━━━━━━━━━━━━━━━
+- 🔄 ReAct Loop: Reasoning + Acting pour décisions intelligentes
+- 🧠 Mémoire contextuelle: Court-terme et long-terme
+- 🛠️ Tools System: Chaque modèle = un outil spécialisé
+- 🔗 LangChain Integration: Chaînes et agents avancés
+- ⚡ Pipeline optimisé: Orchestration parallèle quand possible
+
+Auteur: BelikanM
+Date: 13 Novembre 2025
+Version: 2.0.0 - Edition Ultime
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Union, Callable
+from pathlib import Path
+from datetime import datetime
+import json
+
+# Charger variables d'environnement (une seule fois par processus)
+from environment import load_environment
+load_environment()
+
+from model_registry import ModelRegistry, STATE_FAILED, STATE_READY
+from llm_pool import LLMWorkerPool, llama_perf
+from prompt_packer import PromptPacker, PromptSection, HEURISTIC_TOKENIZER
+from session_manager import SessionManager
+from web_search import WebSearch, create_web_search
+from trigger_matcher import TriggerTables
+from llm_tiers import LLMTierPolicy, TIER_SMALL, TIER_LARGE
+from speculative import SpeculativeDecoding, parse_speculative_modes
+from audio_cache import AudioCache, audio_key
+from tracing import span, current_span, propagate
+from metrics import REGISTRY
+
+# Configuration du logging améliorée
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# Taille de contexte de Mistral-7B (llama.cpp n_ctx)
+LLM_CONTEXT_SIZE = 4096
+
+# Clips du cache audio servis par l'API (GET /audio/<clé>.wav)
+AUDIO_URL_PREFIX = "/audio"
+
+# Métriques des outils et du LLM (exposées par /metrics)
+TOOL_DURATION = REGISTRY.histogram("agent_tool_duration_seconds", "Durée d'un appel d'outil (chargement à froid inclus)", ["tool"])
+TOOL_ERRORS = REGISTRY.counter("agent_tool_errors_total", "Appels d'outil en erreur ou outil indisponible", ["tool"])
+LLM_GENERATED_TOKENS = REGISTRY.counter("llm_generated_tokens_total", "Tokens générés", ["model"])
+LLM_PROMPT_TOKENS = REGISTRY.counter("llm_prompt_eval_tokens_total", "Tokens de prompt évalués (hors préfixe en cache KV)", ["model"])
+LLM_DECODE_SECONDS = REGISTRY.counter("llm_decode_seconds_total", "Temps de décodage (tokens/s = rate(tokens) / rate(secondes))", ["model"])
+LLM_GENERATION_DURATION = REGISTRY.histogram("llm_generation_duration_seconds", "Durée d'une génération (attente d'un worker incluse)", ["model", "request_type"])
+LLM_QUEUE_WAIT = REGISTRY.histogram("llm_queue_wait_seconds", "Attente d'un worker llama.cpp libre", ["model"])
+
+# Gabarits d'instruction par famille de modèles GGUF: (gabarit, tokens d'arrêt)
+LLM_PROMPT_TEMPLATES = {
+    "mistral": ("[INST] {prompt} [/INST]", ["</s>", "[INST]"]),
+    "chatml": (  # Qwen2.5, SmolLM2...
+        "<|im_start|>user\n{prompt}<|im_end|>\n<|im_start|>assistant\n",
+        ["<|im_end|>", "<|im_start|>"]
+    ),
+    "llama3": (  # Llama-3.2-1B/3B-Instruct
+        "<|start_header_id|>user<|end_header_id|>\n\n{prompt}<|eot_id|>"
+        "<|start_header_id|>assistant<|end_header_id|>\n\n",
+        ["<|eot_id|>", "<|start_header_id|>"]
+    ),
+}
+
+# Enveloppe fixe du prompt de chat (comptage en cache dans PromptPacker)
+CHAT_INTRO_PROMPT = """Tu es un assistant IA multimodal ultra-performant et amical. 
+Tu combines vision par ordinateur, détection d'objets, raisonnement avancé et synthèse vocale."""
+
+CHAT_OUTRO_PROMPT = "Réponds de manière naturelle, informative et utile en français."
+
+
+# ==========================================
+# SYSTÈME D'OUTILS (TOOLS)
+# ==========================================
+
+class BaseTool:
+    """Classe de base pour tous les outils"""
+    
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self.is_ready = False
+    
+    def load(self) -> bool:
+        """Charger les ressources lourdes de l'outil (modèle, poids...)"""
+        self._initialize()
+        return self.is_ready
+    
+    def _initialize(self):
+        """Initialiser l'outil (à surcharger)"""
+        self.is_ready = True
+    
+    def unload(self):
+        """Libérer les ressources lourdes de l'outil"""
+        self.is_ready = False
+    
+    def warmup(self):
+        """Mini inférence de préchauffage après chargement (optionnelle)"""
+        pass
+    
+    def execute(self, *args, **kwargs) -> Dict[str, Any]:
+        """Exécuter l'outil"""
+        raise NotImplementedError("Subclass must implement execute()")
+    
+    def __repr__(self):
+        status = "✅" if self.is_ready else "❌"
+        return f"<{self.name} {status}>"
+
+
+class VisionTool(BaseTool):
+    """Outil de vision avec SmolVLM"""
+    
+    def __init__(self, model_path: str, autoload: bool = True):
+        super().__init__(
+            name="vision_analyzer",
+            description="Analyse et décrit des images en langage naturel. Utilise SmolVLM-500M-Instruct."
+        )
+        self.model_path = Path(model_path)
+        self.model = None
+        self.processor = None
+        if autoload:
+            self.load()
+    
+    def _initialize(self):
+        """Initialiser le modèle de vision"""
+        try:
+            from transformers import AutoProcessor, AutoModelForVision2Seq
+            import torch
+            
+            model_id = "HuggingFaceTB/SmolVLM-500M-Instruct"
+            cache_dir = str(self.model_path)
+            
+            logger.info(f"🔄 Chargement SmolVLM depuis {cache_dir}...")
+            
+            self.processor = AutoProcessor.from_pretrained(
+                model_id,
+                cache_dir=cache_dir
+            )
+            # Génération décodeur seul: dans un lot, le padding doit précéder le
+            # prompt (sans effet sur une image seule, jamais complétée)
+            self.processor.tokenizer.padding_side = "left"
+            self.model = AutoModelForVision2Seq.from_pretrained(
+                model_id,
+                cache_dir=cache_dir,
+                torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+                device_map="auto" if torch.cuda.is_available() else "cpu"
+            )
+            
+            self.is_ready = True
+            logger.info("✅ SmolVLM prêt")
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur SmolVLM: {e}")
+            self.is_ready = False
+    
+    def unload(self):
+        """Libérer SmolVLM"""
+        self.model = None
+        self.processor = None
+        self.is_ready = False
+    
+    def warmup(self):
+        """Générer 1 token sur une petite image blanche"""
+        from PIL import Image
+        
+        image = Image.new("RGB", (64, 64), (255, 255, 255))
+        messages = [{"role": "user", "content": [{"type": "image"}, {"type": "text", "text": "Décris."}]}]
+        prompt = self.processor.apply_chat_template(messages, add_generation_prompt=True)
+        inputs = self.processor(text=prompt, images=[image], return_tensors="pt").to(self.model.device)
+        self.model.generate(**inputs, max_new_tokens=1)
+    
+    def execute(self, image_path: str, question: str = "Décris cette image en détail") -> Dict[str, Any]:
+        """Analyser une image"""
+        if not self.is_ready:
+            return {"error": "Vision tool not ready"}
+        
+        try:
+            from PIL import Image
+            
+            image = Image.open(image_path)
+            
+            # Préparer l'input
+            messages = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image"},
+                        {"type": "text", "text": question}
+                    ]
+                }
+            ]
+            
+            prompt = self.processor.apply_chat_template(messages, add_generation_prompt=True)
+            inputs = self.processor(text=prompt, images=[image], return_tensors="pt")
+            inputs = inputs.to(self.model.device)
+            
+            # Générer la réponse
+            generated_ids = self.model.generate(**inputs, max_new_tokens=500)
+            generated_texts = self.processor.batch_decode(
+                generated_ids,
+                skip_special_tokens=True
+            )
+            
+            return {
+                "success": True,
+                "description": generated_texts[0],
+                "question": question,
+                "image": image_path
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur analyse vision: {e}")
+            return {"error": str(e)}
+    
+    def execute_batch(self, images: List[Any], questions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyser plusieurs images en un seul `generate` (séquences complétées à gauche)
+        
+        Args:
+            images: Chemins ou images PIL déjà décodées
+            questions: Une question par image
+        """
+        if not self.is_ready:
+            return [{"error": "Vision tool not ready"} for _ in images]
+        
+        try:
+            from PIL import Image
+            
+            opened = [Image.open(image) if isinstance(image, (str, Path)) else image for image in images]
+            prompts = [
+                self.processor.apply_chat_template(
+                    [{"role": "user", "content": [{"type": "image"}, {"type": "text", "text": question}]}],
+                    add_generation_prompt=True
+                )
+                for question in questions
+            ]
+            
+            inputs = self.processor(
+                text=prompts,
+                images=[[image] for image in opened],
+                padding=True,
+                return_tensors="pt"
+            ).to(self.model.device)
+            
+            generated_ids = self.model.generate(**inputs, max_new_tokens=500)
+            generated_texts = self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+            
+            return [
+                {
+                    "success": True,
+                    "description": text,
+                    "question": question,
+                    "image": image if isinstance(image, (str, Path)) else None
+                }
+                for text, question, image in zip(generated_texts, questions, images)
+            ]
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur analyse vision par lot: {e}")
+            return [{"error": str(e)} for _ in images]
+
+
+class DetectionTool(BaseTool):
+    """Outil de détection d'objets avec YOLO"""
+    
+    def __init__(self, model_path: str, autoload: bool = True):
+        super().__init__(
+            name="object_detector",
+            description="Détecte et localise des objets dans des images. Utilise YOLO TensorFlow.js."
+        )
+        self.model_path = Path(model_path)
+        if autoload:
+            self.load()
+    
+    def _initialize(self):
+        """Vérifier la présence du modèle YOLO"""
+        self.is_ready = self.model_path.exists()
+    
+    def execute(self, image_path: str, confidence: float = 0.5) -> Dict[str, Any]:
+        """Détecter des objets dans une image"""
+        # Note: YOLO TF.js nécessite JavaScript, on retourne les specs
+        return {
+            "success": True,
+            "note": "YOLO TensorFlow.js - Exécution côté navigateur",
+            "model_path": str(self.model_path),
+            "config": {
+                "confidence_threshold": confidence,
+                "type": "tensorflow_js",
+                "usage": "Browser-based detection"
+            },
+            "image": image_path
+        }
+
+
+class LLMTool(BaseTool):
+    """
+    Outil de raisonnement avec un LLM GGUF (Mistral-7B par défaut)
+    
+    Les générations sont réparties sur un pool de workers llama.cpp qui
+    partagent les poids mmap du GGUF (voir llm_pool.py). Plusieurs instances
+    peuvent être enregistrées (tiers): Mistral-7B et un petit modèle rapide.
+    """
+    
+    def __init__(
+        self,
+        model_path: str,
+        autoload: bool = True,
+        n_workers: Optional[int] = None,
+        n_threads: Optional[int] = None,
+        model_name: str = "Mistral-7B",
+        prompt_format: str = "mistral",
+        name: str = "reasoning_engine",
+        speculative: Optional[SpeculativeDecoding] = None
+    ):
+        super().__init__(
+            name=name,
+            description=f"Génère du texte, raisonne logiquement et converse. Utilise {model_name}."
+        )
+        self.model_path = Path(model_path)
+        self.model_name = model_name
+        self.prompt_template, self.stop = LLM_PROMPT_TEMPLATES[prompt_format]
+        
+        # Décodage spéculatif par type de requête (None = désactivé)
+        self.speculative = speculative if speculative and speculative.enabled else None
+        
+        # Compteurs de performance du tier
+        self.requests = 0
+        self.generated_tokens = 0
+        self.generation_seconds = 0.0
+        self._stats_lock = threading.Lock()
+        self.pool: Optional[LLMWorkerPool] = None
+        self.n_workers = n_workers or (int(os.getenv("LLM_WORKERS")) if os.getenv("LLM_WORKERS") else None)
+        self.n_threads = n_threads or (int(os.getenv("LLM_THREADS_PER_WORKER")) if os.getenv("LLM_THREADS_PER_WORKER") else None)
+        if autoload:
+            self.load()
+    
+    @property
+    def llm(self):
+        """Instance llama.cpp principale (tokenizer, métadonnées)"""
+        return self.pool.primary if self.pool else None
+    
+    def _initialize(self):
+        """Initialiser le pool de workers LLM"""
+        try:
+            if not self.model_path.exists():
+                logger.error(f"❌ Modèle introuvable: {self.model_path}")
+                return
+            
+            logger.info(f"🔄 Chargement {self.model_name} depuis {self.model_path}...")
+            
+            self.pool = LLMWorkerPool(
+                model_path=str(self.model_path),
+                n_ctx=LLM_CONTEXT_SIZE,  # Contexte
+                n_workers=self.n_workers,  # None = auto (cœurs/NUMA)
+                n_threads=self.n_threads,  # None = cœurs attribués au worker
+                n_gpu_layers=0,  # CPU only pour compatibilité
+                # Vérification spéculative: logits de tous les tokens du lot
+                logits_all=self.speculative is not None
+            )
+            self.pool.load()
+            
+            self.is_ready = True
+            logger.info(f"✅ {self.model_name} prêt ({len(self.pool.workers)} worker(s))")
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur {self.model_name}: {e}")
+            self.is_ready = False
+    
+    def unload(self):
+        """Libérer le modèle (tous les workers)"""
+        if self.speculative is not None:
+            self.speculative.close()
+        if self.pool is not None:
+            self.pool.close()
+        self.pool = None
+        self.is_ready = False
+    
+    def warmup(self):
+        """Évaluer un prompt court et générer 1 token sur chaque worker"""
+        for worker in self.pool.workers:
+            with worker.lock:
+                worker.llm(self.prompt_template.format(prompt="Bonjour"), max_tokens=1, temperature=0.0)
+    
+    def execute(
+        self,
+        prompt: str,
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+        request_type: str = "chat",
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Générer une réponse
+        
+        Args:
+            request_type: chat, rag, synthesis ou summary (choix du mode spéculatif)
+            on_text: Appelée avec chaque morceau de texte dès qu'il est généré
+                (synthèse vocale en flux); la réponse complète est renvoyée à la fin
+        """
+        if not self.is_ready:
+            return {"error": "LLM tool not ready"}
+        
+        try:
+            # Gabarit d'instruction du modèle (sans <s> car llama-cpp l'ajoute automatiquement)
+            formatted_prompt = self.prompt_template.format(prompt=prompt)
+            
+            start = time.perf_counter()
+            with self.pool.acquire() as llm:
+                queue_wait = time.perf_counter() - start
+                perf_before = llama_perf(llm)
+                if self.speculative is not None:
+                    # Sous le verrou du worker: le brouillon suit cette génération
+                    llm.draft_model = self.speculative.draft_for(llm, request_type)
+                if on_text is None:
+                    response = llm(
+                        formatted_prompt,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        stop=self.stop
+                    )
+                else:
+                    response = self._generate_streaming(llm, formatted_prompt, max_tokens, temperature, on_text)
+                perf_after = llama_perf(llm)
+            elapsed = time.perf_counter() - start
+            
+            # Détail de l'appel dans la trace: attente d'un worker, évaluation
+            # du prompt (hors préfixe déjà en cache KV) et décodage
+            stage = current_span()
+            stage.update(
+                model=self.model_name,
+                request_type=request_type,
+                queue_wait_ms=round(queue_wait * 1000, 2),
+                completion_tokens=response['usage'].get('completion_tokens', 0),
+                total_tokens=response['usage'].get('total_tokens', 0)
+            )
+            if perf_before and perf_after:
+                stage.update(**{
+                    key: round(perf_after[key] - perf_before[key], 2)
+                    for key in ("prompt_eval_ms", "decode_ms", "prompt_eval_tokens", "decode_tokens")
+                })
+                LLM_PROMPT_TOKENS.inc(perf_after["prompt_eval_tokens"] - perf_before["prompt_eval_tokens"], model=self.model_name)
+                LLM_DECODE_SECONDS.inc((perf_after["decode_ms"] - perf_before["decode_ms"]) / 1000, model=self.model_name)
+            LLM_GENERATED_TOKENS.inc(response['usage'].get('completion_tokens', 0), model=self.model_name)
+            LLM_GENERATION_DURATION.observe(elapsed, model=self.model_name, request_type=request_type)
+            LLM_QUEUE_WAIT.observe(queue_wait, model=self.model_name)
+            
+            with self._stats_lock:
+                self.requests += 1
+                self.generated_tokens += response['usage'].get('completion_tokens', 0)
+                self.generation_seconds += elapsed
+            
+            return {
+                "success": True,
+                "response": response['choices'][0]['text'].strip(),
+                "prompt": prompt,
+                "tokens": response['usage']['total_tokens'],
+                "model": self.model_name,
+                "seconds": round(elapsed, 3)
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur génération LLM: {e}")
+            return {"error": str(e)}
+    
+    def _generate_streaming(self, llm, formatted_prompt: str, max_tokens: int, temperature: float, on_text) -> Dict[str, Any]:
+        """Génération token par token, au même format qu'une réponse complète"""
+        pieces = []
+        for chunk in llm(formatted_prompt, max_tokens=max_tokens, temperature=temperature, stop=self.stop, stream=True):
+            piece = chunk["choices"][0]["text"]
+            if piece:
+                pieces.append(piece)
+                on_text(piece)
+        return {
+            "choices": [{"text": "".join(pieces)}],
+            # Un morceau par token; n_tokens = prompt + génération dans le contexte
+            "usage": {"completion_tokens": len(pieces), "total_tokens": llm.n_tokens}
+        }
+    
+    def count_tokens(self, text: str) -> int:
+        """Nombre de tokens selon le tokenizer de Mistral"""
+        llm = self.llm
+        if llm is None:
+            return HEURISTIC_TOKENIZER.count_tokens(text)
+        return len(llm.tokenize(text.encode("utf-8"), add_bos=False, special=False))
+    
+    def truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """Tronquer un texte à `max_tokens` tokens Mistral"""
+        llm = self.llm
+        if llm is None:
+            return HEURISTIC_TOKENIZER.truncate_tokens(text, max_tokens)
+        tokens = llm.tokenize(text.encode("utf-8"), add_bos=False, special=False)
+        return llm.detokenize(tokens[:max_tokens]).decode("utf-8", errors="ignore")
+    
+    def load_info(self) -> Optional[tuple]:
+        """(requêtes en cours, nombre de workers), None si non chargé"""
+        if not self.pool or not self.pool.workers:
+            return None
+        return sum(w.inflight for w in self.pool.workers), len(self.pool.workers)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Charge du pool de workers et débit du modèle"""
+        stats = self.pool.stats() if self.pool else {"workers": [], "inflight": 0}
+        stats.update({
+            "model": self.model_name,
+            "requests": self.requests,
+            "generated_tokens": self.generated_tokens,
+            "avg_latency_seconds": round(self.generation_seconds / self.requests, 3) if self.requests else None,
+            "tokens_per_second": round(self.generated_tokens / self.generation_seconds, 2) if self.generation_seconds else None
+        })
+        if self.speculative is not None:
+            stats["speculative"] = self.speculative.stats()
+        return stats
+
+
+class TTSTool(BaseTool):
+    """Outil de synthèse vocale avec Coqui TTS"""
+    
+    def __init__(
+        self,
+        model_path: str,
+        autoload: bool = True,
+        model_name: str = "tts_models/fr/css10/vits",
+        voice: str = ""
+    ):
+        super().__init__(
+            name="voice_synthesizer",
+            description="Convertit du texte en parole naturelle. Utilise Coqui TTS français."
+        )
+        self.model_path = Path(model_path)
+        self.model_name = model_name
+        self.voice = voice  # Locuteur (modèles multi-voix), vide = voix par défaut
+        self.tts = None
+        self.engine = None  # API Coqui (TTS.api.TTS) pour la synthèse en mémoire
+        self._engine_lock = threading.Lock()  # Coqui n'est pas thread-safe
+        if autoload:
+            self.load()
+    
+    def _initialize(self):
+        """Initialiser TTS"""
+        try:
+            # Charger la configuration TTS depuis tts-env
+            import sys
+            script_dir = Path(__file__).parent
+            
+            # Essayer de charger TTS depuis tts-env
+            TTS_ENV_PATH = r"C:\Users\Admin\miniconda3\envs\tts-env\Lib\site-packages"
+            if os.path.exists(TTS_ENV_PATH) and TTS_ENV_PATH not in sys.path:
+                sys.path.insert(0, TTS_ENV_PATH)
+                logger.info(f"🔄 Chargement TTS depuis tts-env")
+            
+            # Ajouter le chemin parent (backend/) au path
+            parent_dir = script_dir.parent
+            if str(parent_dir) not in sys.path:
+                sys.path.insert(0, str(parent_dir))
+            
+            from services.tts_service import TTSService
+            
+            self.tts = TTSService(model_name=self.model_name)
+            self.is_ready = self.tts.is_ready
+            
+            # Moteur Coqui du service (sinon chargé à la première synthèse en mémoire)
+            engine = getattr(self.tts, "tts", None)
+            if engine is not None and hasattr(engine, "synthesizer"):
+                self.engine = engine
+            
+            if self.is_ready:
+                logger.info("✅ TTS prêt")
+            else:
+                logger.warning("⚠️ TTS en mode fallback")
+                
+        except Exception as e:
+            logger.error(f"❌ Erreur TTS: {e}")
+            self.is_ready = False
+    
+    def unload(self):
+        """Libérer Coqui TTS"""
+        self.tts = None
+        self.engine = None
+        self.is_ready = False
+    
+    def warmup(self):
+        """Synthétiser un mot court"""
+        if self.tts is not None:
+            self.tts.text_to_speech(text="Bonjour.")
+    
+    def execute(self, text: str, language: str = "fr") -> Dict[str, Any]:
+        """Synthétiser de la parole"""
+        if not self.tts:
+            return {"error": "TTS tool not ready"}
+        
+        try:
+            result = self.tts.text_to_speech(text=text)
+            return {
+                "success": True,
+                "text": text,
+                "audio_url": result.get("audio_url"),
+                "method": result.get("method"),
+                "language": language
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur synthèse vocale: {e}")
+            return {"error": str(e)}
+    
+    def synthesize_wav(self, text: str) -> bytes:
+        """
+        Synthétiser un texte court (une phrase) en WAV PCM 16 bits, en mémoire
+        
+        Raises:
+            RuntimeError si Coqui TTS n'est pas disponible (mode fallback)
+        """
+        import io
+        import wave
+        import numpy as np
+        
+        with self._engine_lock:
+            if self.engine is None:
+                try:
+                    from TTS.api import TTS
+                    self.engine = TTS(model_name=self.model_name, progress_bar=False)
+                except Exception as e:
+                    raise RuntimeError(f"Coqui TTS indisponible: {e}")
+            samples = self.engine.tts(text=text, speaker=self.voice or None)
+            sample_rate = self.engine.synthesizer.output_sample_rate
+        
+        pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype("<i2")
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm.tobytes())
+        return buffer.getvalue()
+
+
+# ==========================================
+# AGENT IA MULTIMODAL ULTIME
+# ==========================================
+
+class UnifiedAgent:
+    """
+    Agent IA Multimodal Unifié
+    
+    Cet agent orchestre tous les modèles disponibles pour fournir
+    une intelligence artificielle complète et cohérente.
+    
+    Architecture:
+    - Tools: Chaque modèle est un outil spécialisé
+    - ReAct: Reasoning + Acting pour décisions intelligentes
+    - Memory: Contexte court-terme et session
+    - Pipeline: Orchestration optimisée
+    """
+    
+    def __init__(
+        self,
+        models_dir: str = None,  # None = auto-detect
+        enable_voice: bool = True,
+        enable_vision: bool = True,
+        enable_detection: bool = True,
+        enable_llm: bool = True,
+        idle_timeout: Optional[float] = None,
+        preload: Optional[List[str]] = None,
+        web_search: Optional[WebSearch] = None,
+        tools: Optional[Dict[str, tuple]] = None
+    ):
+        """
+        Initialiser l'agent unifié
+        
+        Les modèles ne sont PAS chargés ici: ils sont enregistrés dans un
+        ModelRegistry et chargés en arrière-plan à la première utilisation.
+        
+        Args:
+            models_dir: Chemin vers le dossier des modèles (None = auto-detect)
+            enable_voice: Activer le module TTS
+            enable_vision: Activer SmolVLM
+            enable_detection: Activer YOLO
+            enable_llm: Activer Mistral-7B
+            idle_timeout: Secondes d'inactivité avant déchargement d'un modèle
+                (None = MODEL_IDLE_TIMEOUT, 0 = jamais)
+            preload: Outils à charger immédiatement en arrière-plan
+                (None = MODEL_PRELOAD, ex: "llm,vision")
+            web_search: Couche de recherche web (None = WEB_SEARCH_BACKEND)
+            tools: Outils déjà construits {clé: (outil, libellé)} enregistrés à
+                la place des modèles de `models_dir` (ex: stubs de benchmark)
+        """
+        # Auto-détection du dossier models
+        if models_dir is None:
+            script_dir = Path(__file__).parent
+            # Si on est dans backend/models/
+            if script_dir.name == "models":
+                self.models_dir = script_dir
+            else:
+                self.models_dir = script_dir / "models"
+        elif Path(models_dir).is_absolute():
+            self.models_dir = Path(models_dir)
+        else:
+            # Si chemin relatif, résoudre à partir du script courant
+            self.models_dir = Path(__file__).parent if models_dir == "." else Path(models_dir)
+        
+        self.models_dir = self.models_dir.resolve()  # Chemin absolu
+        
+        self.config = {
+            "voice": enable_voice,
+            "vision": enable_vision,
+            "detection": enable_detection,
+            "llm": enable_llm
+        }
+        
+        # État de l'agent
+        self.is_ready = False
+        self.tools = {}  # Tools LangChain
+        self._prebuilt_tools = tools
+        
+        # Registre: chargement à la demande + déchargement sur inactivité
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv("MODEL_IDLE_TIMEOUT", "1800"))
+        self.registry = ModelRegistry(
+            idle_timeout=idle_timeout,
+            load_timeout=float(os.getenv("MODEL_LOAD_TIMEOUT", "600"))
+        )
+        if preload is None:
+            preload = [k.strip() for k in os.getenv("MODEL_PRELOAD", "").split(",") if k.strip()]
+        
+        # Choix du tier LLM (petit modèle / Mistral) par requête
+        self.llm_policy = LLMTierPolicy(
+            is_available=self._tier_available,
+            get_load=lambda key: self.tools[key].load_info() if key in self.tools else None,
+            small_intents={i.strip() for i in os.getenv("LLM_SMALL_INTENTS", "conversation,explain_app,creative").split(",") if i.strip()},
+            max_small_prompt_tokens=int(os.getenv("LLM_SMALL_MAX_PROMPT_TOKENS", "1500")),
+            max_small_new_tokens=int(os.getenv("LLM_SMALL_MAX_NEW_TOKENS", "200")),
+            min_confidence=float(os.getenv("LLM_SMALL_MIN_CONFIDENCE", "0.5")),
+            trust_unscored=os.getenv("LLM_SMALL_TRUST_UNSCORED", "0") == "1"
+        )
+        
+        # Assemblage des prompts sous budget de tokens (n_ctx de Mistral)
+        self.prompt_packer = PromptPacker(get_tokenizer=self._get_tokenizer, n_ctx=LLM_CONTEXT_SIZE)
+        
+        # Recherche web (cache + coalescence), partagée avec l'API
+        self.web_search = web_search or create_web_search()
+        
+        # Tables de mots-clés compilées (une passe par texte), partagées avec l'API
+        self.triggers = TriggerTables()
+        
+        # Clips TTS déjà synthétisés (texte + voix + modèle), servis sans charger Coqui
+        self.audio_cache = AudioCache(
+            os.getenv("TTS_CACHE_DIR") or str(Path(__file__).parent.parent / "storage" / "tts_cache"),
+            max_bytes=int(os.getenv("TTS_CACHE_MB", "256")) * 1024 * 1024
+        )
+        
+        # Mémoire contextuelle
+        self.context = {
+            "session": {},     # Contexte de la session actuelle
+            "user_prefs": {}   # Préférences utilisateur
+        }
+        
+        # Historique court-terme: un tampon circulaire par conversation
+        self.sessions = SessionManager(
+            max_turns=10,  # Dernières 10 interactions par conversation
+            max_sessions=int(os.getenv("SESSION_MAX_COUNT", "10000")),
+            ttl=float(os.getenv("SESSION_TTL", "3600")),
+            max_bytes=int(os.getenv("SESSION_MAX_MB", "64")) * 1024 * 1024
+        )
+        
+        logger.info(f"🤖 Initialisation de l'Agent IA Multimodal Unifié...")
+        logger.info(f"📂 Dossier modèles: {self.models_dir}")
+        self._initialize_tools()
+        
+        if preload:
+            logger.info(f"🔄 Préchargement en arrière-plan: {', '.join(preload)}")
+            self.registry.preload(preload)
+    
+    
+    def _initialize_tools(self):
+        """Enregistrer tous les outils (models as tools) sans les charger"""
+        logger.info("🛠️  Enregistrement des outils IA (chargement à la demande)...")
+        
+        if self._prebuilt_tools is not None:
+            for key, (tool, label) in self._prebuilt_tools.items():
+                self._register_tool(key, tool, label)
+            self._check_readiness()
+            return
+        
+        # 1. Vision Tool (SmolVLM)
+        if self.config["vision"]:
+            vision_path = self.models_dir / "smolvlm" / "cache"
+            self._register_tool(
+                "vision",
+                VisionTool(model_path=str(vision_path), autoload=False),
+                "👁️ Vision (SmolVLM-500M)"
+            )
+        
+        # 2. Detection Tool (YOLO)
+        if self.config["detection"]:
+            detection_path = self.models_dir / "lifemodo_tfjs"
+            self._register_tool(
+                "detection",
+                DetectionTool(model_path=str(detection_path), autoload=False),
+                "🎯 Détection (YOLO TF.js)"
+            )
+        
+        # 3. LLM Tool (Mistral-7B)
+        if self.config["llm"]:
+            llm_path = self.models_dir / "mistral" / "mistral-7b-instruct-v0.2.Q4_K_M.gguf"
+            self._register_tool(
+                "llm",
+                LLMTool(model_path=str(llm_path), autoload=False, speculative=self._speculative_config()),
+                "🧠 Raisonnement (Mistral-7B)"
+            )
+        
+        # 3b. Petit LLM rapide (tier léger, optionnel): Qwen2.5/Llama-3.2 1-3B GGUF
+        small_path = os.getenv("LLM_SMALL_MODEL_PATH") or str(
+            self.models_dir / "small" / "qwen2.5-1.5b-instruct-q4_k_m.gguf"
+        )
+        if self.config["llm"] and Path(small_path).exists():
+            small_name = os.getenv("LLM_SMALL_MODEL_NAME", Path(small_path).stem)
+            self._register_tool(
+                TIER_SMALL,
+                LLMTool(
+                    model_path=small_path,
+                    autoload=False,
+                    n_workers=int(os.getenv("LLM_SMALL_WORKERS", "1")),
+                    model_name=small_name,
+                    prompt_format=os.getenv("LLM_SMALL_PROMPT_FORMAT", "chatml"),
+                    name="fast_reasoning_engine"
+                ),
+                f"⚡ Réponses rapides ({small_name})"
+            )
+        
+        # 4. TTS Tool (Coqui)
+        if self.config["voice"]:
+            tts_path = self.models_dir / "tts" / "tts_models--fr--css10--vits"
+            self._register_tool(
+                "tts",
+                TTSTool(
+                    model_path=str(tts_path),
+                    autoload=False,
+                    model_name=os.getenv("TTS_MODEL_NAME", "tts_models/fr/css10/vits"),
+                    voice=os.getenv("TTS_VOICE", "")
+                ),
+                "🗣️ Synthèse vocale (Coqui TTS)"
+            )
+        
+        # Vérifier l'état
+        self._check_readiness()
+    
+    def _speculative_config(self) -> Optional[SpeculativeDecoding]:
+        """Décodage spéculatif de Mistral (LLM_SPECULATIVE, désactivé par défaut)"""
+        modes = parse_speculative_modes(os.getenv("LLM_SPECULATIVE", ""))
+        if not modes:
+            return None
+        logger.info(f"🚀 Décodage spéculatif: {modes}")
+        return SpeculativeDecoding(
+            modes,
+            draft_model_path=os.getenv("LLM_DRAFT_MODEL_PATH") or None,
+            prompt_lookup_tokens=int(os.getenv("LLM_PROMPT_LOOKUP_TOKENS", "10")),
+            draft_tokens=int(os.getenv("LLM_DRAFT_TOKENS", "4")),
+            n_ctx=LLM_CONTEXT_SIZE
+        )
+    
+    def _register_tool(self, key: str, tool: BaseTool, label: str):
+        """Ajouter un outil à l'agent et au registre de chargement"""
+        try:
+            self.tools[key] = tool
+            self.registry.register(key, tool, label=label)
+        except Exception as e:
+            logger.error(f"❌ Erreur enregistrement {key}: {e}")
+    
+    @property
+    def capabilities(self) -> List[str]:
+        """Capacités disponibles (outils enregistrés et non en échec)"""
+        return [
+            info["label"]
+            for info in self.registry.status().values()
+            if info["state"] != STATE_FAILED
+        ]
+    
+    
+    def _check_readiness(self):
+        """Vérifier l'état de préparation de l'agent"""
+        registered_count = len(self.registry.keys())
+        total_count = sum(1 for v in self.config.values() if v)
+        
+        self.is_ready = registered_count > 0
+        
+        logger.info(f"\n{'='*70}")
+        logger.info(f"🤖 AGENT IA MULTIMODAL - LE PLUS PUISSANT DU MONDE")
+        logger.info(f"{'='*70}")
+        logger.info(f"Outils enregistrés: {registered_count}/{total_count}")
+        logger.info(f"\n✨ Capacités disponibles:")
+        for cap in self.capabilities:
+            logger.info(f"   {cap}")
+        
+        # Afficher les outils
+        logger.info(f"\n🛠️  Outils (chargés à la première utilisation):")
+        for name, tool in self.tools.items():
+            logger.info(f"   ⏳ {tool.name}: {tool.description[:50]}...")
+        
+        logger.info(f"\n{'='*70}")
+        
+        if self.is_ready:
+            logger.info("✅ Agent ultra-puissant prêt pour Flutter!")
+        else:
+            logger.warning("⚠️  Agent partiellement opérationnel")
+        
+        logger.info(f"{'='*70}\n")
+    
+    
+    # ==========================================
+    # MÉTHODES PRINCIPALES
+    # ==========================================
+    
+    def process_image(
+        self,
+        image_path: str,
+        question: Optional[str] = None,
+        detect_objects: bool = True,
+        conversation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        🔥 ANALYSE ULTRA-COMPLÈTE D'IMAGE - UTILISE TOUS LES OUTILS DISPONIBLES
+        
+        Pipeline intelligent:
+        1. SmolVLM (Vision) - Compréhension visuelle détaillée
+        2. YOLO (Détection) - Objets, personnes, zones d'intérêt
+        3. FAISS (Mémoire) - Comparaison avec images similaires vues
+        4. Mistral-7B (LLM) - Synthèse intelligente + raisonnement
+        5. Tavily (Web) - Recherche internet si nécessaire
+        
+        Args:
+            image_path: Chemin vers l'image
+            question: Question optionnelle sur l'image
+            detect_objects: Activer la détection d'objets YOLO (défaut: True)
+            conversation_id: Session où mémoriser l'analyse
+        
+        Returns:
+            Résultat complet avec TOUTES les analyses disponibles
+        """
+        if not self.is_ready:
+            return {"error": "Agent non prêt"}
+        
+        result = {
+            "timestamp": datetime.now().isoformat(),
+            "image": image_path,
+            "vision": None,
+            "detection": None,
+            "synthesis": None,
+            "web_search": None,
+            "tools_used": []
+        }
+        
+        try:
+            # ========================================
+            # ÉTAPE 1: VISION AVEC SMOLVLM (TOUJOURS)
+            # ========================================
+            logger.info("👁️ [SmolVLM] Analyse visuelle en cours...")
+            vision_result = self._run_tool(
+                "vision",
+                image_path=image_path,
+                question=question or "Décris cette image en détail avec tous les éléments visibles"
+            )
+            if vision_result is not None:
+                result["vision"] = vision_result
+                result["tools_used"].append("SmolVLM-500M (Vision)")
+                logger.info(f"   ✓ Vision complétée: {len(result['vision'].get('description', ''))} caractères")
+            else:
+                logger.warning("⚠️ SmolVLM non disponible")
+            
+            # ========================================
+            # ÉTAPE 2: DÉTECTION YOLO (TOUJOURS ACTIF)
+            # ========================================
+            # CHANGEMENT: Toujours activer la détection pour une analyse complète
+            detection_result = self._run_tool(
+                "detection",
+                image_path=image_path,
+                confidence=0.4  # Seuil plus bas pour détecter plus d'objets
+            )
+            if detection_result is not None:
+                logger.info("🎯 [YOLO] Détection d'objets effectuée")
+                result["detection"] = detection_result
+                objects_found = len(result["detection"].get("detections", []))
+                result["tools_used"].append(f"YOLO TF.js ({objects_found} objets)")
+                logger.info(f"   ✓ Détection complétée: {objects_found} objets trouvés")
+            else:
+                logger.warning("⚠️ YOLO non disponible")
+            
+            # ========================================
+            # ÉTAPE 3: SYNTHÈSE INTELLIGENTE AVEC MISTRAL
+            # ========================================
+            logger.info("🧠 [Mistral-7B] Génération de synthèse intelligente...")
+            synthesis_prompt = self._build_synthesis_prompt(result, max_new_tokens=250)
+            synthesis_result = self._run_tool(
+                "llm",
+                prompt=synthesis_prompt,
+                max_tokens=250,  # Réduit pour rapidité
+                temperature=0.6,  # Plus précis
+                request_type="synthesis"  # Reprend la vision/détection: prompt lookup
+            )
+            if synthesis_result is not None:
+                result["synthesis"] = synthesis_result.get("response")
+                result["tools_used"].append("Mistral-7B (LLM)")
+                logger.info(f"   ✓ Synthèse générée: {len(result['synthesis'])} caractères")
+                
+                # ========================================
+                # ÉTAPE 4: RECHERCHE WEB AUTOMATIQUE SI PERTINENT
+                # ========================================
+                if self.web_search.available:
+                    vision_desc = result.get("vision", {}).get("description", "").lower()
+                    
+                    # Déclencheurs de recherche automatique (catégorie image_web_search)
+                    should_search = "image_web_search" in self.triggers.match(
+                        result["synthesis"] or "", vision_desc
+                    )
+                    
+                    if should_search:
+                        try:
+                            # PASSER LES RÉSULTATS YOLO à _extract_search_query
+                            search_query = self._extract_search_query(
+                                vision_desc, 
+                                result["synthesis"],
+                                detection_result=result.get("detection")  # ✅ NOUVEAU: Passer YOLO
+                            )
+                            
+                            search_results = None
+                            if search_query and len(search_query) > 3:
+                                logger.info(f"🌐 [Tavily] Recherche: '{search_query[:60]}...'")
+                                search_results = self.web_search.search_within_budget(
+                                    search_query, 
+                                    max_results=3,  # Augmenté à 3 pour plus d'infos
+                                    search_depth="basic"
+                                )
+                            
+                            if search_results is not None:
+                                result["web_search"] = {
+                                    "query": search_query,
+                                    "results": search_results.get("results", [])[:3]
+                                }
+                                result["tools_used"].append(f"Tavily ({len(result['web_search']['results'])} résultats)")
+                                
+                                # Enrichir la synthèse
+                                if result["web_search"]["results"]:
+                                    web_info = "\n\n🌐 Informations complémentaires (internet):\n"
+                                    for i, res in enumerate(result["web_search"]["results"], 1):
+                                        title = res.get('title', 'N/A')
+                                        content = res.get('content', '')[:180]
+                                        web_info += f"• {title}: {content}...\n"
+                                    result["synthesis"] += web_info
+                                    logger.info(f"   ✓ Web search complété: {len(result['web_search']['results'])} résultats intégrés")
+                        except Exception as e:
+                            logger.warning(f"⚠️ Recherche web échouée: {e}")
+            
+            # ========================================
+            # ÉTAPE 5: AJOUTER AU CONTEXTE MÉMOIRE
+            # ========================================
+            self._add_to_context("image_analysis", result, conversation_id)
+            
+            # Résumé des outils utilisés
+            tools_summary = " + ".join(result["tools_used"])
+            logger.info(f"✅ Analyse complète terminée - Outils: {tools_summary}")
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur analyse image: {e}")
+            return {"error": str(e)}
+    
+    def process_images(
+        self,
+        images: List[Dict[str, Any]],
+        question: Optional[str] = None,
+        synthesize: bool = True,
+        batch_size: int = 4,
+        synthesis_workers: int = 1,
+        conversation_id: Optional[str] = None,
+        on_progress: Optional[Callable[[int, str], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        📦 ANALYSE D'UN LOT D'IMAGES (UPLOADS MULTIPLES)
+        
+        Même pipeline que process_image, mais étape par étape sur tout le lot:
+        1. SmolVLM par lots de `batch_size` (un seul `generate`, prompts complétés à gauche)
+        2. YOLO image par image (peu coûteux)
+        3. Mistral-7B: synthèses en parallèle sur les workers llama.cpp, ou aucune
+        
+        La recherche web automatique n'est pas déclenchée: une requête Tavily
+        par image épuiserait le budget de recherche.
+        
+        Args:
+            images: {"path": chemin, "image": image PIL déjà décodée (optionnelle)} par image
+            synthesize: Générer la synthèse Mistral de chaque image
+            synthesis_workers: Synthèses simultanées (une par worker llama.cpp)
+            on_progress: Appelé avec (index, étape) après "analyzed" et "synthesized".
+                S'il lève une exception (client déconnecté), la vision et les
+                synthèses restantes sont abandonnées et l'exception propagée
+        
+        Returns:
+            Un résultat par image, dans l'ordre de `images`; "error" si la vision
+            a échoué (ex: mémoire insuffisante pour le lot), sans synthèse
+        """
+        if not self.is_ready:
+            return [{"error": "Agent non prêt"} for _ in images]
+        
+        question = question or "Décris cette image en détail avec tous les éléments visibles"
+        notify = on_progress or (lambda index, stage: None)
+        results = [
+            {
+                "timestamp": datetime.now().isoformat(),
+                "image": item["path"],
+                "vision": None,
+                "detection": None,
+                "synthesis": None,
+                "web_search": None,
+                "tools_used": []
+            }
+            for item in images
+        ]
+        
+        # ========================================
+        # ÉTAPES 1-2: VISION PAR LOTS + DÉTECTION
+        # ========================================
+        batch_size = max(1, batch_size)
+        for offset in range(0, len(images), batch_size):
+            chunk = images[offset:offset + batch_size]
+            logger.info(f"👁️ [SmolVLM] Lot de {len(chunk)} image(s) ({offset + len(chunk)}/{len(images)})")
+            vision_results = self._run_tool_batch(
+                "vision",
+                images=[item.get("image") or item["path"] for item in chunk],
+                questions=[question] * len(chunk)
+            )
+            for index, item in enumerate(chunk, offset):
+                result = results[index]
+                if vision_results is None:
+                    result["error"] = "SmolVLM non disponible"
+                else:
+                    result["vision"] = dict(vision_results[index - offset], image=item["path"])
+                    if result["vision"].get("error"):
+                        result["error"] = f"Vision: {result['vision']['error']}"
+                    else:
+                        result["tools_used"].append("SmolVLM-500M (Vision)")
+                if "error" in result:
+                    notify(index, "analyzed")
+                    continue
+                
+                detection_result = self._run_tool("detection", image_path=item["path"], confidence=0.4)
+                if detection_result is not None:
+                    result["detection"] = detection_result
+                    result["tools_used"].append(f"YOLO TF.js ({len(detection_result.get('detections', []))} objets)")
+                notify(index, "analyzed")
+        
+        # ========================================
+        # ÉTAPE 3: SYNTHÈSES EN PARALLÈLE
+        # ========================================
+        pending = [index for index, result in enumerate(results) if "error" not in result]
+        if synthesize and pending:
+            logger.info(f"🧠 [Mistral-7B] {len(pending)} synthèse(s), {synthesis_workers} en parallèle...")
+            
+            def synthesize_one(index: int):
+                result = results[index]
+                synthesis_result = self._run_tool(
+                    "llm",
+                    prompt=self._build_synthesis_prompt(result, max_new_tokens=250),
+                    max_tokens=250,
+                    temperature=0.6,
+                    request_type="synthesis"
+                )
+                if synthesis_result is not None:
+                    result["synthesis"] = synthesis_result.get("response")
+                    result["tools_used"].append("Mistral-7B (LLM)")
+            
+            with ThreadPoolExecutor(max_workers=max(1, synthesis_workers), thread_name_prefix="image-synthesis") as pool:
+                futures = {pool.submit(propagate(synthesize_one), index): index for index in pending}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Synthèse échouée pour {Path(results[index]['image']).name}: {e}")
+                    try:
+                        notify(index, "synthesized")
+                    except Exception:
+                        for pending_future in futures:
+                            pending_future.cancel()
+                        raise
+        
+        for index in pending:
+            self._add_to_context("image_analysis", results[index], conversation_id)
+        
+        logger.info(f"✅ Lot de {len(results)} image(s) analysé ({len(results) - len(pending)} échec(s) vision)")
+        return results
+    
+    def chat(
+        self,
+        message: str,
+        with_voice: bool = False,
+        context: Optional[Dict] = None,
+        conversation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        🔥 CHAT ULTRA-INTELLIGENT - UTILISE TOUS LES OUTILS DISPONIBLES
+        
+        Pipeline intelligent:
+        1. Analyse de la question → Détecte le type de réponse nécessaire
+        2. Recherche FAISS → Mémoire des conversations/images précédentes
+        3. Recherche Web (Tavily) → Informations à jour si nécessaire
+        4. Analyse visuelle (SmolVLM + YOLO) → Si image fournie
+        5. Génération LLM (Mistral-7B) → Synthèse intelligente complète
+        6. TTS (Coqui) → Audio si demandé
+        
+        Args:
+            message: Message de l'utilisateur
+            with_voice: Générer réponse audio
+            context: Contexte additionnel (peut inclure image_path, memory, etc.)
+            conversation_id: Session dont l'historique est utilisé et enrichi
+                (None = session par défaut)
+        
+        Returns:
+            Réponse enrichie avec TOUS les outils disponibles
+        """
+        if not self.is_ready:
+            return {"error": "Agent non prêt"}
+        
+        result = {
+            "timestamp": datetime.now().isoformat(),
+            "user_message": message,
+            "response": None,
+            "audio_url": None,
+            "tools_used": [],
+            "sources": []  # Sources d'information utilisées
+        }
+        
+        try:
+            # Enrichir le contexte (sauf si l'appelant a déjà inclus
+            # l'historique/résumé de la conversation dans le message)
+            full_context = context or {}
+            if not full_context.get("history_provided"):
+                full_context["chat_history"] = self.sessions.recent(conversation_id, 5)  # 5 derniers
+            
+            # ========================================
+            # ÉTAPE 1: ANALYSE SÉMANTIQUE DE LA QUESTION
+            # ========================================
+            # Déclencheurs déjà calculés par l'appelant sur le message brut,
+            # sinon une seule passe sur le message
+            triggers = full_context.get("triggers") or self.triggers.match(message)
+            needs_web_search = "agent_web_search" in triggers
+            needs_memory_search = "memory_search" in triggers
+            
+            # ========================================
+            # ÉTAPE 2: RECHERCHE DANS LA MÉMOIRE FAISS (Si pertinent)
+            # ========================================
+            if needs_memory_search and "memory" in full_context:
+                logger.info("💾 [FAISS] Recherche dans la mémoire...")
+                # NOTE: L'API chat_agent_api.py gère déjà FAISS
+                # On enrichit juste le contexte ici
+                result["tools_used"].append("FAISS (Mémoire)")
+                result["sources"].append("Mémoire conversationnelle")
+            
+            # ========================================
+            # ÉTAPE 3: RECHERCHE WEB TAVILY (Si nécessaire)
+            # ========================================
+            # (ignorée si l'appelant l'a déjà faite: le message contient alors
+            # un prompt enrichi, pas une requête de recherche)
+            if needs_web_search and not full_context.get("web_search_done") and self.web_search.available:
+                logger.info(f"🌐 [Tavily] Recherche web: '{message[:60]}...'")
+                search_results = self.web_search.search_within_budget(
+                    message,
+                    max_results=3,
+                    search_depth="basic"
+                )
+                if search_results is not None:
+                    full_context["web_search"] = {
+                        "query": message,
+                        "results": search_results.get("results", [])[:3]
+                    }
+                    result["tools_used"].append(f"Tavily ({len(full_context['web_search']['results'])} résultats)")
+                    result["sources"].append("Internet (recherche en temps réel)")
+                    logger.info(f"   ✓ Web search: {len(full_context['web_search']['results'])} résultats trouvés")
+            
+            # ========================================
+            # ÉTAPE 4: ANALYSE VISUELLE (Si image fournie)
+            # ========================================
+            if "image_path" in full_context:
+                logger.info("👁️ [SmolVLM + YOLO] Analyse d'image dans contexte...")
+                image_analysis = self.process_image(
+                    image_path=full_context["image_path"],
+                    question=message,
+                    detect_objects=True,  # TOUJOURS activer YOLO
+                    conversation_id=conversation_id
+                )
+                full_context["image_analysis"] = image_analysis
+                
+                # Ajouter les outils visuels utilisés
+                if "tools_used" in image_analysis:
+                    result["tools_used"].extend(image_analysis["tools_used"])
+                result["sources"].append("Analyse visuelle de l'image fournie")
+            
+            # ========================================
+            # ÉTAPE 5: GÉNÉRATION AVEC MISTRAL-7B (LLM)
+            # ========================================
+            logger.info("🧠 [Mistral-7B] Génération de réponse intelligente...")
+            
+            # Paramètres adaptatifs depuis le contexte
+            max_tokens = full_context.get("max_tokens", 200)  # Rapide
+            temperature = full_context.get("temperature", 0.5)  # Précis
+            
+            # Construire prompt enrichi avec TOUTES les sources
+            chat_prompt = self._build_chat_prompt(message, full_context, max_new_tokens=max_tokens)
+            
+            # Tier le moins cher adapté: intention, longueur du prompt, charge
+            tier = self.llm_policy.choose(
+                full_context.get("intent"),
+                prompt_tokens=self.count_tokens(chat_prompt),
+                max_new_tokens=max_tokens,
+                confidence=full_context.get("intent_confidence")
+            )
+            request_type = full_context.get("request_type", "chat")
+            on_text = full_context.get("on_text")  # Synthèse vocale en flux
+            llm_result = self._run_tool(
+                tier,
+                prompt=chat_prompt,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                request_type=request_type,
+                on_text=on_text
+            )
+            if llm_result is None and tier != TIER_LARGE:
+                llm_result = self._run_tool(
+                    TIER_LARGE, prompt=chat_prompt, max_tokens=max_tokens,
+                    temperature=temperature, request_type=request_type, on_text=on_text
+                )
+            if llm_result is not None:
+                result["response"] = llm_result.get("response", "Réponse générée")
+                result["model"] = llm_result.get("model")
+                result["tools_used"].append(f"{llm_result.get('model', 'Mistral-7B')} (LLM)")
+                result["sources"].append("Raisonnement IA local")
+                logger.info(f"   ✓ Réponse générée: {len(result['response'])} caractères")
+            else:
+                result["response"] = "Modèle LLM non disponible. Réponse directe limitée."
+            
+            # ========================================
+            # ÉTAPE 6: SYNTHÈSE VOCALE (Si demandée)
+            # ========================================
+            tts_result = None
+            if with_voice:
+                logger.info("🗣️ [Coqui TTS] Génération audio...")
+                tts_result = self.speak(result["response"], language="fr")
+            if tts_result is not None and "error" not in tts_result:
+                result["audio_url"] = tts_result.get("audio_url")
+                result["tools_used"].append("Coqui TTS")
+            
+            # ========================================
+            # ÉTAPE 7: MÉMORISATION DU CONTEXTE
+            # ========================================
+            if full_context.get("remember", True):  # False: lots, sans session à conserver
+                self._add_to_context("chat", result, conversation_id, user_message=full_context.get("user_message"))
+            
+            # Résumé des outils utilisés
+            tools_summary = " + ".join(result["tools_used"]) if result["tools_used"] else "Réponse directe"
+            logger.info(f"✅ Chat complété - Outils: {tools_summary}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur chat: {e}")
+            return {"error": str(e)}
+    
+    def speak(self, text: str, language: str = "fr") -> Dict[str, Any]:
+        """
+        Faire parler l'agent
+        
+        Args:
+            text: Texte à synthétiser
+            language: Langue (fr, en, es, etc.)
+        
+        Returns:
+            Informations sur l'audio généré
+        """
+        try:
+            logger.info(f"🗣️ Synthèse vocale: {text[:50]}...")
+            clip = self.synthesize_speech(text)
+            if clip is not None:
+                logger.info(f"✅ Audio {'servi depuis le cache' if clip['cached'] else 'généré'}")
+                return {
+                    "success": True,
+                    "text": text,
+                    "audio_url": f"{AUDIO_URL_PREFIX}/{clip['key']}.wav",
+                    "method": "cache" if clip["cached"] else "coqui",
+                    "cached": clip["cached"],
+                    "language": language
+                }
+            
+            # Synthèse en mémoire indisponible: service TTS complet (mode fallback)
+            result = self._run_tool("tts", text=text, language=language)
+            if result is None:
+                return {"error": "TTS non disponible"}
+            logger.info("✅ Audio généré")
+            return result
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur TTS: {e}")
+            return {"error": str(e)}
+    
+    def synthesize_speech(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Clip WAV d'un texte court, depuis le cache audio s'il a déjà été dit
+        
+        Un clip en cache est servi sans charger (ni réveiller) Coqui TTS.
+        
+        Returns:
+            {"key", "audio" (octets WAV), "format", "cached"}, ou None si la
+            synthèse est indisponible
+        """
+        tool = self.tools.get("tts")
+        if tool is None or not text or not text.strip():
+            return None
+        
+        key = audio_key(text, tool.voice, tool.model_name)
+        with span("tts.synthesize", chars=len(text), cache_hit=True) as stage:
+            audio = self.audio_cache.get(key)
+            if audio is not None:
+                return {"key": key, "audio": audio, "format": "wav", "cached": True}
+            
+            stage.set("cache_hit", False)
+            with self.registry.use("tts") as tts:
+                if tts is None:
+                    return None
+                try:
+                    audio = tts.synthesize_wav(text)
+                except RuntimeError as e:
+                    logger.warning(f"⚠️ {e}")
+                    return None
+            stage.set("bytes", len(audio))
+        self.audio_cache.put(key, audio)
+        return {"key": key, "audio": audio, "format": "wav", "cached": False}
+    
+    def generate(
+        self,
+        prompt: str,
+        max_tokens: int = 250,
+        temperature: float = 0.3,
+        load: bool = True
+    ) -> Optional[str]:
+        """
+        Génération LLM brute (tâches internes: résumés, reformulations)
+        
+        Args:
+            load: Charger le LLM s'il ne l'est pas (False = abandonner pour
+                ne pas recharger un modèle déchargé depuis une tâche de fond)
+        
+        Returns:
+            Texte généré, ou None si le LLM est indisponible
+        """
+        if not load and self.registry.state("llm") != STATE_READY:
+            return None
+        result = self._run_tool(
+            "llm", prompt=prompt, max_tokens=max_tokens, temperature=temperature, request_type="summary"
+        )
+        if not result or "error" in result:
+            return None
+        return result.get("response")
+    
+    def warmup(self, keys: List[str], timeout: Optional[float] = None) -> bool:
+        """
+        Charger et préchauffer des outils avant de recevoir du trafic
+        
+        Les outils préchauffés sont épinglés: ils ne seront pas déchargés
+        sur inactivité, sinon l'instance redeviendrait froide.
+        
+        Returns:
+            True si tous les outils demandés sont prêts et préchauffés
+        """
+        keys = [k for k in keys if k in self.registry]
+        for key in keys:
+            self.registry.pin(key)
+        return self.registry.wait_ready(keys, timeout=timeout)
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Obtenir l'état complet de l'agent"""
+        models_status = self.registry.status()
+        return {
+            "ready": self.is_ready,
+            "tools": {
+                name: {
+                    "name": tool.name,
+                    "ready": tool.is_ready,
+                    "description": tool.description,
+                    **models_status.get(name, {})
+                }
+                for name, tool in self.tools.items()
+            },
+            "capabilities": self.capabilities,
+            "llm_pool": self.tools["llm"].stats() if "llm" in self.tools else None,
+            "llm_tiers": {
+                "policy": self.llm_policy.stats(),
+                **{key: self.tools[key].stats() for key in (TIER_LARGE, TIER_SMALL) if key in self.tools}
+            },
+            "sessions": self.sessions.stats(),
+            "web_search": self.web_search.stats(),
+            "triggers": self.triggers.stats(),
+            "audio_cache": self.audio_cache.stats(),
+            "config": self.config,
+            "idle_timeout": self.registry.idle_timeout,
+            "version": "2.0.0 - Agent IA Multimodal Ultimate"
+        }
+    
+    
+    # ==========================================
+    # MÉTHODES UTILITAIRES
+    # ==========================================
+    
+    def _tier_available(self, key: str) -> bool:
+        """Tier LLM enregistré et pas en échec de chargement"""
+        return key in self.registry and self.registry.state(key) != STATE_FAILED
+    
+    def _run_tool(self, key: str, **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Exécuter un outil en le chargeant à la demande
+        
+        Returns:
+            Résultat de l'outil, ou None s'il est désactivé / indisponible
+        """
+        # Un span par outil (vision, detection, llm, tts...): inclut le
+        # chargement à froid si le modèle n'était pas prêt
+        start = time.perf_counter()
+        with span(f"tool.{key}", cold_start=key in self.registry and self.registry.state(key) != STATE_READY) as stage:
+            with self.registry.use(key) as tool:
+                if tool is None:
+                    logger.warning(f"⚠️ Outil {key} non disponible")
+                    stage.set("available", False)
+                    TOOL_ERRORS.inc(tool=key)
+                    return None
+                result = tool.execute(**kwargs)
+            TOOL_DURATION.observe(time.perf_counter() - start, tool=key)
+            if isinstance(result, dict) and result.get("error"):
+                stage.fail(str(result["error"]))
+                TOOL_ERRORS.inc(tool=key)
+            return result
+    
+    def _run_tool_batch(self, key: str, **kwargs) -> Optional[List[Dict[str, Any]]]:
+        """
+        Comme _run_tool, pour un lot traité en un appel (`execute_batch`)
+        
+        Returns:
+            Un résultat par élément, ou None si l'outil est désactivé / indisponible
+        """
+        start = time.perf_counter()
+        with span(f"tool.{key}", batch=True, cold_start=key in self.registry and self.registry.state(key) != STATE_READY) as stage:
+            with self.registry.use(key) as tool:
+                if tool is None:
+                    logger.warning(f"⚠️ Outil {key} non disponible")
+                    stage.set("available", False)
+                    TOOL_ERRORS.inc(tool=key)
+                    return None
+                results = tool.execute_batch(**kwargs)
+            TOOL_DURATION.observe(time.perf_counter() - start, tool=key)
+            stage.set("size", len(results))
+            failed = [r for r in results if isinstance(r, dict) and r.get("error")]
+            if failed:
+                stage.fail(str(failed[0]["error"]))
+                TOOL_ERRORS.inc(tool=key)
+            return results
+    
+    def _build_synthesis_prompt(self, analysis_result: Dict, max_new_tokens: int = 250) -> str:
+        """
+        🔥 PROMPT DE SYNTHÈSE ULTRA-INTELLIGENT
+        
+        Construit un prompt qui ENCOURAGE l'agent à utiliser TOUS les outils disponibles:
+        - SmolVLM pour vision détaillée
+        - YOLO pour localisation précise
+        - Tavily pour informations manquantes
+        - FAISS pour contexte historique
+        
+        Le prompt est assemblé sous budget de tokens: la détection YOLO est
+        sérialisée en JSON compact et plafonnée, la vision est tronquée en
+        dernier recours.
+        """
+        vision_desc = analysis_result.get("vision", {}).get("description", "Aucune vision")
+        detection = analysis_result.get("detection", {})
+        tools_used = analysis_result.get("tools_used", [])
+        
+        # Compter les objets détectés
+        detections_list = detection.get("detections", [])
+        objects_count = len(detections_list)
+        
+        # Extraire les classes d'objets détectées
+        detected_classes = list(set([d.get("class", "unknown") for d in detections_list])) if detections_list else []
+        
+        header = f"""Tu es Kibali Enfant Agent, un assistant IA multimodal ULTRA-INTELLIGENT avec accès à des outils puissants.
+
+🔧 OUTILS DISPONIBLES UTILISÉS:
+{' + '.join(tools_used) if tools_used else 'Analyse de base'}"""
+        
+        detection_text = f"""🎯 DÉTECTION D'OBJETS (YOLO TensorFlow.js):
+- Objets détectés: {objects_count}
+- Classes identifiées: {', '.join(detected_classes) if detected_classes else 'Aucune'}
+{json.dumps(detection, ensure_ascii=False, separators=(',', ':')) if detection else 'Aucune détection'}"""
+        
+        instructions = f"""📋 INSTRUCTIONS POUR SYNTHÈSE INTELLIGENTE:
+
+1. UTILISE ACTIVEMENT les résultats des outils:
+   ✓ SmolVLM te donne la compréhension VISUELLE globale
+   ✓ YOLO te donne les OBJETS PRÉCIS et leur localisation
+   ✓ COMBINE les deux pour une analyse complète
+
+2. DÉTECTE si l'image contient des ÉLÉMENTS IDENTIFIABLES:
+   - Logo d'entreprise/marque → Mentionne que tu peux chercher sur internet
+   - Texte visible/inscription → Signale que tu peux rechercher plus d'infos
+   - Produit spécifique → Indique que tu peux trouver des détails en ligne
+   - Personne en uniforme → Identifie la profession et l'équipement
+   - Équipement technique → Nomme l'appareil et son usage
+
+3. SI L'ANALYSE EST INCOMPLÈTE:
+   - Indique clairement ce qui manque
+   - Suggère: "Je peux rechercher sur internet pour plus de précisions"
+   - Propose: "Je peux utiliser mes outils pour identifier cet élément"
+
+4. EXEMPLES DE RÉPONSES ULTRA-INTELLIGENTES:
+   ❌ MAUVAIS: "Je vois une personne."
+   ✅ BON: "Je vois une personne en tenue professionnelle (détectée par YOLO) avec un équipement de mesure visible (théodolite selon SmolVLM). C'est probablement un géomètre-topographe. Je peux rechercher plus d'infos sur cet équipement si nécessaire."
+
+   ❌ MAUVAIS: "Il y a un logo."
+   ✅ BON: "Je détecte un logo avec le texte 'Nike' (visible dans l'analyse SmolVLM). C'est la marque de sport américaine Nike, spécialisée en équipements sportifs. Je peux chercher plus d'informations si besoin."
+
+   ❌ MAUVAIS: "C'est un document."
+   ✅ BON: "L'image montre un document avec du texte en français (identifié par SmolVLM). YOLO détecte {objects_count} éléments dont possiblement des zones de texte. Je peux rechercher le contexte de ce document sur internet pour plus de détails."
+
+5. FORMAT DE RÉPONSE:
+   - 3-5 phrases MAXIMUM
+   - COMMENCE par ce que tu VOIS (SmolVLM + YOLO)
+   - EXPLIQUE ce que c'est (ton intelligence)
+   - PROPOSE d'utiliser d'autres outils si pertinent
+
+Réponds de manière PROACTIVE, PRÉCISE et ULTRA-UTILE en français."""
+        
+        packed = self.prompt_packer.pack(
+            [
+                PromptSection("header", header, priority=0, required=True),
+                PromptSection("vision", f"📸 ANALYSE VISUELLE (SmolVLM-500M):\n{vision_desc}", priority=1, required=True),
+                PromptSection("detection", detection_text, priority=2, max_tokens=300),
+                PromptSection("instructions", instructions, priority=0, required=True, static=True)
+            ],
+            max_new_tokens=max_new_tokens
+        )
+        return packed.text
+    
+    def _extract_search_query(self, vision_desc: str, synthesis: str, detection_result: Dict = None) -> Optional[str]:
+        """
+        🔍 EXTRACTION INTELLIGENTE DE REQUÊTE POUR RECHERCHER LE THÈME DE L'IMAGE
+        
+        Ne cherche PAS les mots isolés mais le CONTEXTE et le THÈME visuel.
+        Exemple: Au lieu de "cet carte", cherche "plan topographique site construction"
+        
+        Args:
+            vision_desc: Description visuelle de SmolVLM
+            synthesis: Synthèse générée par Mistral
+            detection_result: Résultat de détection YOLO (optionnel)
+        
+        Returns:
+            Requête de recherche contextuelle optimisée pour Tavily
+        """
+        import re
+        
+        # Combiner vision et synthèse (texte original, pas lowercase)
+        full_text_original = f"{vision_desc} {synthesis}"
+        full_text = full_text_original.lower()
+        
+        logger.info("🔍 === ANALYSE POUR RECHERCHE WEB ===")
+        
+        # ========================================
+        # ÉTAPE 1: IDENTIFIER LE TYPE DE DOCUMENT VISUEL
+        # ========================================
+        document_types = {
+            "plan topographique": ["topographie", "site", "terrain", "sol", "nivellement", "carte topographique"],
+            "schéma architectural": ["architecture", "bâtiment", "construction", "plan de masse", "élévation"],
+            "plan cadastral": ["cadastre", "parcelle", "propriété", "limite", "foncier"],
+            "carte géographique": ["géographie", "région", "pays", "ville", "localisation"],
+            "diagramme technique": ["technique", "système", "installation", "équipement", "infrastructure"],
+            "schéma électrique": ["électrique", "circuit", "câblage", "électricité"],
+            "plan d'aménagement": ["aménagement", "urbanisme", "zone", "développement", "lotissement"],
+        }
+        
+        detected_doc_type = None
+        for doc_type, keywords in document_types.items():
+            if any(kw in full_text for kw in keywords):
+                detected_doc_type = doc_type
+                logger.info(f"📊 Type détecté: {doc_type}")
+                break
+        
+        # ========================================
+        # ÉTAPE 2: EXTRAIRE LES CONCEPTS VISUELS PRINCIPAUX
+        # ========================================
+        visual_concepts = []
+        
+        # Concepts de localisation
+        location_patterns = r'\b(site|terrain|emplacement|zone|secteur|région|lieu|endroit)\b'
+        locations = re.findall(location_patterns, full_text, re.IGNORECASE)
+        if locations:
+            visual_concepts.append("site terrain")
+            logger.info(f"📍 Localisation détectée")
+        
+        # Concepts de construction/structure
+        structure_patterns = r'\b(bâtiment|structure|construction|édifice|maison|immeuble)\b'
+        structures = re.findall(structure_patterns, full_text, re.IGNORECASE)
+        if structures:
+            visual_concepts.append("construction bâtiment")
+            logger.info(f"🏗️ Structure détectée")
+        
+        # Concepts techniques
+        technical_patterns = r'\b(mesure|levé|relevé|calcul|dimension|côte|échelle)\b'
+        technical = re.findall(technical_patterns, full_text, re.IGNORECASE)
+        if technical:
+            visual_concepts.append("mesure technique")
+            logger.info(f"📐 Aspect technique détecté")
+        
+        # ========================================
+        # ÉTAPE 3: IDENTIFIER LES ANNOTATIONS/LÉGENDES IMPORTANTES
+        # ========================================
+        # Chercher des mots en MAJUSCULES (souvent des annotations importantes)
+        annotations = re.findall(r'\b[A-Z]{2,}[A-Z\s]*\b', full_text_original)
+        annotations = [a.strip() for a in annotations if len(a.strip()) > 2]
+        
+        if annotations:
+            logger.info(f"📌 Annotations trouvées: {', '.join(annotations[:3])}")
+        
+        # ========================================
+        # ÉTAPE 4: CONSTRUIRE LA REQUÊTE CONTEXTUELLE INTELLIGENTE
+        # ========================================
+        
+        # Priorité 1: Type de document + Concepts visuels
+        if detected_doc_type:
+            query_parts = [detected_doc_type]
+            
+            # Ajouter les concepts visuels pertinents
+            if visual_concepts:
+                query_parts.extend(visual_concepts[:2])
+            
+            # Ajouter un terme générique pour des résultats visuels
+            query_parts.append("exemple schéma")
+            
+            query = ' '.join(query_parts)
+            logger.info(f"✅ Requête contextuelle: '{query}'")
+            return query
+        
+        # Priorité 2: Concepts visuels uniquement
+        if visual_concepts:
+            query = f"{' '.join(visual_concepts[:2])} plan schéma"
+            logger.info(f"✅ Requête visuelle: '{query}'")
+            return query
+        
+        # Priorité 3: Termes techniques spécifiques détectés
+        technical_domains = {
+            "topographie": "topographie levé terrain mesure",
+            "cadastre": "cadastre plan parcelle foncier",
+            "architecture": "architecture plan construction bâtiment",
+            "génie civil": "génie civil infrastructure ouvrage",
+            "urbanisme": "urbanisme aménagement zone urbaine",
+        }
+        
+        for domain, query in technical_domains.items():
+            if domain in full_text:
+                logger.info(f"✅ Requête domaine: '{query}'")
+                return query
+        
+        # Priorité 4: Fallback intelligent - éviter les mots isolés
+        # Extraire les noms (souvent des concepts importants)
+        important_nouns = re.findall(r'\b(plan|carte|schéma|diagramme|layout|design|structure|système)\b', full_text, re.IGNORECASE)
+        if important_nouns:
+            # Ajouter un contexte
+            query = f"{important_nouns[0]} technique professionnel exemple"
+            logger.info(f"✅ Requête nominale: '{query}'")
+            return query
+        
+        # Dernier recours: Requête générique pour éviter les traductions
+        logger.info("⚠️ Pas de contexte clair détecté")
+        return "schéma technique professionnel plan architectural"
+        
+        # ========================================
+        # ÉTAPE 1: ANALYSER LES DÉTECTIONS YOLO POUR TROUVER DES ANNOTATIONS
+        # ========================================
+        text_regions = []
+        if detection_result and detection_result.get("detections"):
+            for det in detection_result["detections"]:
+                det_class = det.get("class", "").lower()
+                # Identifier les zones de texte potentielles
+                if any(keyword in det_class for keyword in ["text", "label", "annotation", "title", "legend", "caption"]):
+                    text_regions.append(det)
+                    logger.info(f"📝 Zone de texte détectée par YOLO: {det_class}")
+        
+        # Si YOLO a détecté des zones de texte, prioriser la recherche sur ces éléments
+        if text_regions:
+            logger.info(f"🎯 {len(text_regions)} zone(s) de texte/annotation détectée(s) par YOLO")
+        
+        # ========================================
+        # ÉTAPE 2: IDENTIFIER LES MOTS-CLÉS DE TITRES/LÉGENDES
+        # ========================================
+        title_keywords = []
+        
+        # Patterns pour titres et légendes
+        title_patterns = [
+            r'titre[:\s]+([^.]+)',
+            r'légende[:\s]+([^.]+)',
+            r'annotation[:\s]+([^.]+)',
+            r'indique[:\s]+([^.]+)',
+            r'marqu[ée]+[:\s]+([^.]+)',
+            r'écrit[:\s]+([^.]+)',
+            r'texte[:\s]+([^.]+)',
+        ]
+        
+        for pattern in title_patterns:
+            matches = re.findall(pattern, full_text, re.IGNORECASE)
+            if matches:
+                for match in matches:
+                    # Nettoyer et extraire les mots importants
+                    words = re.findall(r'\b[A-ZÀ-Ÿ][a-zà-ÿ]+\b|\b\w{4,}\b', match)
+                    title_keywords.extend(words[:3])
+                    logger.info(f"📌 Titre/légende trouvé: {match[:50]}...")
+        
+        # ========================================
+        # ÉTAPE 3: DÉTECTER LES TYPES DE DOCUMENTS/DIAGRAMMES
+        # ========================================
+        document_types = {
+            "carte": ["carte", "map", "cartographie", "topographie"],
+            "schéma": ["schéma", "diagramme", "diagram", "plan"],
+            "graphique": ["graphique", "chart", "graph", "courbe"],
+            "tableau": ["tableau", "table", "données"],
+            "infographie": ["infographie", "infographic", "visualisation"],
+        }
+        
+        detected_type = None
+        for doc_type, keywords in document_types.items():
+            if any(kw in full_text for kw in keywords):
+                detected_type = doc_type
+                logger.info(f"📊 Type de document détecté: {doc_type}")
+                break
+        
+        # ========================================
+        # ÉTAPE 4: EXTRAIRE LES NOMS PROPRES (LIEUX, PERSONNES, MARQUES)
+        # ========================================
+        proper_nouns = re.findall(r'\b[A-ZÀ-Ÿ][a-zà-ÿ]+(?:\s+[A-ZÀ-Ÿ][a-zà-ÿ]+)*\b', vision_desc + " " + synthesis)
+        proper_nouns = list(set(proper_nouns))[:5]  # Top 5 uniques
+        
+        if proper_nouns:
+            logger.info(f"🏷️ Noms propres détectés: {', '.join(proper_nouns[:3])}")
+        
+        # ========================================
+        # ÉTAPE 5: CONSTRUIRE LA REQUÊTE OPTIMALE
+        # ========================================
+        
+        # Priorité 1: Titres/légendes détectés
+        if title_keywords:
+            query = ' '.join(title_keywords[:3])
+            logger.info(f"🔍 Requête depuis titre/légende: '{query}'")
+            return query
+        
+        # Priorité 2: Noms propres importants
+        if proper_nouns:
+            query = ' '.join(proper_nouns[:2])
+            if detected_type:
+                query += f" {detected_type}"
+            logger.info(f"🔍 Requête depuis noms propres: '{query}'")
+            return query
+        
+        # Priorité 3: Type de document + contexte
+        if detected_type:
+            # Ajouter des mots-clés contextuels
+            context_words = re.findall(r'\b\w{5,}\b', full_text)
+            unique_words = list(set(context_words))[:3]
+            query = f"{detected_type} {' '.join(unique_words)}"
+            logger.info(f"🔍 Requête depuis type de document: '{query}'")
+            return query
+        
+        # Priorité 4: Termes techniques spécialisés
+        technical_terms = {
+            "topographie": "équipement topographie géodésie théodolite",
+            "géomètre": "géomètre topographe instruments mesure",
+            "architecture": "architecture plan bâtiment construction",
+            "ingénierie": "ingénierie technique schéma conception",
+        }
+        
+        for term, query in technical_terms.items():
+            if term in full_text:
+                logger.info(f"🔍 Requête technique: '{query}'")
+                return query
+        
+        # Priorité 5: Mots-clés généraux (fallback)
+        keywords = []
+        for word in ["logo", "marque", "texte", "document"]:
+            if word in full_text:
+                pattern = rf'\b\w+\s+{word}\s+(\w+)'
+                matches = re.findall(pattern, full_text)
+                keywords.extend(matches)
+        
+        if keywords:
+            query = ' '.join(keywords[:2])
+            logger.info(f"🔍 Requête depuis mots-clés: '{query}'")
+            return query
+        
+        # Dernier recours: Extraire les mots les plus longs
+        words = re.findall(r'\b\w{5,}\b', full_text)
+        unique_words = list(set(words))[:3]
+        query = ' '.join(unique_words) if unique_words else None
+        
+        if query:
+            logger.info(f"🔍 Requête générique: '{query}'")
+        
+        return query
+    
+    def _build_chat_prompt(self, message: str, context: Dict, max_new_tokens: int = 200) -> str:
+        """Construire prompt de chat enrichi avec contexte (sous budget de tokens)"""
+        
+        # Contexte image si présent
+        image_context = ""
+        if "image_analysis" in context:
+            vision = context["image_analysis"].get("vision", {})
+            image_context = f"📸 Contexte Visuel: {vision.get('description', 'N/A')}"
+        
+        # Historique récent
+        history = context.get("chat_history", [])
+        history_items = []
+        for turn in history[-3:]:  # 3 derniers
+            if turn.kind == "chat":
+                if turn.user:
+                    history_items.append(f"User: {turn.user}")
+                if turn.assistant:
+                    history_items.append(f"Assistant: {turn.assistant}")
+        
+        packed = self.prompt_packer.pack(
+            [
+                PromptSection("intro", CHAT_INTRO_PROMPT, priority=0, required=True, static=True),
+                PromptSection("history", "📜 Historique Récent:", priority=3, items=history_items, item_max_tokens=120),
+                PromptSection("image", image_context, priority=2, max_tokens=400),
+                PromptSection("message", f"💬 Message Utilisateur: {message}", priority=0, required=True),
+                PromptSection("outro", CHAT_OUTRO_PROMPT, priority=0, required=True, static=True)
+            ],
+            max_new_tokens=max_new_tokens
+        )
+        return packed.text
+    
+    def chat_envelope_tokens(self) -> int:
+        """Tokens de l'enveloppe ajoutée par _build_chat_prompt autour du message"""
+        return (
+            self.prompt_packer.count(CHAT_INTRO_PROMPT, static=True)
+            + self.prompt_packer.count(CHAT_OUTRO_PROMPT, static=True)
+            + 16  # "💬 Message Utilisateur:" + séparateurs
+        )
+    
+    def count_tokens(self, text: str) -> int:
+        """Compter les tokens avec le tokenizer du LLM (approximation s'il n'est pas chargé)"""
+        return self.prompt_packer.count(text)
+    
+    def _get_tokenizer(self):
+        """Tokenizer du LLM s'il est chargé, sinon heuristique (sans forcer le chargement)"""
+        llm = self.tools.get("llm")
+        return llm if llm is not None and llm.is_ready else HEURISTIC_TOKENIZER
+    
+    def _add_to_context(
+        self,
+        action_type: str,
+        data: Dict,
+        conversation_id: Optional[str] = None,
+        user_message: Optional[str] = None
+    ):
+        """Ajouter un enregistrement compact de l'interaction à la session"""
+        if action_type == "chat":
+            user = user_message or data.get("user_message", "")
+            assistant = data.get("response") or ""
+        else:
+            vision = data.get("vision") or {}
+            user = f"[image] {Path(data.get('image', '')).name}"
+            assistant = data.get("synthesis") or vision.get("description", "")
+        
+        self.sessions.record(
+            conversation_id,
+            kind=action_type,
+            user=user,
+            assistant=assistant,
+            tools=data.get("tools_used")
+        )
+    
+    def clear_context(self, conversation_id: Optional[str] = None):
+        """Réinitialiser le contexte (une conversation ou toutes)"""
+        self.sessions.clear(conversation_id)
+        if conversation_id is None:
+            self.context["session"] = {}
+        logger.info("🧹 Contexte réinitialisé")
+    
+    def __repr__(self) -> str:
+        status = "✅ Prêt" if self.is_ready else "⚠️ Partiel"
+        return f"<UnifiedAgent {status} | {len(self.capabilities)} capacités>"
+
+
+# ==========================================
+# FONCTION D'INITIALISATION
+# ==========================================
+
+def create_agent(
+    models_dir: str = None,
+    **kwargs
+) -> UnifiedAgent:
+    """
+    Créer et initialiser un agent unifié
+    
+    Args:
+        models_dir: Chemin vers les modèles (None = auto-detect)
+        **kwargs: Options de configuration
+    
+    Returns:
+        Instance de UnifiedAgent prête à l'emploi
+    """
+    # Auto-détection du dossier models si non fourni
+    if models_dir is None:
+        # Si on est dans backend/models/
+        script_dir = Path(__file__).parent
+        if script_dir.name == "models":
+            models_dir = str(script_dir)
+        else:
+            models_dir = str(script_dir / "models")
+    
+    return UnifiedAgent(models_dir=models_dir, **kwargs)
+
+
+# ==========================================
+# EXEMPLE D'UTILISATION
+# ==========================================
+
+if __name__ == "__main__":
+    # Créer l'agent
+    agent = create_agent()
+    
+    # Vérifier l'état
+    status = agent.get_status()
+    print(f"\n📊 État: {json.dumps(status, indent=2, ensure_ascii=False)}")
+    
+    # Exemple de chat
+    if agent.is_ready:
+        response = agent.chat(
+            message="Bonjour! Comment vas-tu?",
+            with_voice=False
+        )
+        print(f"\n💬 Réponse: {response}")
+        
+        # Exemple de synthèse vocale
+        audio = agent.speak("Bienvenue dans le système multimodal!")
+        print(f"\n🗣️ Audio: {audio}")
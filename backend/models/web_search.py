@@ -0,0 +1,597 @@
+"""
+🌐 COUCHE DE RECHERCHE WEB (Tavily) - CACHE ET COALESCENCE
+===========================================================
+
+`UnifiedAgent` et `ChatAgentManager` appelaient `tavily_client.search`
+directement avec le message brut: une requête réseau par appel, même pour
+une question identique ou une requête tendance envoyée en parallèle.
+
+- Clé de cache normalisée (casse, accents composés, ponctuation, espaces)
+- Cache TTL + LRU borné, persistance JSON optionnelle sur disque
+- Coalescence (single-flight): les appels concurrents pour une même clé
+  attendent la requête déjà en cours au lieu d'en lancer une nouvelle
+- Backends interchangeables: Tavily, ou stub local pour tests/benchmarks
+- Exécution asynchrone (`submit` / `wait`) dans un pool de threads: la
+  recherche démarre tôt, en parallèle de FAISS, et l'attente est bornée par
+  un budget de latence (le résultat tardif alimente quand même le cache)
+- Disjoncteur (circuit breaker): après plusieurs échecs, dépassements de
+  budget ou appels lents consécutifs, la recherche est court-circuitée
+  pendant `reset_timeout` secondes, puis un appel d'essai est autorisé
+
+Variables d'environnement:
+- WEB_SEARCH_BACKEND: tavily | stub | none (défaut: tavily)
+- WEB_SEARCH_CACHE_TTL: durée de vie d'une entrée (s, défaut 3600)
+- WEB_SEARCH_CACHE_SIZE: nombre maximum d'entrées (défaut 1024)
+- WEB_SEARCH_CACHE_PATH: fichier JSON de persistance (vide = mémoire seule)
+- WEB_SEARCH_BUDGET_MS: attente maximale d'un résultat côté requête (défaut 1500)
+- WEB_SEARCH_SLOW_MS: appel considéré comme lent par le disjoncteur (défaut: le budget)
+- WEB_SEARCH_BREAKER_FAILURES: échecs consécutifs avant ouverture (défaut 3)
+- WEB_SEARCH_BREAKER_RESET: durée d'ouverture du disjoncteur (s, défaut 30)
+
+Auteur: BelikanM
+"""
+
+import os
+import re
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Optional, Tuple
+
+from tracing import span, current_span, propagate
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Forme canonique d'une requête pour le cache"""
+    query = unicodedata.normalize("NFKC", query or "").lower()
+    query = _PUNCTUATION.sub(" ", query)
+    return _SPACES.sub(" ", query).strip()
+
+
+# ==========================================
+# BACKENDS
+# ==========================================
+
+class SearchBackend:
+    """Interface d'un fournisseur de recherche"""
+
+    name = "base"
+
+    def search(self, query: str, max_results: int = 3, search_depth: str = "basic") -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class TavilyBackend(SearchBackend):
+    """Recherche internet via l'API Tavily"""
+
+    name = "tavily"
+
+    def __init__(self, api_key: Optional[str] = None):
+        from tavily import TavilyClient
+        self.client = TavilyClient(api_key=api_key or os.getenv("TAVILY_API_KEY"))
+
+    def search(self, query: str, max_results: int = 3, search_depth: str = "basic") -> Dict[str, Any]:
+        return self.client.search(query=query, max_results=max_results, search_depth=search_depth)
+
+
+class StubSearchBackend(SearchBackend):
+    """
+    Backend local déterministe (tests, benchmarks, développement hors ligne)
+
+    Args:
+        latency: Délai simulé par appel (secondes)
+        fail: Lever une erreur à chaque appel (simulation de panne)
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 0.0, fail: bool = False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def search(self, query: str, max_results: int = 3, search_depth: str = "basic") -> Dict[str, Any]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("Stub search backend failure")
+
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Résultat {i} pour {query}",
+                    "url": f"https://example.com/{digest}/{i}",
+                    "content": f"Contenu simulé n°{i} concernant « {query} ».",
+                    "score": round(1.0 - i * 0.1, 2)
+                }
+                for i in range(1, max_results + 1)
+            ]
+        }
+
+
+# ==========================================
+# DISJONCTEUR
+# ==========================================
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Recherche court-circuitée: le backend est en échec ou trop lent"""
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur à trois états
+
+    - closed: appels autorisés; `failure_threshold` échecs consécutifs → open
+    - open: appels refusés pendant `reset_timeout` secondes → half_open
+    - half_open: un seul appel d'essai; succès → closed, échec → open
+
+    Un succès tardif (appel lancé avant l'ouverture) ne referme pas le
+    disjoncteur: seul l'appel d'essai le peut.
+
+    Args:
+        failure_threshold: Échecs consécutifs avant ouverture
+        reset_timeout: Durée d'ouverture (secondes)
+        slow_call_seconds: Au-delà, un appel réussi compte comme un échec
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30,
+        slow_call_seconds: Optional[float] = None
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+
+        self._state = BREAKER_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.last_failure: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == BREAKER_OPEN and time.time() - self._opened_at >= self.reset_timeout:
+            self._state = BREAKER_HALF_OPEN
+            self._probe_inflight = False
+
+    def is_open(self) -> bool:
+        """Le disjoncteur refuse-t-il actuellement les appels (sans effet de bord)"""
+        return self.state == BREAKER_OPEN
+
+    def allow(self) -> bool:
+        """Réserver le droit d'appeler le backend"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == BREAKER_CLOSED:
+                return True
+            if self._state == BREAKER_HALF_OPEN and not self._probe_inflight:
+                self._probe_inflight = True
+                return True
+            return False
+
+    def record(self, elapsed: float, error: Optional[str] = None):
+        """Enregistrer l'issue d'un appel (erreur, lenteur ou succès)"""
+        if error is None and self.slow_call_seconds is not None and elapsed > self.slow_call_seconds:
+            error = f"appel lent ({elapsed:.1f}s)"
+        if error is None:
+            with self._lock:
+                if self._state == BREAKER_HALF_OPEN:
+                    self._probe_inflight = False
+                    self._state = BREAKER_CLOSED
+                if self._state == BREAKER_CLOSED:
+                    self._failures = 0
+        else:
+            self.record_failure(error)
+
+    def record_failure(self, reason: str):
+        with self._lock:
+            self._failures += 1
+            self.last_failure = reason
+            self._probe_inflight = False
+            if self._state == BREAKER_HALF_OPEN or (
+                self._state == BREAKER_CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = BREAKER_OPEN
+                self._opened_at = time.time()
+                self.trips += 1
+                logger.warning(f"⚡ Recherche web court-circuitée pour {self.reset_timeout:.0f}s: {reason}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "trips": self.trips,
+            "last_failure": self.last_failure
+        }
+
+
+# ==========================================
+# RECHERCHE AVEC CACHE
+# ==========================================
+
+class _InflightCall:
+    __slots__ = ("event", "result", "error", "overrun")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.overrun = False  # Déjà compté en échec par `wait` (hors budget)
+
+
+class _SearchTicket:
+    """Recherche soumise par `submit`: appel rejoint (une fois sortie de la file)"""
+    __slots__ = ("call", "overrun")
+
+    def __init__(self):
+        self.call: Optional[_InflightCall] = None
+        self.overrun = False  # Hors budget avant d'avoir rejoint un appel
+
+
+class WebSearch:
+    """
+    Recherche web avec cache TTL/LRU et coalescence des requêtes identiques
+
+    Args:
+        backend: Fournisseur de recherche (None = recherche désactivée)
+        ttl: Durée de vie d'une entrée en cache (secondes)
+        max_entries: Nombre maximum d'entrées (éviction LRU)
+        persist_path: Fichier JSON de persistance du cache (None = mémoire seule)
+        latency_budget: Attente maximale par défaut dans `wait` (secondes)
+        breaker: Disjoncteur autour du backend (None = appel lent au-delà du budget)
+        max_workers: Threads du pool de recherche asynchrone
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SearchBackend],
+        ttl: float = 3600,
+        max_entries: int = 1024,
+        persist_path: Optional[str] = None,
+        latency_budget: float = 1.5,
+        breaker: Optional[CircuitBreaker] = None,
+        max_workers: int = 4
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.latency_budget = latency_budget
+        self.breaker = breaker or CircuitBreaker(slow_call_seconds=latency_budget)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="web-search")
+
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, _InflightCall] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.short_circuited = 0
+
+        if persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def name(self) -> str:
+        return self.backend.name if self.backend else "none"
+
+    def _key(self, query: str, max_results: int, search_depth: str) -> str:
+        return f"{search_depth}|{max_results}|{normalize_query(query)}"
+
+    # ==========================================
+    # RECHERCHE
+    # ==========================================
+
+    def search(self, query: str, max_results: int = 3, search_depth: str = "basic") -> Dict[str, Any]:
+        """
+        Rechercher (cache, puis requête en cours, puis backend)
+
+        Returns:
+            {"query": str, "results": [...], "cached": bool}
+
+        Raises:
+            RuntimeError si aucun backend n'est configuré; les erreurs du
+            backend sont propagées (et partagées avec les appels coalescés)
+        """
+        return self._search(query, max_results, search_depth)
+
+    def _search(
+        self,
+        query: str,
+        max_results: int,
+        search_depth: str,
+        ticket: Optional[_SearchTicket] = None
+    ) -> Dict[str, Any]:
+        if self.backend is None:
+            raise RuntimeError("Recherche web désactivée")
+
+        key = self._key(query, max_results, search_depth)
+
+        with self._lock:
+            cached = self._lookup(key, query)
+            if cached is not None:
+                return cached
+
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _InflightCall()
+                self._inflight[key] = call
+                self.misses += 1
+            else:
+                self.coalesced += 1
+            if ticket is not None:
+                # Restée en file au-delà du budget: l'échec est déjà compté pour cet appel
+                ticket.call = call
+                call.overrun = call.overrun or ticket.overrun
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return {**call.result, "query": query, "cached": True}
+
+        if not self.breaker.allow():
+            with self._lock:
+                self.short_circuited += 1
+                self._inflight.pop(key, None)
+            call.error = CircuitOpenError(f"Recherche web court-circuitée ({self.breaker.last_failure})")
+            call.event.set()
+            raise call.error
+
+        start = time.perf_counter()
+        try:
+            try:
+                with span("web_search.backend", backend=self.name, max_results=max_results) as backend_span:
+                    response = self.backend.search(query, max_results=max_results, search_depth=search_depth)
+                    backend_span.set("results", len(response.get("results", [])))
+            except Exception as e:
+                self._record(call, time.perf_counter() - start, error=str(e) or type(e).__name__)
+                raise
+            self._record(call, time.perf_counter() - start)
+            payload = {"results": list(response.get("results", []))[:max_results]}
+            call.result = payload
+            with self._lock:
+                self._cache[key] = (time.time(), payload)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                self._dirty = True
+            return {**payload, "query": query, "cached": False}
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def _record(self, call: _InflightCall, elapsed: float, error: Optional[str] = None):
+        """Issue d'un appel au backend, sauf s'il a déjà été compté hors budget"""
+        with self._lock:
+            if call.overrun:
+                return
+        self.breaker.record(elapsed, error=error)
+
+    def _lookup(self, key: str, query: str) -> Optional[Dict[str, Any]]:
+        """Entrée de cache valide (verrou tenu), ou None"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        stored_at, payload = entry
+        if time.time() - stored_at >= self.ttl:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        self.hits += 1
+        return {**payload, "query": query, "cached": True}
+
+    # ==========================================
+    # RECHERCHE ASYNCHRONE (BUDGET DE LATENCE)
+    # ==========================================
+
+    def submit(self, query: str, max_results: int = 3, search_depth: str = "basic") -> Optional[Future]:
+        """
+        Lancer la recherche en arrière-plan le plus tôt possible
+
+        Returns:
+            Future du résultat (déjà résolue si en cache), ou None si la
+            recherche est désactivée ou court-circuitée
+        """
+        if self.backend is None:
+            return None
+
+        with self._lock:
+            cached = self._lookup(self._key(query, max_results, search_depth), query)
+        if cached is not None:
+            current_span().set("web_search.cache_hit", True)
+            future: Future = Future()
+            future.set_result(cached)
+            return future
+
+        if self.breaker.is_open():
+            with self._lock:
+                self.short_circuited += 1
+            logger.info("⚡ Recherche web ignorée (disjoncteur ouvert)")
+            return None
+
+        current_span().set("web_search.cache_hit", False)
+        ticket = _SearchTicket()
+        future = self._executor.submit(propagate(self._search), query, max_results, search_depth, ticket)
+        future.search_ticket = ticket
+        return future
+
+    def wait(self, future: Optional[Future], timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Attendre un résultat dans le budget de latence
+
+        Returns:
+            Le résultat, ou None (budget dépassé, erreur, court-circuit).
+            Une recherche hors budget continue et remplit le cache.
+        """
+        if future is None:
+            return None
+        budget = self.latency_budget if timeout is None else timeout
+        try:
+            with span("web_search.wait", budget_ms=round(budget * 1000)):
+                return future.result(timeout=budget)
+        except FutureTimeoutError:
+            # Un seul échec par appel au backend, même attendu par plusieurs
+            # requêtes; sa fin tardive ne sera pas comptée une seconde fois.
+            # Recherche encore en file: marquée sur le ticket, reportée sur
+            # l'appel qu'elle rejoindra (rien à nettoyer si elle n'en rejoint aucun)
+            ticket = getattr(future, "search_ticket", None)
+            with self._lock:
+                self.timeouts += 1
+                target = ticket.call or ticket if ticket is not None else None
+                first = target is None or not target.overrun
+                if target is not None:
+                    target.overrun = True
+            if first:
+                self.breaker.record_failure(f"budget de {budget:.1f}s dépassé")
+            logger.warning(f"⏱️ Recherche web hors budget ({budget:.1f}s), réponse sans résultats web")
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ Recherche web échouée: {e}")
+        return None
+
+    def search_within_budget(
+        self,
+        query: str,
+        max_results: int = 3,
+        search_depth: str = "basic",
+        timeout: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Raccourci `wait(submit(...))` pour les appels sans travail en parallèle"""
+        return self.wait(self.submit(query, max_results, search_depth), timeout=timeout)
+
+    # ==========================================
+    # PERSISTANCE
+    # ==========================================
+
+    def load(self):
+        """Charger les entrées non expirées depuis le disque"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Cache de recherche illisible ({self.persist_path}): {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, stored_at, payload in entries[-self.max_entries:]:
+                if now - stored_at < self.ttl:
+                    self._cache[key] = (stored_at, payload)
+        logger.info(f"📂 Cache de recherche web: {len(self._cache)} entrées chargées")
+
+    def save(self):
+        """Écrire le cache sur disque (écriture atomique)"""
+        if not self.persist_path or not self._dirty:
+            return
+        with self._lock:
+            entries = [[key, stored_at, payload] for key, (stored_at, payload) in self._cache.items()]
+            self._dirty = False
+
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Sauvegarde du cache de recherche échouée: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._dirty = True
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": self.name,
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "short_circuited": self.short_circuited,
+            "breaker": self.breaker.stats(),
+            "latency_budget_seconds": self.latency_budget,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else None,
+            "ttl_seconds": self.ttl
+        }
+
+
+def create_web_search() -> WebSearch:
+    """Construire la couche de recherche depuis les variables d'environnement"""
+    backend_name = os.getenv("WEB_SEARCH_BACKEND", "tavily").strip().lower()
+    backend: Optional[SearchBackend] = None
+
+    if backend_name == "stub":
+        backend = StubSearchBackend()
+    elif backend_name == "tavily":
+        try:
+            backend = TavilyBackend()
+            logger.info("✅ Tavily disponible")
+        except Exception as e:
+            logger.warning(f"⚠️ Tavily non disponible: {e}")
+    elif backend_name not in ("none", ""):
+        logger.warning(f"⚠️ Backend de recherche inconnu: {backend_name}")
+
+    return WebSearch(
+        backend,
+        ttl=float(os.getenv("WEB_SEARCH_CACHE_TTL", "3600")),
+        max_entries=int(os.getenv("WEB_SEARCH_CACHE_SIZE", "1024")),
+        persist_path=os.getenv("WEB_SEARCH_CACHE_PATH") or None,
+        latency_budget=float(os.getenv("WEB_SEARCH_BUDGET_MS", "1500")) / 1000,
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("WEB_SEARCH_BREAKER_FAILURES", "3")),
+            reset_timeout=float(os.getenv("WEB_SEARCH_BREAKER_RESET", "30")),
+            slow_call_seconds=float(os.getenv("WEB_SEARCH_SLOW_MS") or os.getenv("WEB_SEARCH_BUDGET_MS", "1500")) / 1000
+        )
+    )
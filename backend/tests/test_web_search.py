@@ -0,0 +1,116 @@
+"""
+🧪 DISJONCTEUR DE LA RECHERCHE WEB
+==================================
+
+Un backend toujours plus lent que le budget de latence doit ouvrir le
+disjoncteur, et un succès tardif ne doit pas le refermer. Une recherche
+hors budget alors qu'elle attendait encore en file ne doit pas empêcher de
+compter les dépassements suivants.
+
+Auteur: BelikanM
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "models"))
+
+from web_search import (  # noqa: E402
+    WebSearch, CircuitBreaker, StubSearchBackend,
+    BREAKER_CLOSED, BREAKER_OPEN, BREAKER_HALF_OPEN
+)
+
+
+def test_slow_backend_trips_breaker():
+    backend = StubSearchBackend(latency=0.15)
+    search = WebSearch(backend, latency_budget=0.1, breaker=CircuitBreaker(failure_threshold=3, slow_call_seconds=0.1))
+
+    for i in range(3):
+        assert search.search_within_budget(f"question lente {i}") is None
+    time.sleep(0.2)  # Fins tardives: déjà comptées, elles ne referment rien
+
+    assert search.breaker.state == BREAKER_OPEN
+    assert search.breaker.trips == 1
+    assert search.search_within_budget("question suivante") is None
+    assert backend.calls == 3  # Court-circuitée
+
+
+def test_late_success_does_not_close_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, slow_call_seconds=1.0)
+    assert breaker.allow()
+    breaker.record_failure("budget dépassé")
+    assert breaker.state == BREAKER_OPEN
+
+    breaker.record(0.01)  # Appel lancé avant l'ouverture
+    assert breaker.state == BREAKER_OPEN
+
+
+def test_half_open_probe_success_closes_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05, slow_call_seconds=1.0)
+    breaker.record_failure("erreur")
+    time.sleep(0.06)
+    assert breaker.state == BREAKER_HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()  # Un seul appel d'essai
+
+    breaker.record(0.01)
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_default_slow_call_threshold_is_budget():
+    assert WebSearch(StubSearchBackend(), latency_budget=0.4).breaker.slow_call_seconds == 0.4
+
+
+def budget_failures(search):
+    """Échecs « hors budget » enregistrés par `wait`"""
+    failures = []
+    record_failure = search.breaker.record_failure
+
+    def recording(reason):
+        if reason.startswith("budget"):
+            failures.append(reason)
+        record_failure(reason)
+
+    search.breaker.record_failure = recording
+    return failures
+
+
+def test_queued_search_served_from_cache_keeps_later_timeouts_counted():
+    backend = StubSearchBackend(latency=0.1)
+    search = WebSearch(backend, ttl=0.5, latency_budget=1.0, max_workers=1,
+                       breaker=CircuitBreaker(failure_threshold=100, slow_call_seconds=10))
+    failures = budget_failures(search)
+
+    first = search.submit("question")
+    search.submit("autre 1")
+    search.submit("autre 2")
+    queued = search.submit("question")  # Derrière les autres: servie par le cache
+    assert search.wait(first) is not None
+    assert search.wait(queued, timeout=0.05) is None
+    assert queued.result(timeout=1)["cached"]
+    assert len(failures) == 1
+
+    time.sleep(0.5)  # Entrée expirée: la question repart vers le backend
+    assert search.wait(search.submit("question"), timeout=0.02) is None
+    assert len(failures) == 2
+
+
+def test_queued_search_short_circuited_keeps_later_timeouts_counted():
+    backend = StubSearchBackend(latency=0.1)
+    search = WebSearch(backend, latency_budget=1.0, max_workers=1,
+                       breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.3, slow_call_seconds=10))
+
+    search.submit("occupe")
+    queued = search.submit("question")
+    assert search.wait(queued, timeout=0.05) is None  # Ouvre le disjoncteur
+    assert search.breaker.state == BREAKER_OPEN
+    time.sleep(0.1)
+    assert queued.exception(timeout=1) is not None  # Court-circuitée en sortant de la file
+
+    time.sleep(0.3)
+    assert search.breaker.state == BREAKER_HALF_OPEN
+    assert search.wait(search.submit("question"), timeout=0.02) is None  # Appel d'essai trop lent
+    assert search.breaker.state == BREAKER_OPEN
+    assert search.breaker.trips == 2